@@ -43,11 +43,15 @@ These are:
     containers: functions which provide some special functionality for
         mappings and sequences (which have items accessed by subscripting)
 
-    joins: functions for joins between mappings on keys
+    joins: functions for joins between mappings or iterables of rows on
+        keys
 
     computations: functions which only really make sense for iterables of
         numeric types
 
+    aio: counterparts of core functions for asynchronous iterables, for
+        use with asyncio
+
 """
 from .common import (  # noqa: F401
     peek,
@@ -57,6 +61,8 @@ from .common import (  # noqa: F401
     pairwise,
     window,
     window_padded,
+    sliding_windows,
+    WindowView,
     take_batches,
     keyed_items,
     flag_where,
@@ -69,6 +75,7 @@ from .select import (  # noqa: F401
     tail,
     last,
     except_last,
+    PositionIndex,
 )
 
 from .unique import (  # noqa: F401
@@ -78,6 +85,13 @@ from .unique import (  # noqa: F401
     unique_hashable,
     allunique,
     allunique_hashable,
+    fingerprint,
+    SeenStats,
+    SeenFilter,
+    LRUFilter,
+    TimeWindowFilter,
+    BloomFilter,
+    UnhashableSeen,
 )
 
 from .rotate import (  # noqa: F401
@@ -85,6 +99,7 @@ from .rotate import (  # noqa: F401
     enumerate_cycle,
     round_robin,
     round_robin_shortest,
+    merge_sorted,
     rotate_cycle,
     intersperse,
 )
@@ -93,6 +108,7 @@ from .modify import (  # noqa: F401
     prepend,
     pad,
     partition,
+    partition_by,
     split,
     take_then_split,
     split_after,
@@ -101,6 +117,12 @@ from .modify import (  # noqa: F401
     replace_multi,
 )
 
+from .subsequences import (  # noqa: F401
+    SubsequenceMatcher,
+    find_subsequences,
+    replace_subsequences,
+)
+
 from .flatten import (  # noqa: F401
     flatten,
     flatmap,
@@ -112,9 +134,16 @@ from .group import (  # noqa: F401
     prioritize_where,
     groupby_unsorted,
     groupby_sorted,
+    groupby_unsorted_external,
+    groupby_sorted_external,
+    groupby_reduce,
+    merge_groups,
+    groupby_aggregate,
+    merge_aggregates,
     unique_just_seen,
     Run,
     RunLengths,
+    Aggregator,
 )
 
 from .zipped import (  # noqa: F401
@@ -122,20 +151,26 @@ from .zipped import (  # noqa: F401
     unzip,
     unzip_finite,
     unzip_longest_finite,
+    unzip_columns,
 )
 
 from .reductions import (  # noqa: F401
     ilen,
     iminmax,
+    CompensatedSum,
+    running,
     count_where,
     allpairs,
     decreasing,
     increasing,
     nondecreasing,
     nonincreasing,
+    MonotonicityTracker,
     allequal,
     allequal_sequence,
     allequal_sorted,
+    reduce_many,
+    MultiReducer,
 )
 
 from .misc import (  # noqa: F401
@@ -147,8 +182,25 @@ from .misc import (  # noqa: F401
     repeatfunc,
 )
 
+from .parallel import (  # noqa: F401
+    parallel_map,
+    parallel_flatmap,
+)
+
+from .shared import (  # noqa: F401
+    FanoutOverflowError,
+    fanout,
+)
+
+from .external import (  # noqa: F401
+    external_sorted,
+    external_groupby,
+    external_partition,
+)
+
 from .classes import (  # noqa: F401
     IteratorBoundError,
+    CacheEvictedError,
     BoundedIterator,
     CachedIterator,
 )
@@ -0,0 +1,749 @@
+"""Counterparts of core functions of this sub-package for async iterables.
+
+The functions in this module mirror the names and arguments of their
+synchronous counterparts, but accept asynchronous iterables (i.e.,
+objects used with async for, such as async generators) and return
+asynchronous iterators or coroutines. Regular iterables are also
+accepted wherever an async iterable is expected.
+
+Functions which must consume the entire input before returning (e.g.,
+take() and groupby_unsorted()) are coroutines, and must be awaited.
+
+Two functions have no synchronous counterpart:
+
+    collect: coroutine which gathers the items of an async iterable
+        into a collection
+
+    merge: async iterator of the items of several async iterables in
+        the order they become available, with backpressure
+
+In addition, take_batches() supports time-based batching via the
+max_wait keyword argument.
+
+"""
+import asyncio
+import collections
+import sys
+import weakref
+
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Collection,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from litecore.sentinels import NO_VALUE as _NO_VALUE
+
+import litecore.irecipes.shared as _shared
+
+from litecore.irecipes.typealiases import (
+    HashableKeyFunc,
+    KeyFunc,
+)
+
+AnyIterable = Union[AsyncIterable[Any], Iterable[Any]]
+
+_POLICIES = ('block', 'drop', 'raise')
+_DETACHED = sys.maxsize
+
+
+async def _iter_sync(iterable: Iterable[Any]) -> AsyncIterator[Any]:
+    for item in iterable:
+        yield item
+
+
+def aiter_of(iterable: AnyIterable) -> AsyncIterator[Any]:
+    """Return an async iterator over an async or regular iterable.
+
+    Arguments:
+        iterable: async iterable or regular iterable
+
+    Returns:
+        async iterator of the items of the iterable
+
+    Raises:
+        TypeError: if the object is not iterable
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(collect(aiter_of(range(3))))
+    [0, 1, 2]
+
+    """
+    try:
+        return iterable.__aiter__()
+    except AttributeError:
+        return _iter_sync(iter(iterable))
+
+
+async def collect(
+        iterable: AnyIterable,
+        *,
+        factory: Type[Collection] = list,
+) -> Collection[Any]:
+    """Return a collection of all the items of an async iterable.
+
+    Arguments:
+        iterable: async iterable or regular iterable
+
+    Keyword Arguments:
+        factory: type of collection to return (default is list)
+
+    Returns:
+        collection of the items of the iterable
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(collect(drop(2, range(5)), factory=tuple))
+    (2, 3, 4)
+
+    """
+    return factory([item async for item in aiter_of(iterable)])
+
+
+async def take(
+        items: int,
+        iterable: AnyIterable,
+        *,
+        factory: Type[Collection] = list,
+) -> Collection[Any]:
+    """Return a collection of a specified number of items of an async iterable.
+
+    See common.take() for details.
+
+    Arguments:
+        items: non-negative number of items to be consumed and returned
+        iterable: async iterable or regular iterable
+
+    Keyword Arguments:
+        factory: type of collection to return (default is list)
+
+    Returns:
+        collection defined by the first items of iterable
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(take(2, range(5)))
+    [0, 1]
+    >>> asyncio.run(take(6, range(5), factory=set))
+    {0, 1, 2, 3, 4}
+
+    """
+    result = []
+    if items > 0:
+        append = result.append
+        async for item in aiter_of(iterable):
+            append(item)
+            if len(result) == items:
+                break
+    return factory(result)
+
+
+async def drop(items: int, iterable: AnyIterable) -> AsyncIterator[Any]:
+    """Return async iterator of an async iterable skipping some items.
+
+    See common.drop() for details.
+
+    Arguments:
+        items: non-negative number of items to skip
+        iterable: async iterable or regular iterable
+
+    Yields:
+        the items after the specified number of items
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(collect(drop(2, range(5))))
+    [2, 3, 4]
+    >>> asyncio.run(collect(drop(6, range(5))))
+    []
+
+    """
+    iterator = aiter_of(iterable)
+    for _ in range(items):
+        try:
+            await iterator.__anext__()
+        except StopAsyncIteration:
+            return
+    async for item in iterator:
+        yield item
+
+
+async def pairwise(iterable: AnyIterable) -> AsyncIterator[Tuple[Any, Any]]:
+    """Return async iterator of overlapping pairs of items.
+
+    See common.pairwise() for details.
+
+    Arguments:
+        iterable: async iterable or regular iterable
+
+    Yields:
+        tuples of pairs of sequential items from iterable
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(collect(pairwise(range(4))))
+    [(0, 1), (1, 2), (2, 3)]
+    >>> asyncio.run(collect(pairwise(range(1))))
+    []
+
+    """
+    previous = _NO_VALUE
+    async for item in aiter_of(iterable):
+        if previous is not _NO_VALUE:
+            yield previous, item
+        previous = item
+
+
+async def window(
+        items: int,
+        iterable: AnyIterable,
+) -> AsyncIterator[Tuple[Any, ...]]:
+    """Return async iterator of moving window of items.
+
+    See common.window() for details.
+
+    Arguments:
+        items: positive number of items to include in each window
+        iterable: async iterable or regular iterable
+
+    Yields:
+        tuples of sequential items from iterable
+
+    Raises:
+        ValueError: if items is not positive
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(collect(window(3, range(5))))
+    [(0, 1, 2), (1, 2, 3), (2, 3, 4)]
+    >>> asyncio.run(collect(window(4, range(3))))
+    []
+
+    """
+    if items <= 0:
+        msg = f'items must be positive'
+        raise ValueError(msg)
+    current = collections.deque(maxlen=items)
+    push = current.append
+    async for item in aiter_of(iterable):
+        push(item)
+        if len(current) == items:
+            yield tuple(current)
+
+
+async def take_batches(
+        iterable: AnyIterable,
+        *,
+        length: int,
+        max_wait: Optional[float] = None,
+        factory: Optional[Type[Collection]] = None,
+) -> AsyncIterator[Collection[Any]]:
+    """Break an async iterable into batches of up to a specified length.
+
+    See common.take_batches() for details, except that padding with a
+    fillvalue is not supported.
+
+    If max_wait is specified, a batch is also yielded (possibly shorter
+    than the specified length) once max_wait seconds have passed since
+    its first item arrived. This bounds the latency added by batching
+    when items arrive slowly. Waiting for an item in order to decide
+    whether to yield a batch does not cancel the pending read from the
+    async iterable.
+
+    Arguments:
+        iterable: async iterable or regular iterable
+
+    Keyword Arguments:
+        length: positive maximum number of items in each batch
+        max_wait: maximum number of seconds to hold the first item of a
+            batch before yielding the batch (optional; default is None,
+            signifying no time limit)
+        factory: type of collection to return
+            (optional; default is None, same as specifying tuple)
+
+    Yields:
+        collections of items of the iterable
+
+    Raises:
+        ValueError: if length is not positive
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(collect(take_batches(range(8), length=3)))
+    [(0, 1, 2), (3, 4, 5), (6, 7)]
+    >>> async def ticks():
+    ...     for n in range(6):
+    ...         if n == 2:
+    ...             await asyncio.sleep(0.2)
+    ...         yield n
+    >>> batches = take_batches(ticks(), length=3, max_wait=0.05, factory=list)
+    >>> asyncio.run(collect(batches))
+    [[0, 1], [2, 3, 4], [5]]
+
+    """
+    if length < 1:
+        msg = f'length must be positive'
+        raise ValueError(msg)
+    _factory = tuple if factory is None else factory
+    iterator = aiter_of(iterable)
+    if max_wait is None:
+        batch = []
+        async for item in iterator:
+            batch.append(item)
+            if len(batch) == length:
+                yield _factory(batch)
+                batch = []
+        if batch:
+            yield _factory(batch)
+        return
+
+    loop = asyncio.get_event_loop()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            try:
+                batch = [await pending]
+            except StopAsyncIteration:
+                pending = None
+                return
+            pending = None
+            deadline = loop.time() + max_wait
+            while len(batch) < length:
+                pending = asyncio.ensure_future(iterator.__anext__())
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    break
+                try:
+                    batch.append(pending.result())
+                except StopAsyncIteration:
+                    pending = None
+                    yield _factory(batch)
+                    return
+                pending = None
+            yield _factory(batch)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def unique_hashable(
+        iterable: AnyIterable,
+        *,
+        key: Optional[KeyFunc] = None,
+) -> AsyncIterator[Hashable]:
+    """Return async iterator of unique items from an async iterable.
+
+    See unique.unique_hashable() for details.
+
+    Arguments:
+        iterable: async iterable or regular iterable
+
+    Keyword Arguments:
+        key: single-argument callable mapping function
+            (optional; defaults to None, signifying each item is
+            to be processed without modification)
+
+    Yields:
+        unique items in the order they were encountered
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(collect(unique_hashable('AAAABBBCCDAABBB')))
+    ['A', 'B', 'C', 'D']
+    >>> asyncio.run(collect(unique_hashable('ABbcCAD', key=str.lower)))
+    ['A', 'B', 'c', 'D']
+
+    """
+    seen = set()
+    saw = seen.add
+    if key is None:
+        async for item in aiter_of(iterable):
+            if item not in seen:
+                saw(item)
+                yield item
+    else:
+        async for item in aiter_of(iterable):
+            item_key = key(item)
+            if item_key not in seen:
+                saw(item_key)
+                yield item
+
+
+async def groupby_unsorted(
+        iterable: AnyIterable,
+        *,
+        key: Optional[HashableKeyFunc] = None,
+) -> Iterable[Tuple[Hashable, List[Any]]]:
+    """Return grouped items of an async iterable, without requiring a sort.
+
+    See group.groupby_unsorted() for details. This is a coroutine, since
+    the entire async iterable must be consumed before any group is known
+    to be complete.
+
+    Arguments:
+        iterable: async iterable or regular iterable
+
+    Keyword Arguments:
+        key: single-argument callable mapping function returning a hashable
+            key (optional; defaults to None, which signifies the items of
+            the iterable are processed without modification)
+
+    Returns:
+        iterable of tuples containing the hashable key and a list of the
+        items grouped under that key, in the order in which both the keys
+        and respective items were encountered
+
+    Examples:
+
+    >>> import asyncio
+    >>> groups = asyncio.run(groupby_unsorted(range(7), key=lambda n: n % 3))
+    >>> list(groups)
+    [(0, [0, 3, 6]), (1, [1, 4]), (2, [2, 5])]
+
+    """
+    groups = collections.defaultdict(list)
+    if key is None:
+        async for item in aiter_of(iterable):
+            groups[item].append(item)
+    else:
+        async for item in aiter_of(iterable):
+            groups[key(item)].append(item)
+    return groups.items()
+
+
+async def round_robin(*iterables: AnyIterable) -> AsyncIterator[Any]:
+    """Return async iterator yielding from each async iterable in turn.
+
+    See rotate.round_robin() for details.
+
+    Arguments:
+        an arbitrary number of async or regular iterable positional
+        arguments
+
+    Yields:
+        items rotating among the iterables until all are exhausted
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(collect(round_robin(range(3), 'abcde', [None])))
+    [0, 'a', None, 1, 'b', 2, 'c', 'd', 'e']
+
+    """
+    active = collections.deque(aiter_of(it) for it in iterables)
+    rotate = active.rotate
+    while active:
+        try:
+            item = await active[0].__anext__()
+        except StopAsyncIteration:
+            active.popleft()
+        else:
+            rotate(-1)
+            yield item
+
+
+async def flatten(iterables: AnyIterable) -> AsyncIterator[Any]:
+    """Flatten an async iterable of iterables into one async iterator.
+
+    See flatten.flatten() for details. The outer iterable and each of
+    the inner iterables may each be either async or regular iterables.
+
+    Arguments:
+        iterables: iterable of iterables with items to be flattened
+
+    Yields:
+        the consecutive items of the underlying iterables
+
+    Examples:
+
+    >>> import asyncio
+    >>> asyncio.run(collect(flatten([range(3), [-1], drop(3, range(6))])))
+    [0, 1, 2, -1, 3, 4, 5]
+
+    """
+    async for iterable in aiter_of(iterables):
+        async for item in aiter_of(iterable):
+            yield item
+
+
+class _MergeError:
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+async def _feed_queue(iterable, queue):
+    try:
+        async for item in aiter_of(iterable):
+            await queue.put(item)
+    except asyncio.CancelledError:
+        raise
+    except Exception as err:
+        await queue.put(_MergeError(err))
+    else:
+        await queue.put(_NO_VALUE)
+
+
+async def merge(
+        *iterables: AnyIterable,
+        maxsize: int = 1,
+) -> AsyncIterator[Any]:
+    """Return async iterator of items of async iterables as they arrive.
+
+    Each iterable is consumed by its own task, and its items are yielded
+    in the order they become available, regardless of which iterable
+    they came from. The tasks share a queue holding at most maxsize
+    items; when it is full, the tasks wait for the consumer to catch up
+    before reading more items from their iterables (i.e., backpressure
+    is applied to every source rather than buffering without limit).
+
+    If any of the iterables raises an exception, the remaining tasks are
+    cancelled and the exception is raised by this iterator. The tasks
+    are also cancelled if this iterator is closed before it is exhausted.
+
+    Arguments:
+        an arbitrary number of async or regular iterable positional
+        arguments
+
+    Keyword Arguments:
+        maxsize: positive maximum number of items read from the
+            iterables but not yet consumed (optional; default is 1)
+
+    Yields:
+        the items of all of the iterables
+
+    Raises:
+        ValueError: if maxsize is not positive
+
+    Examples:
+
+    >>> import asyncio
+    >>> async def delayed(items, delay):
+    ...     for item in items:
+    ...         await asyncio.sleep(delay)
+    ...         yield item
+    >>> merged = merge(delayed('abc', 0.01), delayed([1, 2], 0.025))
+    >>> asyncio.run(collect(merged))
+    ['a', 'b', 1, 'c', 2]
+
+    """
+    if maxsize < 1:
+        msg = f'maxsize must be positive'
+        raise ValueError(msg)
+    queue = asyncio.Queue(maxsize=maxsize)
+    tasks = [
+        asyncio.ensure_future(_feed_queue(iterable, queue))
+        for iterable in iterables
+    ]
+    active = len(tasks)
+    try:
+        while active:
+            item = await queue.get()
+            if item is _NO_VALUE:
+                active -= 1
+            elif isinstance(item, _MergeError):
+                raise item.error
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def fanout(
+        iterable: AnyIterable,
+        n: int = 2,
+        *,
+        maxbuffer: Optional[int] = None,
+        policy: str = 'block',
+) -> Tuple[AsyncIterator[Any], ...]:
+    """Return n independent async iterators over the items of one iterable.
+
+    See shared.fanout() for details. The returned async iterators may be
+    consumed by separate tasks. With the 'block' policy, a task which
+    gets too far ahead of the others waits for them to catch up.
+
+    Arguments:
+        iterable: async iterable or regular iterable
+        n: non-negative number of async iterators to return (optional;
+            default is 2)
+
+    Keyword Arguments:
+        maxbuffer: positive maximum number of items in the buffer
+            (optional; default is None, signifying no limit)
+        policy: 'block', 'drop' or 'raise' (optional; default is 'block')
+
+    Returns:
+        tuple of n async iterators over the items of the iterable
+
+    Raises:
+        ValueError: if n is negative, maxbuffer is not positive, or the
+            policy is not recognized
+
+    Examples:
+
+    >>> import asyncio
+    >>> async def main():
+    ...     consumers = fanout(range(100), 3, maxbuffer=4)
+    ...     return await asyncio.gather(*map(collect, consumers))
+    >>> [len(items) for items in asyncio.run(main())]
+    [100, 100, 100]
+    >>> async def main():
+    ...     fast, slow = fanout(range(10), maxbuffer=3, policy='drop')
+    ...     return await collect(fast), await collect(slow)
+    >>> asyncio.run(main())
+    ([0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [7, 8, 9])
+
+    """
+    if n < 0:
+        msg = f'n must be non-negative'
+        raise ValueError(msg)
+    if maxbuffer is not None and maxbuffer < 1:
+        msg = f'maxbuffer must be positive'
+        raise ValueError(msg)
+    if policy not in _POLICIES:
+        msg = f"policy must be 'block', 'drop' or 'raise'"
+        raise ValueError(msg)
+    buffer = _FanoutBuffer(aiter_of(iterable), n, maxbuffer, policy)
+    consumers = tuple(_fanout_consumer(buffer, i) for i in range(n))
+    for i, consumer in enumerate(consumers):
+        weakref.finalize(consumer, buffer.detach, i)
+    return consumers
+
+
+async def _fanout_consumer(
+        buffer: '_FanoutBuffer',
+        index: int,
+) -> AsyncIterator[Any]:
+    try:
+        while True:
+            item = await buffer.next_item(index)
+            if item is _NO_VALUE:
+                return
+            yield item
+    finally:
+        buffer.detach(index)
+
+
+class _FanoutBuffer:
+    # items are indexed by their position in the iterable, self._items[0]
+    # being the item with index self._start; only one consumer at a time
+    # reads from the iterable, and the others wait on self._reading
+    __slots__ = (
+        '_source',
+        '_positions',
+        '_maxbuffer',
+        '_policy',
+        '_items',
+        '_start',
+        '_exhausted',
+        '_reading',
+        '_waiters',
+    )
+
+    def __init__(
+            self,
+            source: AsyncIterator[Any],
+            n: int,
+            maxbuffer: Optional[int],
+            policy: str,
+    ) -> None:
+        self._source = source
+        self._positions = [0] * n
+        self._maxbuffer = maxbuffer
+        self._policy = policy
+        self._items = collections.deque()
+        self._start = 0
+        self._exhausted = False
+        self._reading = None
+        self._waiters = []
+
+    async def next_item(self, index: int) -> Any:
+        items = self._items
+        while True:
+            position = max(self._positions[index], self._start)
+            offset = position - self._start
+            if offset < len(items):
+                self._positions[index] = position + 1
+                item = items[offset]
+                if not offset:
+                    self._trim()
+                return item
+            if self._exhausted:
+                return _NO_VALUE
+            if self._reading is not None:
+                await asyncio.wait([self._reading])
+                continue
+            full = (
+                self._maxbuffer is not None
+                and len(items) >= self._maxbuffer
+            )
+            if full and self._policy == 'raise':
+                msg = f'fanout buffer of {self._maxbuffer} items is full'
+                raise _shared.FanoutOverflowError(msg)
+            if full and self._policy == 'block':
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                await asyncio.wait([waiter])
+                continue
+            self._reading = asyncio.get_running_loop().create_future()
+            try:
+                item = await self._source.__anext__()
+            except StopAsyncIteration:
+                self._exhausted = True
+                return _NO_VALUE
+            finally:
+                self._reading.set_result(None)
+                self._reading = None
+            items.append(item)
+            # other consumers may have caught up while the item was read
+            if full and len(items) > self._maxbuffer:
+                items.popleft()
+                self._start += 1
+            self._positions[index] = position + 1
+            if not offset:
+                self._trim()
+            return item
+
+    def detach(self, index: int) -> None:
+        self._positions[index] = _DETACHED
+        self._trim()
+
+    def _trim(self) -> None:
+        start = self._start
+        end = min(self._positions)
+        if end == _DETACHED:
+            end = start + len(self._items)
+        if end <= start:
+            return
+        popleft = self._items.popleft
+        for _ in range(end - start):
+            popleft()
+        self._start = end
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
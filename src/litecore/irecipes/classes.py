@@ -2,14 +2,24 @@
 
 """
 import collections.abc
+import pickle
+import tempfile
+import types
 
 from typing import (
     Any,
     Iterable,
-    Tuple,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
 )
 
 import litecore.irecipes.common as _common
+import litecore.irecipes.select as _select
+
+from litecore.irecipes.typealiases import FilterFunc
 
 from litecore import LitecoreError as _ErrorBase
 
@@ -18,6 +28,10 @@ class IteratorBoundError(_ErrorBase, RuntimeError):
     """Reached limit of number of items consumed from an iterator."""
 
 
+class CacheEvictedError(_ErrorBase, IndexError):
+    """Item is no longer held in the cache of an iterator."""
+
+
 class BoundedIterator(collections.abc.Iterator):
     """Iterator which limits maximum number of consumed items.
 
@@ -124,8 +138,20 @@ class CachedIterator(collections.abc.Iterator):
 
     Progressively caches the items of the iterator to allow indexed access.
 
-    The cache is a list of all the visited items, so beware of hanging
-    for inifinite iterators and memory usage for a large number of items.
+    By default, the cache is a list of all the visited items, so beware of
+    hanging for inifinite iterators and memory usage for a large number of
+    items. Two other ways of retaining items are available:
+
+    If the keyword argument window is specified (and spill is False), only
+    the most recent window items are kept, in a ring buffer. Seeking to an
+    earlier item raises a CacheEvictedError.
+
+    If the keyword argument spill is True, all the visited items are
+    available, but only about the most recent window items are kept in
+    memory. Older items are pickled to an anonymous temporary file in
+    blocks of block_size items, and are read back one block at a time when
+    needed. The items must be picklable. The temporary file is deleted when
+    the iterator is garbage collected.
 
     To 'reset' the cached iterator to point to the start of the items,
     use the method seek() with argument 0.
@@ -133,6 +159,20 @@ class CachedIterator(collections.abc.Iterator):
     Arguments:
         iterable: iterable object to wrap and cache
 
+    Keyword Arguments:
+        window: positive number of most recent items to keep in memory
+            (optional; default is None, signifying all items, or block_size
+            items if spill is True)
+        spill: whether to write older items to a temporary file (optional;
+            default is False)
+        block_size: positive number of items written to the temporary file
+            at once (optional; default is 1024)
+        directory: directory for the temporary file (optional; default is
+            None, signifying the tempfile module default)
+
+    Raises:
+        ValueError: if window or block_size is not positive
+
     >>> it = CachedIterator((str(n) for n in range(10)))
     >>> next(it), next(it), next(it)
     ('0', '1', '2')
@@ -144,7 +184,7 @@ class CachedIterator(collections.abc.Iterator):
     >>> it.seek(5)
     >>> next(it)
     '5'
-    >>> it.cache
+    >>> tuple(it.cache)
     ('0', '1', '2', '3', '4', '5')
     >>> list(it)
     ['6', '7', '8', '9']
@@ -157,11 +197,65 @@ class CachedIterator(collections.abc.Iterator):
      ...
     StopIteration
 
+    The cache is a read-only view, which reflects items cached later:
+
+    >>> it = CachedIterator(range(100), window=3)
+    >>> cache = it.cache
+    >>> it.seek(10)
+    >>> cache.start, list(cache)
+    (7, [7, 8, 9])
+    >>> it.seek(8)
+    >>> next(it)
+    8
+    >>> it.seek(2)
+    Traceback (most recent call last):
+     ...
+    litecore.irecipes.classes.CacheEvictedError: item 2 is no longer cached
+    >>> it = CachedIterator(range(100), spill=True, window=5, block_size=10)
+    >>> it.seek(50)
+    >>> it.seek(12)
+    >>> next(it), next(it)
+    (12, 13)
+    >>> cache = it.cache
+    >>> len(cache), cache[3], cache[-1], cache[18:21]
+    (50, 3, 49, [18, 19, 20])
+
+    Repeated nth() queries with the same key can start from recorded
+    positions rather than rescanning the items (see track_positions()):
+
+    >>> from litecore.irecipes.select import nth
+    >>> it = CachedIterator(range(1000))
+    >>> is_odd = lambda n: n % 2 == 1
+    >>> index = it.track_positions(is_odd, spacing=16)
+    >>> nth(100, it, key=is_odd), nth(10, it, key=is_odd), next(it)
+    (201, 21, 22)
+
     """
-    def __init__(self, iterable: Iterable[Any]):
+    def __init__(
+            self,
+            iterable: Iterable[Any],
+            *,
+            window: Optional[int] = None,
+            spill: bool = False,
+            block_size: int = 1024,
+            directory: Optional[str] = None,
+    ):
+        if window is not None and window < 1:
+            raise ValueError(f'window must be positive')
+        if block_size < 1:
+            raise ValueError(f'block_size must be positive')
+        if spill:
+            if window is None:
+                window = block_size
+            self._cache = _SpillCache(window, block_size, directory)
+        elif window is not None:
+            self._cache = _RingCache(window)
+        else:
+            self._cache = []
+        self._append = self._cache.append
         self._iter = iter(iterable)
-        self._cache = []
         self._index = None
+        self._position_indexes = {}
 
     def __iter__(self):
         return self
@@ -170,19 +264,67 @@ class CachedIterator(collections.abc.Iterator):
         if self._index is not None:
             try:
                 item = self._cache[self._index]
+            except CacheEvictedError:
+                raise
             except IndexError:
                 self._index = None
             else:
                 self._index += 1
                 return item
         item = next(self._iter)
-        self._cache.append(item)
+        self._append(item)
         return item
 
     @property
-    def cache(self) -> Tuple[Any, ...]:
-        """Return tuple of items in the cache."""
-        return tuple(self._cache)
+    def cache(self) -> Sequence[Any]:
+        """Return read-only view of the items in the cache.
+
+        The view is not a copy, and reflects items cached after it was
+        created. Index 0 of the view is the oldest item still held in
+        the cache, which is the item with index cache.start in the
+        iterator.
+
+        """
+        return _CacheView(self._cache)
+
+    @property
+    def position_indexes(self) -> Mapping[FilterFunc, _select.PositionIndex]:
+        """Return read-only mapping of keys to their position indexes."""
+        return types.MappingProxyType(self._position_indexes)
+
+    def track_positions(
+            self,
+            key: FilterFunc,
+            *,
+            spacing: int = 64,
+    ) -> _select.PositionIndex:
+        """Record the positions of the items for which the key is true.
+
+        Returns the PositionIndex for the key, creating it if necessary.
+        After this, nth() and first() called on the iterator with the same
+        key count the matching items from the start of the iterator
+        (rather than from its current position) and jump to the nearest
+        recorded position, leaving the iterator positioned after the item
+        found. Recorded positions of items which are no longer cached
+        raise a CacheEvictedError.
+
+        Raises:
+            ValueError: if spacing is not positive
+
+        """
+        index = self._position_indexes.get(key)
+        if index is None:
+            index = _select.PositionIndex(
+                self._iterate_from,
+                key,
+                spacing=spacing,
+            )
+            self._position_indexes[key] = index
+        return index
+
+    def _iterate_from(self, index: int) -> Iterator[Any]:
+        self.seek(index)
+        return self
 
     def seek(self, index: int):
         """Move the position in the cache to the specified index.
@@ -192,8 +334,140 @@ class CachedIterator(collections.abc.Iterator):
         If the position is set beyond the current cache size, additional
         items will be consumed from the iterator and stored in the cache.
 
+        Raises:
+            ValueError: if the index is negative
+            CacheEvictedError: if the item at the index is no longer
+                held in the cache
+
         """
+        if index < 0:
+            raise ValueError(f'index must be non-negative')
+        if index < getattr(self._cache, 'start', 0):
+            msg = f'item {index} is no longer cached'
+            raise CacheEvictedError(msg)
         self._index = index
         remainder = index - len(self._cache)
         if remainder > 0:
             _common.consume(self, items=remainder)
+
+
+class _CacheView(collections.abc.Sequence):
+    __slots__ = ('_cache',)
+
+    def __init__(self, cache: Any) -> None:
+        self._cache = cache
+
+    def __repr__(self):
+        return f'<{type(self).__name__} of {len(self)} items>'
+
+    def __len__(self):
+        return len(self._cache) - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('cache index out of range')
+        return self._cache[self.start + index]
+
+    @property
+    def start(self) -> int:
+        """Index in the iterator of the oldest item in the cache."""
+        return getattr(self._cache, 'start', 0)
+
+
+class _RingCache:
+    # the len() of a cache is the number of items ever appended, and items
+    # are indexed by their position in the iterator
+    __slots__ = ('_items', '_size', '_count')
+
+    def __init__(self, size: int) -> None:
+        self._items = [None] * size
+        self._size = size
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index: int) -> Any:
+        if index >= self._count:
+            raise IndexError('cache index out of range')
+        if index < self.start:
+            msg = f'item {index} is no longer cached'
+            raise CacheEvictedError(msg)
+        return self._items[index % self._size]
+
+    @property
+    def start(self) -> int:
+        return max(0, self._count - self._size)
+
+    def append(self, item: Any) -> None:
+        count = self._count
+        self._items[count % self._size] = item
+        self._count = count + 1
+
+
+class _SpillCache:
+    __slots__ = (
+        '_limit',
+        '_block_size',
+        '_directory',
+        '_file',
+        '_offsets',
+        '_recent',
+        '_spilled',
+        '_block',
+        '_block_number',
+    )
+
+    def __init__(
+            self,
+            window: int,
+            block_size: int,
+            directory: Optional[str],
+    ) -> None:
+        self._limit = window + block_size
+        self._block_size = block_size
+        self._directory = directory
+        self._file = None
+        self._offsets = []
+        self._recent = []
+        self._spilled = 0
+        self._block = None
+        self._block_number = None
+
+    def __len__(self):
+        return self._spilled + len(self._recent)
+
+    def __getitem__(self, index: int) -> Any:
+        if index >= self._spilled:
+            return self._recent[index - self._spilled]
+        number, offset = divmod(index, self._block_size)
+        if number != self._block_number:
+            self._block = self._read_block(number)
+            self._block_number = number
+        return self._block[offset]
+
+    def append(self, item: Any) -> None:
+        recent = self._recent
+        recent.append(item)
+        if len(recent) >= self._limit:
+            size = self._block_size
+            self._write_block(recent[:size])
+            del recent[:size]
+            self._spilled += size
+
+    def _write_block(self, block: List[Any]) -> None:
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(dir=self._directory)
+        file = self._file
+        file.seek(0, 2)
+        self._offsets.append(file.tell())
+        pickle.dump(block, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _read_block(self, number: int) -> List[Any]:
+        self._file.seek(self._offsets[number])
+        return pickle.load(self._file)
@@ -4,15 +4,19 @@ Avoids circular imports and eases maintainability.
 
 """
 import collections
+import collections.abc
 import functools
 import itertools
+import operator
 
 from typing import (
     Any,
     Collection,
     Iterable,
     Iterator,
+    List,
     Optional,
+    Sequence,
     Tuple,
     Type,
     Union,
@@ -217,19 +221,244 @@ def pairwise(iterable: Iterable[Any]) -> Iterator[Tuple[Any, Any]]:
     return zip(first, second)
 
 
+class WindowView(collections.abc.Sequence):
+    """Read-only view of the current contents of a sliding window.
+
+    Instances are yielded by sliding_windows() (and by window() and
+    window_padded()) when the view keyword argument is True. The same
+    view object is yielded for every window, and it is updated in place
+    as the window moves, so no new container is built per item.
+
+    Items are stored in a ring buffer; the view translates positions in
+    the window into positions in the buffer. Call tuple() on the view
+    to keep a snapshot of a window after the iterator advances.
+
+    Examples:
+
+    >>> views = list(window(3, range(5), view=True))
+    >>> views[0] is views[-1]
+    True
+    >>> views[0]
+    WindowView((2, 3, 4))
+    >>> len(views[0]), views[0][0], views[0][-1], views[0][1:]
+    (3, 2, 4, (3, 4))
+    >>> views[0][0] = None
+    Traceback (most recent call last):
+     ...
+    TypeError: 'WindowView' object does not support item assignment
+
+    """
+    __slots__ = ('_buffer', '_start')
+
+    def __init__(self, buffer: List[Any], start: int = 0):
+        self._buffer = buffer
+        self._start = start
+
+    def __repr__(self):
+        return f'{type(self).__name__}({tuple(self)!r})'
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __iter__(self):
+        buffer = self._buffer
+        start = self._start
+        return itertools.chain(
+            itertools.islice(buffer, start, None),
+            itertools.islice(buffer, start),
+        )
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        size = len(self._buffer)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError('window index out of range')
+        index += self._start
+        if index >= size:
+            index -= size
+        return self._buffer[index]
+
+
+def _copy_windows(
+        items: int,
+        iterator: Iterator[Any],
+        step: int,
+        fillvalue: Any,
+) -> Iterator[Tuple[Any, ...]]:
+    window = tuple(itertools.islice(iterator, items))
+    missing = items - len(window)
+    if missing:
+        if fillvalue is not _NO_VALUE:
+            yield window + (fillvalue,) * missing
+        return
+    yield window
+    if step == 1:
+        # Tuple slicing is a C-level copy, which beats the deque below
+        # when a new tuple is needed for every item anyway
+        for item in iterator:
+            window = window[1:] + (item,)
+            yield window
+        return
+    window = collections.deque(window, maxlen=items)
+    push = window.append
+    pending = 0
+    for item in iterator:
+        push(item)
+        pending += 1
+        if pending == step:
+            pending = 0
+            yield tuple(window)
+    if pending and fillvalue is not _NO_VALUE:
+        fillers = step - pending
+        if fillers < items:
+            window.extend(itertools.repeat(fillvalue, fillers))
+            yield tuple(window)
+
+
+def _view_windows(
+        items: int,
+        iterator: Iterator[Any],
+        step: int,
+        fillvalue: Any,
+) -> Iterator[WindowView]:
+    buffer = list(itertools.islice(iterator, items))
+    missing = items - len(buffer)
+    if missing:
+        if fillvalue is not _NO_VALUE:
+            buffer.extend(itertools.repeat(fillvalue, missing))
+            yield WindowView(buffer)
+        return
+    view = WindowView(buffer)
+    yield view
+    # The oldest item in the window is always at buffer[position]
+    position = 0
+    if step == 1:
+        for item in iterator:
+            buffer[position] = item
+            position += 1
+            if position == items:
+                position = 0
+            view._start = position
+            yield view
+        return
+    pending = 0
+    for item in iterator:
+        buffer[position] = item
+        position += 1
+        if position == items:
+            position = 0
+        pending += 1
+        if pending == step:
+            pending = 0
+            view._start = position
+            yield view
+    if pending and fillvalue is not _NO_VALUE:
+        fillers = step - pending
+        if fillers < items:
+            for _ in range(fillers):
+                buffer[position] = fillvalue
+                position += 1
+                if position == items:
+                    position = 0
+            view._start = position
+            yield view
+
+
+def sliding_windows(
+        items: int,
+        iterable: Iterable[Any],
+        *,
+        step: int = 1,
+        fillvalue: Any = _NO_VALUE,
+        view: bool = False,
+) -> Iterator[Sequence[Any]]:
+    """Return iterator of moving windows of items backed by a ring buffer.
+
+    This is the engine behind window() and window_padded().
+
+    By default each window is yielded as a new tuple, which necessarily
+    costs a copy of the whole window per item. If the view keyword
+    argument is True, a single WindowView is yielded for every window and
+    updated in place, so moving the window by one item costs O(1) work
+    and no allocation. A view is only valid until the iterator is
+    advanced; call tuple() on it to keep the contents of a window.
+
+    If the fillvalue keyword argument is not provided, windows extending
+    beyond the last item of the iterable are not yielded. Otherwise, the
+    last window is padded with the fillvalue.
+
+    Arguments:
+        items: positive number of items to include in each window
+        iterable: object to be iterated over
+
+    Keyword Arguments:
+        step: positive step size for each move of the window
+            (optional; defaults to 1)
+        fillvalue: value to use if the window extends beyond the end of
+            the iterable (optional; default is not to pad)
+        view: if True, yield a reusable read-only view of the window
+            instead of a tuple (optional; default is False)
+
+    Returns:
+        iterator of tuples (or of one repeatedly-updated WindowView) of
+        sequential items from iterable
+
+    Raises:
+        ValueError: if items or step are not positive
+
+    Examples:
+
+    >>> list(sliding_windows(3, range(6)))
+    [(0, 1, 2), (1, 2, 3), (2, 3, 4), (3, 4, 5)]
+    >>> list(sliding_windows(3, range(6), step=2))
+    [(0, 1, 2), (2, 3, 4)]
+    >>> list(sliding_windows(3, range(6), step=2, fillvalue=None))
+    [(0, 1, 2), (2, 3, 4), (4, 5, None)]
+    >>> [sum(w) for w in sliding_windows(3, range(6), view=True)]
+    [3, 6, 9, 12]
+    >>> [tuple(w) for w in sliding_windows(3, range(6), step=2, view=True,
+    ...                                    fillvalue=None)]
+    [(0, 1, 2), (2, 3, 4), (4, 5, None)]
+    >>> list(sliding_windows(0, range(6)))
+    Traceback (most recent call last):
+     ...
+    ValueError: items must be positive
+
+    """
+    if items <= 0:
+        msg = f'items must be positive'
+        raise ValueError(msg)
+    if step <= 0:
+        msg = f'step must be positive'
+        raise ValueError(msg)
+    engine = _view_windows if view else _copy_windows
+    return engine(items, iter(iterable), step, fillvalue)
+
+
 def window(
         items: int,
         iterable: Iterable[Any],
+        *,
+        view: bool = False,
 ) -> Iterator[Tuple[Any, ...]]:
     """Return iterator of moving window of items from original iterable.
 
     If the window length extends beyond the last item of the iterable,
     return an empty iterable.
 
+    See sliding_windows() for the meaning of the view keyword argument.
+
     Arguments:
         items: number of items to include in each window
         iterable: object to be iterated over
 
+    Keyword Arguments:
+        view: if True, yield a reusable read-only view of the window
+            instead of a tuple (optional; default is False)
+
     Returns:
         iterator of tuples of pairs of sequential items from iterable
 
@@ -239,15 +468,11 @@ def window(
     [(0, 1, 2), (1, 2, 3), (2, 3, 4)]
     >>> list(window(4, range(3)))
     []
+    >>> [max(w) - min(w) for w in window(3, [1, 5, 2, 8, 3], view=True)]
+    [4, 6, 6]
 
     """
-    iterator = iter(iterable)
-    window = tuple(itertools.islice(iterator, items))
-    if len(window) == items:
-        yield window
-    for item in iterator:
-        window = window[1:] + (item,)
-        yield window
+    return sliding_windows(items, iterable, view=view)
 
 
 def window_padded(
@@ -257,6 +482,7 @@ def window_padded(
         start: int = 0,
         step: int = 1,
         fillvalue: Any = None,
+        view: bool = False,
 ) -> Iterator[Tuple[Any, ...]]:
     """Return iterator of moving windows from iterable, padding if needed.
 
@@ -264,7 +490,7 @@ def window_padded(
     specifying padding, start point and step size.
 
     If the start point of the windowing is beyond the last item in the
-    iterable, return an empty tuple.
+    iterable, no windows are yielded.
 
     Arguments:
         items: number of items to include in each window
@@ -277,6 +503,8 @@ def window_padded(
             (optional; defaults to 1)
         fillvalue: default value to use if the window extends beyond end
             of the iterable (optional; default is None)
+        view: if True, yield a reusable read-only view of the window
+            instead of a tuple (optional; default is False)
 
     Returns:
         iterator of tuples of pairs of sequential items from iterable
@@ -293,6 +521,12 @@ def window_padded(
     [(2, 3, 4), (4, 5, None)]
     >>> list(window_padded(4, range(3), start=5))
     []
+    >>> next(window_padded(4, range(3), start=5))
+    Traceback (most recent call last):
+     ...
+    StopIteration
+    >>> [tuple(w) for w in window_padded(3, range(6), step=2, view=True)]
+    [(0, 1, 2), (2, 3, 4), (4, 5, None)]
 
     """
     if items <= 0:
@@ -308,37 +542,18 @@ def window_padded(
         item, iterator = peek(iterator, default=_NO_VALUE)
         if item is _NO_VALUE:
             # We started past the end of the original iterable
-            # So return empty tuple
-            return ()
+            # So there are no windows
+            return
     elif start < 0:
         msg = f'start must be non-negative'
         raise ValueError(msg)
-
-    window = collections.deque([], maxlen=items)
-    window_append = window.append
-
-    # The initial window
-    for _ in range(items):
-        window_append(next(iterator, fillvalue))
-    yield tuple(window)
-
-    # Now all of the additional windows that contain regular values
-    # Initialize index here in case iterator was already consumed
-    index = None
-    for index, item in enumerate(iterator, start=1):
-        window_append(item)  # The old values fall out one at a time
-        if index % step == 0:
-            yield tuple(window)
-
-    # The final window with padded values
-    # Variable index will not be None if enumerate consumed additional items
-    if index:
-        extras = index % step
-        fillers = step - extras
-        if extras and (fillers < items):
-            for _ in range(fillers):
-                window_append(fillvalue)
-            yield tuple(window)
+    yield from sliding_windows(
+        items,
+        iterator,
+        step=step,
+        fillvalue=fillvalue,
+        view=view,
+    )
 
 
 def take_batches(
@@ -447,6 +662,13 @@ def keyed_items(
     than calling a lambda function (particuarly a "null" expression
     such as lambda x: x) in a tight loop.
 
+    The key and item streams are combined with zip() and map() rather than
+    a generator expression, so that no Python code runs per item beyond
+    the key function itself (which may be a C function such as
+    operator.itemgetter()). zip() reuses its result tuple if the consumer
+    unpacks each tuple straight away. A collection is iterated twice,
+    while other iterables are split with itertools.tee().
+
     Arguments:
         iterable: object with items to be keyed
 
@@ -469,10 +691,10 @@ def keyed_items(
     [('a', 'A'), ('b', 'b'), ('c', 'c'), ('d', 'D'), ('e', 'e')]
 
     """
+    keys, items = _split_stream(iterable)
     if key is not None:
-        return ((key(x), x) for x in iterable)
-    else:
-        return ((x, x) for x in iterable)
+        keys = map(key, keys)
+    return zip(keys, items)
 
 
 def flag_where(
@@ -494,7 +716,11 @@ def flag_where(
     truth value for that item.
 
     The optional maxflags argument specifies a limit on the number of
-    values which may be flagged as True.
+    values which may be flagged as True. Once the limit is reached, the
+    condition is no longer evaluated.
+
+    As for keyed_items(), the flags and items are combined with zip() and
+    map(). An equality condition is tested with operator.eq().
 
     This is used elsewhere in this package as an alternative to using
     lambda expressions for optional key functions. It's generally better
@@ -530,30 +756,43 @@ def flag_where(
     [(True, 0), (False, 1), (True, 2), (False, 5), (False, 4)]
 
     """
+    if maxflags is not None and maxflags < 1:
+        raise ValueError('maxflags must be positive')
+    values, items = _split_stream(iterable)
+    if callable(where):
+        flags = map(operator.truth, map(where, values))
+    else:
+        equal = map(operator.eq, values, itertools.repeat(where))
+        flags = map(operator.truth, equal)
     if maxflags is None:
-        if callable(where):
-            return ((True, x) if where(x) else (False, x) for x in iterable)
-        else:
-            return ((True, x) if x == where else (False, x) for x in iterable)
+        return zip(flags, items)
     else:
-        if maxflags < 1:
-            raise ValueError('maxflags must be positive')
-        flags = 0
-
-        if callable(where):
-            def func(x):
-                nonlocal flags
-                if where(x) and flags < maxflags:
-                    flags += 1
-                    return (True, x)
-                else:
-                    return (False, x)
-        else:
-            def func(x):
-                nonlocal flags
-                if x == where and flags < maxflags:
-                    flags += 1
-                    return (True, x)
-                else:
-                    return (False, x)
-        return map(func, iterable)
+        return _limit_flags(flags, iter(items), maxflags)
+
+
+def _split_stream(iterable: Iterable[Any]) -> Tuple[Iterable[Any], Iterable[Any]]:
+    # two iterables over the same items, for zipping a stream computed
+    # from the items back with the items; a collection can simply be
+    # iterated twice, while other iterables are split with tee(), which
+    # holds only one item at a time when both are advanced in step
+    if isinstance(iterable, collections.abc.Collection):
+        return iterable, iterable
+    return itertools.tee(iterable)
+
+
+def _limit_flags(
+        flags: Iterator[bool],
+        items: Iterator[Any],
+        maxflags: int,
+) -> Iterator[Tuple[bool, Any]]:
+    flagged = zip(flags, items)
+    remaining = maxflags
+    for pair in flagged:
+        yield pair
+        if pair[0]:
+            remaining -= 1
+            if not remaining:
+                break
+    # drop the flags, so that a tee() feeding them stops buffering items
+    del flagged, flags
+    yield from zip(itertools.repeat(False), items)
@@ -1,8 +1,32 @@
 """Functions specialized for numerical computations on iterables.
 
+If NumPy is installed, the functions in this module can compute a whole
+series at once using vectorized array operations, rather than walking
+the items one at a time. This is controlled by the vectorize keyword
+argument of each function:
+
+    None (the default): vectorize only if passed a NumPy array
+
+    True: always vectorize, converting other objects to arrays first
+        (raises ImportError if NumPy is not installed)
+
+    False: never vectorize
+
+Vectorized computations return a NumPy array rather than an iterator.
+Arrays are iterable, so code consuming the results with list() or a for
+loop works either way. Other iterables are processed lazily, exactly as
+if NumPy were not installed.
+
+Integer arrays are converted to 64-bit signed integers (or floats, for
+unsigned 64-bit integers) before vectorizing, so that differences and
+sums of unsigned or narrow integers do not wrap around.
+
 """
 import collections
+import collections.abc
+import dataclasses
 import itertools
+import math
 import numbers
 import operator
 
@@ -12,12 +36,53 @@ from typing import (
     Iterable,
     Iterator,
     Optional,
+    Tuple,
 )
 
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover
+    _np = None
+
 import litecore.irecipes.common as _common
 
 from litecore.sentinels import NO_VALUE as _NO_VALUE
 
+# Smallest decay factor applied within one block of a vectorized EMA; keeps
+# the rescaled partial sums well inside the range of a double
+_EMA_MIN_BLOCK_DECAY = 1e-100
+
+
+def _as_array(iterable: Iterable[Any], vectorize: Optional[bool]) -> Any:
+    """Return a 1-d NumPy array of the items, or None if not vectorizing."""
+    if vectorize is False:
+        return None
+    if _np is None:
+        if vectorize:
+            msg = f'NumPy is required for vectorized computations'
+            raise ImportError(msg)
+        return None
+    if isinstance(iterable, _np.ndarray):
+        array = iterable
+    elif not vectorize:
+        return None
+    else:
+        try:
+            array = _np.asarray(memoryview(iterable))
+        except (TypeError, ValueError):
+            if not isinstance(iterable, collections.abc.Sized):
+                iterable = list(iterable)
+            array = _np.asarray(iterable)
+    if array.ndim != 1:
+        msg = f'can only vectorize one-dimensional arrays'
+        raise ValueError(msg)
+    kind = array.dtype.kind
+    if kind == 'u' and array.dtype.itemsize >= 8:
+        array = array.astype(_np.float64)
+    elif kind in 'biu':
+        array = array.astype(_np.int64, copy=False)
+    return array
+
 
 def inner_product(
     left: Iterable[numbers.Number],
@@ -25,6 +90,7 @@ def inner_product(
     *,
     op: Callable[[Any, Any], Any] = operator.mul,
     reduction: Callable[[Iterable[Any]], Any] = sum,
+    vectorize: Optional[bool] = None,
 ) -> numbers.Number:
     """Return generalized inner product between two iterables.
 
@@ -44,6 +110,9 @@ def inner_product(
             (default is multiplication operator)
         reduction: callable accepting an iterable which returns a single
             value (default is built-in sum function)
+        vectorize: whether to compute a dot product using NumPy (optional;
+            see the module documentation); only applies with the default
+            op and reduction
 
     Returns:
         numeric result of the computation
@@ -65,8 +134,19 @@ def inner_product(
     >>> incremental = [8, 7, 1, 4]
     >>> inner_product(cost, incremental, op=operator.add, reduction=min)
     8
+    >>> import array
+    >>> inner_product(array.array('d', cost), array.array('d', incremental))
+    65.0
 
     """
+    if op is operator.mul and reduction is sum:
+        left_array = _as_array(left, vectorize)
+        if left_array is not None:
+            right_array = _as_array(right, True)
+            if len(left_array) != len(right_array):
+                msg = f'vectors of incompatible lengths'
+                raise ValueError(msg)
+            return _np.dot(left_array, right_array).item()
     items = itertools.zip_longest(left, right, fillvalue=_NO_VALUE)
     try:
         return reduction(op(x, y) for x, y in items)
@@ -75,7 +155,11 @@ def inner_product(
         raise ValueError(msg) from None
 
 
-def difference(iterable: Iterable[numbers.Number]) -> Iterator[numbers.Number]:
+def difference(
+        iterable: Iterable[numbers.Number],
+        *,
+        vectorize: Optional[bool] = None,
+) -> Iterator[numbers.Number]:
     """Take first differences of items of an iterable.
 
     Assumes the subtraction operator makes sense for each item of the
@@ -84,8 +168,12 @@ def difference(iterable: Iterable[numbers.Number]) -> Iterator[numbers.Number]:
     Arguments:
         iterable: object the items of which are to be differenced
 
+    Keyword Arguments:
+        vectorize: whether to compute using NumPy (optional; see the
+            module documentation)
+
     Returns:
-        iterator of the first differences
+        iterator (or array, if vectorized) of the first differences
 
     Examples:
 
@@ -95,8 +183,18 @@ def difference(iterable: Iterable[numbers.Number]) -> Iterator[numbers.Number]:
     [1, 3, 5, 7, 9, 11, 13, 15, 17]
     >>> list(difference(difference([x * x for x in range(10)])))
     [2, 2, 2, 2, 2, 2, 2, 2]
+    >>> import array
+    >>> [int(x) for x in difference(array.array('q', [1, 4, 9, 16]))]
+    [3, 5, 7]
+    >>> list(difference(array.array('B', [5, 1, 3])))
+    [-4, 2]
+    >>> list(difference(bytes([5, 1, 3])))
+    [-4, 2]
 
     """
+    array = _as_array(iterable, vectorize)
+    if array is not None:
+        return _np.diff(array)
     return (x2 - x1 for x1, x2 in _common.pairwise(iterable))
 
 
@@ -104,6 +202,7 @@ def proportional_change(
         iterable: Iterable[numbers.Number],
         *,
         zero_divide_value: Optional[Any] = _NO_VALUE,
+        vectorize: Optional[bool] = None,
 ) -> Iterator[Any]:
     """Return proportional changes of the items of an iterable.
 
@@ -116,11 +215,20 @@ def proportional_change(
 
     To get log changes, take the desired logarithm.
 
+    If the computation is vectorized, a ZeroDivisionError is raised
+    before any results are returned.
+
     Arguments:
         iterable: object the items of which are to be differenced
 
+    Keyword Arguments:
+        zero_divide_value: value to return in place of division by zero
+            (optional; default is to raise ZeroDivisionError)
+        vectorize: whether to compute using NumPy (optional; see the
+            module documentation)
+
     Returns:
-        iterator of the proportional changes
+        iterator (or array, if vectorized) of the proportional changes
 
     Examples:
 
@@ -134,8 +242,38 @@ def proportional_change(
     ...     range(0, 10), zero_divide_value=float('NaN'))
     ... ]
     [nan, 1.0, 0.5, 0.333, 0.25, 0.2, 0.167, 0.143, 0.125]
+    >>> import array
+    >>> [float(p) for p in proportional_change(array.array('d', [2, 3, 6]))]
+    [0.5, 1.0]
+    >>> list(proportional_change(array.array('B', [4, 2])))
+    [-0.5]
+    >>> list(proportional_change(bytes([4, 2])))
+    [-0.5]
 
     """
+    array = _as_array(iterable, vectorize)
+    if array is not None:
+        return _vectorized_proportional_change(array, zero_divide_value)
+    return _iter_proportional_change(iterable, zero_divide_value)
+
+
+def _vectorized_proportional_change(array, zero_divide_value):
+    previous = array[:-1]
+    zeros = previous == 0
+    if not zeros.any():
+        return (array[1:] - previous) / previous
+    if zero_divide_value is _NO_VALUE:
+        msg = f'division by zero'
+        raise ZeroDivisionError(msg)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        result = (array[1:] - previous) / previous
+    if not isinstance(zero_divide_value, numbers.Real):
+        result = result.astype(object)
+    result[zeros] = zero_divide_value
+    return result
+
+
+def _iter_proportional_change(iterable, zero_divide_value):
     for x1, x2 in _common.pairwise(iterable):
         try:
             yield (x2 - x1) / x1
@@ -151,6 +289,7 @@ def round_items(
         digits: Optional[int] = None,
         *,
         skipvalue: Optional[Any] = None,
+        vectorize: Optional[bool] = None,
 ) -> Iterator[numbers.Number]:
     """Return iterator of items with built-in round() applied.
 
@@ -166,18 +305,28 @@ def round_items(
 
     Keyword Arguments:
         skipvalue: specifies item values to pass through without
-            rounding (optional; default is None)
+            rounding (optional; default is None); ignored if vectorized,
+            since numeric arrays cannot contain such values
+        vectorize: whether to compute using NumPy (optional; see the
+            module documentation)
 
     Returns:
-        iterator of rounded (or skipped) items of the iterable
+        iterator (or array, if vectorized) of rounded (or skipped) items
+        of the iterable
 
     Examples:
 
     >>> data = [1, 1.1, 1.23, 1.456, 1.7890, 2.98500, 2.98501]
     >>> list(round_items(data, 2))
     [1, 1.1, 1.23, 1.46, 1.79, 2.98, 2.99]
+    >>> import array
+    >>> [float(x) for x in round_items(array.array('d', data), 1)]
+    [1.0, 1.1, 1.2, 1.5, 1.8, 3.0, 3.0]
 
     """
+    array = _as_array(iterable, vectorize)
+    if array is not None:
+        return _np.round(array, 0 if digits is None else digits)
     return (
         round(item, digits)
         if item is not skipvalue else skipvalue
@@ -190,6 +339,10 @@ def simple_ma(
     iterable: Iterable[numbers.Number],
     *,
     prepend: Optional[Any] = _NO_VALUE,
+    compensated: bool = False,
+    resum: Optional[int] = None,
+    vectorize: Optional[bool] = None,
+    chunked: bool = False,
 ) -> Iterator[numbers.Number]:
     """Return iterator of simple moving average values.
 
@@ -214,6 +367,28 @@ def simple_ma(
     SMA item). This assumes that there are enough items to yield at least
     one real SMA item.
 
+    The SMA is computed from a running sum of the items in the window,
+    which is updated as each item enters and leaves the window. For very
+    long iterables of floats, rounding error in the running sum builds
+    up over time. If the compensated keyword argument is True, the sum
+    is instead accumulated in the same way as reductions.CompensatedSum,
+    which keeps the error bounded at the cost of some speed. Independently,
+    the resum keyword argument specifies a number of items after which
+    the running sum is recomputed exactly from the window using
+    math.fsum(), discarding any accumulated error.
+
+    If vectorized, the SMA is computed from differences of the cumulative
+    sum of the items. If compensated or resum is specified, the
+    cumulative sum instead restarts every resum items (or every
+    window_size items, if compensated or if resum is smaller), so error
+    only accumulates within a block. This takes time proportional to the
+    number of items, whatever the window size.
+
+    If the chunked keyword argument is True, the iterable is instead
+    treated as a stream of chunks (lists or arrays) of items, and an
+    output chunk of SMA values is returned for each input chunk. See
+    the SimpleMovingAverage class, which also supports checkpointing.
+
     Arguments:
         window_size: positive integral window size
         iterable: object with numeric items
@@ -221,10 +396,21 @@ def simple_ma(
     Keyword Arguments:
         prepend: filler marker (optional; default is to have no
             filler and effectively lag the SMA returned values)
+        compensated: whether to use compensated summation (optional;
+            default is False)
+        resum: positive number of items after which to recompute the
+            running sum exactly (optional; default is None, signifying
+            never)
+        vectorize: whether to compute using NumPy (optional; see the
+            module documentation)
+        chunked: whether the iterable yields chunks of items (optional;
+            default is False; cannot be combined with compensated or
+            resum)
 
     Returns:
-        iterator of the SMA values, prepended (if applicable) with the
-        specified filler marker
+        iterator (or array, if vectorized) of the SMA values, prepended
+        (if applicable) with the specified filler marker; if chunked, an
+        iterator of chunks of SMA values
 
     Examples:
 
@@ -246,8 +432,91 @@ def simple_ma(
     []
     >>> list(round_items(simple_ma(3, [1, 2, 3], prepend=None)))
     [None, None, 2]
+    >>> import array
+    >>> [float(x) for x in simple_ma(3, array.array('d', prices))]
+    [103.0, 105.0, 107.0, 105.0, 104.0]
+    >>> chunks = [prices[:2], prices[2:6], prices[6:]]
+    >>> list(simple_ma(3, chunks, prepend=None, chunked=True))
+    [[None, None], [103.0, 105.0, 107.0, 105.0], [104.0]]
+    >>> ticks = [1e8, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+    >>> list(simple_ma(2, ticks))[-1]
+    0.5499999985098838
+    >>> list(simple_ma(2, ticks, compensated=True))[-1]
+    0.55
+    >>> list(simple_ma(2, ticks, resum=3))[-1]
+    0.55
 
     """
+    if resum is not None and resum < 1:
+        msg = f'resum must be positive'
+        raise ValueError(msg)
+    if chunked:
+        if compensated or resum is not None:
+            msg = f'compensated or resum cannot be used with chunked input'
+            raise ValueError(msg)
+        averager = SimpleMovingAverage(
+            window_size,
+            prepend=prepend,
+            vectorize=vectorize,
+        )
+        return map(averager.update, iterable)
+    stable = compensated or resum is not None
+    array = _as_array(iterable, vectorize)
+    if array is not None:
+        if not stable:
+            block = None
+        elif compensated or resum < window_size:
+            block = window_size
+        else:
+            block = resum
+        return _vectorized_simple_ma(window_size, array, prepend, block)
+    if stable:
+        return _iter_stable_simple_ma(
+            window_size,
+            iterable,
+            prepend,
+            compensated,
+            resum,
+        )
+    return _iter_simple_ma(window_size, iterable, prepend)
+
+
+def _vectorized_simple_ma(window_size, array, prepend, block=None):
+    if len(array) < window_size:
+        return _np.empty(0)
+    if block is not None:
+        sma = _rebased_window_sums(window_size, array, block)
+    else:
+        sums = _np.cumsum(array, dtype=float)
+        sma = _np.empty(len(array) - window_size + 1)
+        sma[0] = sums[window_size - 1]
+        _np.subtract(sums[window_size:], sums[:-window_size], out=sma[1:])
+    sma /= window_size
+    if prepend is not _NO_VALUE:
+        filler = _np.full(window_size - 1, prepend)
+        sma = _np.concatenate((filler, sma))
+    return sma
+
+
+def _rebased_window_sums(window_size, array, block):
+    # window sums from cumulative sums which restart for each block of
+    # block results, over the items of those windows only, so rounding
+    # error does not build up along the array; each item is summed in at
+    # most 1 + (window_size - 1) / block blocks
+    count = len(array) - window_size + 1
+    blocks = -(-count // block)
+    width = block + window_size - 1
+    items = _np.zeros(blocks * block + window_size - 1)
+    items[:len(array)] = array
+    starts = _np.arange(0, blocks * block, block)
+    sums = _np.cumsum(items[starts[:, None] + _np.arange(width)], axis=1)
+    result = _np.empty((blocks, block))
+    result[:, 0] = sums[:, window_size - 1]
+    _np.subtract(sums[:, window_size:], sums[:, :block - 1], out=result[:, 1:])
+    return result.ravel()[:count]
+
+
+def _iter_simple_ma(window_size, iterable, prepend):
     iterator = iter(iterable)
     current_items = collections.deque(itertools.islice(iterator, window_size - 1))
     next_value, iterator = _common.peek(iterator, default=_NO_VALUE)
@@ -267,11 +536,59 @@ def simple_ma(
         yield current_sum / window_size
 
 
+def _iter_stable_simple_ma(window_size, iterable, prepend, compensated, resum):
+    iterator = iter(iterable)
+    current_items = collections.deque(itertools.islice(iterator, window_size - 1))
+    next_value, iterator = _common.peek(iterator, default=_NO_VALUE)
+    if next_value is _NO_VALUE:
+        # we don't have enough items to even yield one real SMA item
+        return iter(())
+    if prepend is not _NO_VALUE:
+        for _ in range(window_size - 1):
+            yield prepend
+    pop_old = current_items.popleft
+    push = current_items.append
+    current_items.appendleft(0)
+    current_sum = math.fsum(current_items)
+    compensation = 0.0
+    until_resum = resum
+    for new_item in iterator:
+        push(new_item)
+        old_item = pop_old()
+        if until_resum is not None:
+            until_resum -= 1
+            if not until_resum:
+                until_resum = resum
+                current_sum = math.fsum(current_items)
+                compensation = 0.0
+                yield current_sum / window_size
+                continue
+        if compensated:
+            # Same arithmetic as reductions.CompensatedSum.add(), inlined
+            # for speed, applied to the new item then the old item
+            total = current_sum + new_item
+            if abs(current_sum) >= abs(new_item):
+                compensation += (current_sum - total) + new_item
+            else:
+                compensation += (new_item - total) + current_sum
+            current_sum = total - old_item
+            if abs(total) >= abs(old_item):
+                compensation += (total - current_sum) - old_item
+            else:
+                compensation += (-old_item - current_sum) + total
+            yield (current_sum + compensation) / window_size
+        else:
+            current_sum += new_item - old_item
+            yield current_sum / window_size
+
+
 def exponential_ma(
     iterable: Iterable[numbers.Number],
     *,
     factor: numbers.Real,
     start: Any = _NO_VALUE,
+    vectorize: Optional[bool] = None,
+    chunked: bool = False,
 ) -> Iterator[numbers.Number]:
     """Return iterator of exponential moving average values.
 
@@ -287,6 +604,14 @@ def exponential_ma(
     Note therie is no prepend functionality. The EMA is always aligned
     with the original series.
 
+    If vectorized, the recursive filter is solved in closed form over
+    blocks of items using cumulative sums of rescaled items.
+
+    If the chunked keyword argument is True, the iterable is instead
+    treated as a stream of chunks (lists or arrays) of items, and an
+    output chunk of EMA values is returned for each input chunk. See
+    the ExponentialMovingAverage class, which also supports checkpointing.
+
     Arguments:
         items: positive integral window size
         iterable: object with numeric items
@@ -296,9 +621,14 @@ def exponential_ma(
         start: initialization value of the EMA (optional; default is
             to use the first value of the original iterable as the start
             value)
+        vectorize: whether to compute using NumPy (optional; see the
+            module documentation)
+        chunked: whether the iterable yields chunks of items (optional;
+            default is False)
 
-    Yields:
-        each EMA value
+    Returns:
+        iterator (or array, if vectorized) of the EMA values; if chunked,
+        an iterator of chunks of EMA values
 
     Raises:
         ValueError: if factor is not strictly between 0 and 1
@@ -315,11 +645,66 @@ def exponential_ma(
     [1]
     >>> list(exponential_ma([1, 2], factor=0.8))
     [1, 1.8]
+    >>> import array
+    >>> ema = exponential_ma(array.array('d', prices), factor=0.5)
+    >>> [round(float(x), 4) for x in ema]
+    [100.0, 101.5, 103.75, 104.875, 106.9375, 103.4688, 103.2344]
+    >>> chunks = [prices[:3], [], prices[3:]]
+    >>> ema = exponential_ma(chunks, factor=0.5, chunked=True)
+    >>> [list(round_items(chunk, 4)) for chunk in ema]
+    [[100, 101.5, 103.75], [], [104.875, 106.9375, 103.4688, 103.2344]]
 
     """
+    if chunked:
+        averager = ExponentialMovingAverage(
+            factor=factor,
+            start=start,
+            vectorize=vectorize,
+        )
+        return map(averager.update, iterable)
     if not 0 < factor < 1:
         msg = f'factor must be strictly between 0 and 1'
         raise ValueError(msg)
+    array = _as_array(iterable, vectorize)
+    if array is not None:
+        return _vectorized_exponential_ma(array, factor, start)
+    return _iter_exponential_ma(iterable, factor, start)
+
+
+def _vectorized_exponential_ma(array, factor, start):
+    ema = _np.empty(len(array))
+    if not len(array):
+        return ema
+    ema[0] = start if start is not _NO_VALUE else array[0]
+    items = len(array) - 1
+    if not items:
+        return ema
+    decay = 1.0 - factor
+    block_size = max(1, int(_np.log(_EMA_MIN_BLOCK_DECAY) / _np.log(decay)))
+    block_size = min(block_size, items)
+    blocks = -(-items // block_size)
+    # Within a block starting after the EMA value e, the k-th value is:
+    #   decay**k * (e + factor * sum(x[j] / decay**j, j=1..k))
+    decays = decay ** _np.arange(1, block_size + 1)
+    values = _np.zeros(blocks * block_size)
+    values[:items] = array[1:]
+    values = values.reshape(blocks, block_size)
+    values *= factor / decays
+    _np.cumsum(values, axis=1, out=values)
+    values *= decays
+    # Carry the last EMA value of each block into the next one
+    carry_decay = decays[-1]
+    carried = []
+    previous = ema[0]
+    for block_end in values[:, -1].tolist():
+        carried.append(previous)
+        previous = block_end + carry_decay * previous
+    values += _np.multiply.outer(carried, decays)
+    ema[1:] = values.ravel()[:items]
+    return ema
+
+
+def _iter_exponential_ma(iterable, factor, start):
     factor_complement = 1.0 - factor
     iterator = iter(iterable)
     first = next(iterator, _NO_VALUE)
@@ -330,3 +715,290 @@ def exponential_ma(
     for item in iterator:
         ema = factor * item + factor_complement * ema
         yield ema
+
+
+@dataclasses.dataclass(frozen=True)
+class SimpleMovingAverageState:
+    """Checkpoint of a SimpleMovingAverage between chunks.
+
+    Attributes:
+        window_size: the SMA window size
+        recent: the most recent items (up to window_size - 1 of them)
+        total: the running sum of the recent items
+
+    """
+    window_size: int
+    recent: Tuple[Any, ...]
+    total: Any
+
+
+class SimpleMovingAverage:
+    """Simple moving average computed over a stream of chunks of items.
+
+    Each call to update() is passed a chunk (e.g., a list or an array)
+    of new items, and returns the SMA values completed by those items.
+    The running sum and the items still inside the window carry over
+    from one chunk to the next, so the per-item overhead of a generator
+    is avoided.
+
+    List chunks produce list results. Array chunks produce arrays if the
+    chunk is vectorized (see the module documentation).
+
+    The state between chunks can be captured with checkpoint() and
+    passed back to the constructor to resume the stream later (e.g.,
+    after restarting a consumer process). Checkpoints can be pickled.
+
+    Unlike simple_ma(), filler markers (if any) are returned as soon as
+    the items arrive, even if the stream ends before the first window is
+    full.
+
+    Arguments:
+        window_size: positive integral window size
+
+    Keyword Arguments:
+        prepend: filler marker for the items before the first full
+            window (optional; default is to have no filler)
+        vectorize: whether to compute array chunks using NumPy
+            (optional; see the module documentation)
+        state: checkpoint from which to resume (optional)
+
+    Raises:
+        ValueError: if window_size is not positive, or does not match
+            the window size of the state
+
+    Examples:
+
+    >>> sma = SimpleMovingAverage(3, prepend=None)
+    >>> sma.update([100, 103])
+    [None, None]
+    >>> sma.update([106, 106, 109])
+    [103.0, 105.0, 107.0]
+    >>> state = sma.checkpoint()
+    >>> state
+    SimpleMovingAverageState(window_size=3, recent=(106, 109), total=215)
+    >>> resumed = SimpleMovingAverage(3, prepend=None, state=state)
+    >>> resumed.update([100, 103])
+    [105.0, 104.0]
+    >>> try:
+    ...     import numpy as np
+    ... except ImportError:
+    ...     np = None
+    >>> chunks = [[0.5, 0.5], [1, 1]]
+    >>> if np is not None:
+    ...     chunks = [np.array(chunk) for chunk in chunks]
+    >>> sma = SimpleMovingAverage(2)
+    >>> [[float(x) for x in sma.update(chunk)] for chunk in chunks]
+    [[0.5], [0.75, 1.0]]
+
+    """
+
+    def __init__(
+            self,
+            window_size: int,
+            *,
+            prepend: Optional[Any] = _NO_VALUE,
+            vectorize: Optional[bool] = None,
+            state: Optional[SimpleMovingAverageState] = None,
+    ) -> None:
+        if window_size < 1:
+            msg = f'window size must be positive'
+            raise ValueError(msg)
+        self.window_size = window_size
+        self.prepend = prepend
+        self.vectorize = vectorize
+        if state is None:
+            self._recent = collections.deque()
+            self._total = 0
+        elif state.window_size != window_size:
+            msg = f'state is for a different window size'
+            raise ValueError(msg)
+        else:
+            self._recent = collections.deque(state.recent)
+            self._total = state.total
+
+    def checkpoint(self) -> SimpleMovingAverageState:
+        """Return a snapshot of the state between chunks."""
+        return SimpleMovingAverageState(
+            window_size=self.window_size,
+            recent=tuple(self._recent),
+            total=self._total,
+        )
+
+    def update(self, chunk: Iterable[numbers.Number]) -> Any:
+        """Return the SMA values for a chunk of new items."""
+        array = _as_array(chunk, self.vectorize)
+        if array is not None:
+            return self._update_array(array)
+        recent = self._recent
+        total = self._total
+        window_size = self.window_size
+        results = []
+        iterator = iter(chunk)
+        missing = window_size - 1 - len(recent)
+        if missing > 0:
+            # Not enough items seen yet to fill the first window
+            seen = len(recent)
+            for item in itertools.islice(iterator, missing):
+                recent.append(item)
+                total += item
+            if self.prepend is not _NO_VALUE:
+                results.extend(
+                    itertools.repeat(self.prepend, len(recent) - seen)
+                )
+        push = recent.append
+        pop_old = recent.popleft
+        append = results.append
+        for item in iterator:
+            push(item)
+            total += item
+            append(total / window_size)
+            total -= pop_old()
+        self._total = total
+        return results
+
+    def _update_array(self, array):
+        window_size = self.window_size
+        recent = self._recent
+        missing = max(0, window_size - 1 - len(recent))
+        if recent:
+            # the carried-over items keep their own type (e.g., floats
+            # before an integer chunk); concatenate() promotes them
+            items = _np.concatenate((_np.asarray(recent), array))
+        else:
+            items = array
+        sma = _vectorized_simple_ma(window_size, items, _NO_VALUE)
+        if missing and self.prepend is not _NO_VALUE:
+            filler = _np.full(min(missing, len(array)), self.prepend)
+            sma = _np.concatenate((filler, sma))
+        recent.clear()
+        if window_size > 1:
+            recent.extend(items[-(window_size - 1):].tolist())
+        self._total = sum(recent)
+        return sma
+
+
+@dataclasses.dataclass(frozen=True)
+class ExponentialMovingAverageState:
+    """Checkpoint of an ExponentialMovingAverage between chunks.
+
+    Attributes:
+        factor: the EMA scaling factor
+        ema: the most recent EMA value (or the start value, if no items
+            have been seen yet)
+
+    """
+    factor: numbers.Real
+    ema: Any
+
+
+class ExponentialMovingAverage:
+    """Exponential moving average computed over a stream of chunks of items.
+
+    Each call to update() is passed a chunk (e.g., a list or an array)
+    of new items, and returns the EMA value for each of those items. The
+    most recent EMA value carries over from one chunk to the next, so the
+    per-item overhead of a generator is avoided.
+
+    List chunks produce list results. Array chunks produce arrays if the
+    chunk is vectorized (see the module documentation).
+
+    The state between chunks can be captured with checkpoint() and
+    passed back to the constructor to resume the stream later (e.g.,
+    after restarting a consumer process). Checkpoints can be pickled.
+
+    Keyword Arguments:
+        factor: scaling factor (strictly between 0 and 1)
+        start: initialization value of the EMA (optional; default is
+            to use the first item as the start value)
+        vectorize: whether to compute array chunks using NumPy
+            (optional; see the module documentation)
+        state: checkpoint from which to resume (optional; if provided,
+            the start value is ignored)
+
+    Raises:
+        ValueError: if factor is not strictly between 0 and 1, or does
+            not match the factor of the state
+
+    Examples:
+
+    >>> ema = ExponentialMovingAverage(factor=0.5)
+    >>> ema.update([100, 103, 106])
+    [100, 101.5, 103.75]
+    >>> state = ema.checkpoint()
+    >>> state
+    ExponentialMovingAverageState(factor=0.5, ema=103.75)
+    >>> resumed = ExponentialMovingAverage(factor=0.5, state=state)
+    >>> resumed.update([106, 109])
+    [104.875, 106.9375]
+
+    """
+
+    def __init__(
+            self,
+            *,
+            factor: numbers.Real,
+            start: Any = _NO_VALUE,
+            vectorize: Optional[bool] = None,
+            state: Optional[ExponentialMovingAverageState] = None,
+    ) -> None:
+        if not 0 < factor < 1:
+            msg = f'factor must be strictly between 0 and 1'
+            raise ValueError(msg)
+        self.factor = factor
+        self.vectorize = vectorize
+        if state is None:
+            self._ema = start
+            self._started = False
+        elif state.factor != factor:
+            msg = f'state is for a different factor'
+            raise ValueError(msg)
+        else:
+            self._ema = state.ema
+            self._started = True
+
+    def checkpoint(self) -> ExponentialMovingAverageState:
+        """Return a snapshot of the state between chunks."""
+        if self._started or self._ema is not _NO_VALUE:
+            return ExponentialMovingAverageState(
+                factor=self.factor,
+                ema=self._ema,
+            )
+        msg = f'no EMA value to checkpoint before the first item'
+        raise ValueError(msg)
+
+    def update(self, chunk: Iterable[numbers.Number]) -> Any:
+        """Return the EMA values for a chunk of new items."""
+        array = _as_array(chunk, self.vectorize)
+        if array is not None:
+            return self._update_array(array)
+        factor = self.factor
+        factor_complement = 1.0 - factor
+        iterator = iter(chunk)
+        results = []
+        if not self._started:
+            first = next(iterator, _NO_VALUE)
+            if first is _NO_VALUE:
+                return results
+            if self._ema is _NO_VALUE:
+                self._ema = first
+            self._started = True
+            results.append(self._ema)
+        ema = self._ema
+        append = results.append
+        for item in iterator:
+            ema = factor * item + factor_complement * ema
+            append(ema)
+        self._ema = ema
+        return results
+
+    def _update_array(self, array):
+        if not len(array):
+            return _np.empty(0)
+        if self._started:
+            items = _np.concatenate(((self._ema,), array))
+            ema = _vectorized_exponential_ma(items, self.factor, _NO_VALUE)[1:]
+        else:
+            ema = _vectorized_exponential_ma(array, self.factor, self._ema)
+            self._started = True
+        self._ema = ema[-1].item()
+        return ema
@@ -0,0 +1,479 @@
+"""Functions for processing iterables too large to fit in memory.
+
+Items are spilled to anonymous temporary files in sorted runs of bounded
+length, and the runs are read back lazily and merged. Items can also be
+spilled into partitions by the hash of a key, so that each partition can
+be processed in memory on its own.
+
+"""
+import functools
+import heapq
+import itertools
+import marshal
+import operator
+import pickle
+import struct
+import tempfile
+
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Collection,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import litecore.irecipes.common as _common
+
+from litecore.irecipes.typealiases import (
+    KeyFunc,
+)
+
+_BLOCK_SIZE = 1024
+_first = operator.itemgetter(0)
+_second = operator.itemgetter(1)
+_BLOCK_HEADER = struct.Struct('<Q')
+
+
+def _marshal_dump(value: Any, run: BinaryIO) -> None:
+    # marshal.load() reads files in very small pieces, so blocks are
+    # written with a length header and read back with a single read
+    data = marshal.dumps(value)
+    run.write(_BLOCK_HEADER.pack(len(data)))
+    run.write(data)
+
+
+def _marshal_load(run: BinaryIO) -> Any:
+    header = run.read(_BLOCK_HEADER.size)
+    if not header:
+        raise EOFError
+    (size,) = _BLOCK_HEADER.unpack(header)
+    return marshal.loads(run.read(size))
+
+
+_SERIALIZERS = {
+    'pickle': (
+        functools.partial(pickle.dump, protocol=pickle.HIGHEST_PROTOCOL),
+        pickle.load,
+    ),
+    'marshal': (_marshal_dump, _marshal_load),
+}
+
+
+def external_sorted(
+        iterable: Iterable[Any],
+        *,
+        key: Optional[KeyFunc] = None,
+        max_items: int = 100_000,
+        merge_width: int = 64,
+        directory: Optional[str] = None,
+        serializer: str = 'pickle',
+) -> Iterator[Any]:
+    """Return iterator of the items of an iterable in sorted order.
+
+    Same result as the built-in sorted(), but holds at most about
+    max_items items in memory at once. The iterable is consumed in
+    batches of max_items items, each batch is sorted and written to an
+    anonymous temporary file as a run, and the runs are lazily merged
+    with heapq.merge() as the returned iterator is consumed.
+
+    If the iterable has no more than max_items items, nothing is
+    written to disk. If there are more than merge_width runs, groups of
+    merge_width runs are first merged into longer runs, so that no more
+    than merge_width temporary files are read at once.
+
+    Like sorted(), the sort is stable: items with equal keys are
+    yielded in the order they occur in the iterable.
+
+    Items are serialized using either the pickle or marshal standard
+    library module. The marshal module is faster, but only supports
+    core built-in types. The temporary files are deleted when the
+    returned iterator is exhausted or closed.
+
+    Arguments:
+        iterable: object with items to be sorted
+
+    Keyword Arguments:
+        key: single-argument callable mapping function used to compare
+            items (optional; defaults to None, signifying the items are
+            compared directly)
+        max_items: positive maximum number of items to sort in memory
+            (optional; default is 100,000)
+        merge_width: maximum number of runs to merge at once, at least 2
+            (optional; default is 64)
+        directory: directory for the temporary files (optional; default
+            is None, signifying the tempfile module default)
+        serializer: 'pickle' or 'marshal' (optional; default is 'pickle')
+
+    Returns:
+        iterator of the items in sorted order
+
+    Raises:
+        ValueError: if max_items is not positive, merge_width is less
+            than 2, or the serializer is not recognized
+
+    Examples:
+
+    >>> import random
+    >>> data = random.Random(0).choices(range(50), k=1000)
+    >>> list(external_sorted(data, max_items=30, merge_width=4)) == sorted(data)
+    True
+    >>> words = ['bb', 'a', 'cc', 'b', 'aa', 'c']
+    >>> list(external_sorted(words, key=len, max_items=2, serializer='marshal'))
+    ['a', 'b', 'c', 'bb', 'cc', 'aa']
+    >>> list(external_sorted([], max_items=2))
+    []
+    >>> external_sorted([], max_items=2, serializer='json')
+    Traceback (most recent call last):
+     ...
+    ValueError: serializer must be 'pickle' or 'marshal'
+
+    """
+    write_run, read_run = _spill_functions(
+        max_items,
+        merge_width,
+        directory,
+        serializer,
+    )
+    batches = _common.take_batches(iterable, length=max_items, factory=list)
+    return _spill_merge(
+        batches,
+        functools.partial(_sorted_batch, key=key),
+        key,
+        _item_blocks,
+        merge_width,
+        write_run,
+        read_run,
+    )
+
+
+def external_groupby(
+        iterable: Iterable[Any],
+        *,
+        key: Optional[KeyFunc] = None,
+        max_items: int = 100_000,
+        merge_width: int = 64,
+        directory: Optional[str] = None,
+        serializer: str = 'pickle',
+) -> Iterator[Tuple[Any, Iterator[Any]]]:
+    """Return iterator of groups of the items of an iterable after sorting.
+
+    Same groups as itertools.groupby() applied to the result of sorted()
+    with the same key function, but holds at most about max_items items
+    in memory at once.
+
+    Works like external_sorted(), except that each batch of items is
+    grouped by key after being sorted, and the runs written to disk hold
+    the groups of items rather than individual items. Runs are then
+    merged group by group rather than item by item, which is much faster
+    when there are many items for each key. The key function is called
+    once for each item.
+
+    The groups are produced lazily as iterators, so a single group need
+    not fit in memory. As for itertools.groupby(), the group iterators
+    share the underlying iterator, so each group must be consumed before
+    advancing to the next one.
+
+    Arguments:
+        iterable: object with items to be sorted and grouped
+
+    Keyword Arguments:
+        key: single-argument callable mapping function used to sort and
+            group items (optional; defaults to None, signifying the items
+            are compared directly)
+        max_items: positive maximum number of items to sort in memory
+            (optional; default is 100,000)
+        merge_width: maximum number of runs to merge at once, at least 2
+            (optional; default is 64)
+        directory: directory for the temporary files (optional; default
+            is None, signifying the tempfile module default)
+        serializer: 'pickle' or 'marshal' (optional; default is 'pickle')
+
+    Returns:
+        iterator of tuples of each key and an iterator of the items
+        grouped under that key, in sorted order of the keys
+
+    Raises:
+        ValueError: if max_items is not positive, merge_width is less
+            than 2, or the serializer is not recognized
+
+    Examples:
+
+    >>> groups = external_groupby('mississippi', max_items=3, merge_width=2)
+    >>> [(k, ''.join(g)) for k, g in groups]
+    [('i', 'iiii'), ('m', 'm'), ('p', 'pp'), ('s', 'ssss')]
+    >>> words = ['bb', 'a', 'cc', 'b', 'aa', 'c']
+    >>> groups = external_groupby(words, key=len, max_items=2)
+    >>> [(k, list(g)) for k, g in groups]
+    [(1, ['a', 'b', 'c']), (2, ['bb', 'cc', 'aa'])]
+
+    """
+    write_run, read_run = _spill_functions(
+        max_items,
+        merge_width,
+        directory,
+        serializer,
+    )
+    batches = _common.take_batches(iterable, length=max_items, factory=list)
+    entries = _spill_merge(
+        batches,
+        functools.partial(_grouped_batch, key=key),
+        _first,
+        _entry_blocks,
+        merge_width,
+        write_run,
+        read_run,
+    )
+    return (
+        (k, itertools.chain.from_iterable(map(_second, group)))
+        for k, group in itertools.groupby(entries, key=_first)
+    )
+
+
+def external_partition(
+        iterable: Iterable[Any],
+        *,
+        key: Optional[KeyFunc] = None,
+        partitions: int = 64,
+        directory: Optional[str] = None,
+        serializer: str = 'pickle',
+) -> List[Iterator[Any]]:
+    """Split the items of an iterable into partitions on disk by hash.
+
+    Each item is written to an anonymous temporary file for partition
+    number hash(key(item)) % partitions, so items with equal keys always
+    fall in the same partition. The whole iterable is consumed before
+    returning, but only about partitions times 1,024 items are held in
+    memory at once. Each partition is read back lazily, in the order in
+    which its items occur in the iterable, and its temporary file is
+    deleted when its iterator is exhausted or closed.
+
+    Items are serialized as for external_sorted().
+
+    Arguments:
+        iterable: object with items to be partitioned
+
+    Keyword Arguments:
+        key: single-argument callable giving the hashable value used to
+            partition an item (optional; defaults to None, signifying the
+            item itself)
+        partitions: positive number of partitions (optional; default is
+            64)
+        directory: directory for the temporary files (optional; default
+            is None, signifying the tempfile module default)
+        serializer: 'pickle' or 'marshal' (optional; default is 'pickle')
+
+    Returns:
+        list of iterators over the items of each partition
+
+    Raises:
+        ValueError: if the number of partitions is not positive, or the
+            serializer is not recognized
+
+    Examples:
+
+    >>> parts = external_partition(range(10), key=lambda n: n % 3, partitions=3)
+    >>> [list(part) for part in parts]
+    [[0, 3, 6, 9], [1, 4, 7], [2, 5, 8]]
+
+    """
+    if partitions < 1:
+        msg = f'partitions must be positive'
+        raise ValueError(msg)
+    dump, load = _serializer_functions(serializer)
+    runs = _write_partitions(iterable, key, partitions, directory, dump)
+    return [_read_partition(run, load) for run in runs]
+
+
+def _write_partitions(
+        iterable: Iterable[Any],
+        key: Optional[KeyFunc],
+        partitions: int,
+        directory: Optional[str],
+        dump: Callable[[Any, BinaryIO], None],
+) -> List[BinaryIO]:
+    runs = [tempfile.TemporaryFile(dir=directory) for _ in range(partitions)]
+    try:
+        blocks = [[] for _ in range(partitions)]
+        for item in iterable:
+            number = hash(item if key is None else key(item)) % partitions
+            block = blocks[number]
+            block.append(item)
+            if len(block) >= _BLOCK_SIZE:
+                dump(block, runs[number])
+                blocks[number] = []
+        for run, block in zip(runs, blocks):
+            if block:
+                dump(block, run)
+            run.seek(0)
+    except BaseException:
+        for run in runs:
+            run.close()
+        raise
+    return runs
+
+
+def _read_partition(
+        run: BinaryIO,
+        load: Callable[[BinaryIO], Any],
+) -> Iterator[Any]:
+    with run:
+        while True:
+            try:
+                block = load(run)
+            except EOFError:
+                return
+            yield from block
+
+
+def _serializer_functions(serializer: str) -> Tuple[Callable, Callable]:
+    try:
+        return _SERIALIZERS[serializer]
+    except (KeyError, TypeError):
+        msg = f"serializer must be 'pickle' or 'marshal'"
+        raise ValueError(msg) from None
+
+
+def _spill_functions(
+        max_items: int,
+        merge_width: int,
+        directory: Optional[str],
+        serializer: str,
+) -> Tuple[Callable, Callable]:
+    if max_items < 1:
+        msg = f'max_items must be positive'
+        raise ValueError(msg)
+    if merge_width < 2:
+        msg = f'merge_width must be at least 2'
+        raise ValueError(msg)
+    dump, load = _serializer_functions(serializer)
+    write_run = functools.partial(_write_run, directory=directory, dump=dump)
+    read_run = functools.partial(_read_run, load=load)
+    return write_run, read_run
+
+
+def _sorted_batch(batch: List[Any], *, key: Optional[KeyFunc]) -> List[Any]:
+    batch.sort(key=key)
+    return batch
+
+
+def _grouped_batch(
+        batch: List[Any],
+        *,
+        key: Optional[KeyFunc],
+) -> List[Tuple[Any, List[Any]]]:
+    # each entry holds a key and a chunk of at most _BLOCK_SIZE items,
+    # so that reading a block of entries back needs bounded memory
+    if key is None:
+        batch.sort()
+        groups = ((k, list(g)) for k, g in itertools.groupby(batch))
+    else:
+        pairs = list(zip(map(key, batch), batch))
+        del batch[:]
+        pairs.sort(key=_first)
+        groups = (
+            (k, list(map(_second, g)))
+            for k, g in itertools.groupby(pairs, key=_first)
+        )
+    entries = []
+    append = entries.append
+    for k, items in groups:
+        if len(items) <= _BLOCK_SIZE:
+            append((k, items))
+        else:
+            for start in range(0, len(items), _BLOCK_SIZE):
+                append((k, items[start:start + _BLOCK_SIZE]))
+    return entries
+
+
+def _item_blocks(items: Iterable[Any]) -> Iterator[Collection[Any]]:
+    return _common.take_batches(items, length=_BLOCK_SIZE)
+
+
+def _entry_blocks(
+        entries: Iterable[Tuple[Any, List[Any]]],
+) -> Iterator[List[Tuple[Any, List[Any]]]]:
+    block = []
+    size = 0
+    for entry in entries:
+        block.append(entry)
+        size += len(entry[1])
+        if size >= _BLOCK_SIZE:
+            yield block
+            block = []
+            size = 0
+    if block:
+        yield block
+
+
+def _spill_merge(
+        batches: Iterator[List[Any]],
+        prepare: Callable[[List[Any]], List[Any]],
+        key: Optional[KeyFunc],
+        blocks: Callable[[Iterable[Any]], Iterator[Collection[Any]]],
+        merge_width: int,
+        write_run: Callable[[Iterable[Collection[Any]]], BinaryIO],
+        read_run: Callable[[BinaryIO], Iterator[Any]],
+) -> Iterator[Any]:
+    first = next(batches, None)
+    if first is None:
+        return
+    first = prepare(first)
+    second = next(batches, None)
+    if second is None:
+        yield from first
+        return
+    runs = []
+    pending = []
+    try:
+        runs.append(write_run(blocks(first)))
+        del first
+        for batch in itertools.chain([second], batches):
+            runs.append(write_run(blocks(prepare(batch))))
+        del second, batch
+        while len(runs) > merge_width:
+            pending, runs = runs, []
+            for start in range(0, len(pending), merge_width):
+                group = pending[start:start + merge_width]
+                records = heapq.merge(*map(read_run, group), key=key)
+                runs.append(write_run(blocks(records)))
+                for run in group:
+                    run.close()
+        yield from heapq.merge(*map(read_run, runs), key=key)
+    finally:
+        for run in itertools.chain(pending, runs):
+            run.close()
+
+
+def _write_run(
+        blocks: Iterable[Collection[Any]],
+        *,
+        directory: Optional[str],
+        dump: Callable[[Any, BinaryIO], None],
+) -> BinaryIO:
+    run = tempfile.TemporaryFile(dir=directory)
+    try:
+        for block in blocks:
+            dump(block, run)
+        run.seek(0)
+    except BaseException:
+        run.close()
+        raise
+    return run
+
+
+def _read_run(
+        run: BinaryIO,
+        *,
+        load: Callable[[BinaryIO], Any],
+) -> Iterator[Any]:
+    while True:
+        try:
+            block = load(run)
+        except EOFError:
+            return
+        yield from block
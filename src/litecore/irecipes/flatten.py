@@ -1,7 +1,10 @@
 """Functions for flattening iterables at various depth levels.
 
 """
+import collections.abc
+import concurrent.futures
 import itertools
+import math
 
 from typing import (
     Any,
@@ -11,8 +14,11 @@ from typing import (
     Optional,
     Tuple,
     Type,
+    Union,
 )
 
+import litecore.irecipes.parallel as _parallel
+
 
 def flatten(iterables: Iterable[Iterable[Any]]) -> Iterator[Any]:
     """Flatten an iterable of iterables into one consecutive iterator.
@@ -38,15 +44,45 @@ def flatten(iterables: Iterable[Iterable[Any]]) -> Iterator[Any]:
 
 
 def flatmap(
-        func: Callable[[Any], Any],
+        func: Callable[[Any], Iterable[Any]],
         iterable: Iterable[Any],
+        *,
+        executor: Optional[Union[str, concurrent.futures.Executor]] = None,
+        chunksize: int = 1,
+        max_in_flight: Optional[int] = None,
 ) -> Iterator[Any]:
     """Apply a function to items of an iterable and flatten the result.
 
+    If an executor is given, func is applied to chunks of chunksize
+    items by a pool of workers, so that expensive expansions run
+    concurrently. The expanded results are still yielded in input
+    order. At most max_in_flight chunks are submitted ahead of the
+    results being consumed, so memory use stays bounded. See
+    parallel_map() for how executors are created and shut down, and for
+    the handling of exceptions.
+
     Arguments:
-        func: single-argument callable to be applied to each item
+        func: single-argument callable to be applied to each item,
+            returning an iterable
         iterable: object with items to be flattened
 
+    Keyword Arguments:
+        executor: 'thread', 'process' or an executor instance (optional;
+            default is None, signifying serial expansion)
+        chunksize: positive number of items to submit to a worker at
+            once (optional; default is 1; ignored if there is no
+            executor)
+        max_in_flight: positive maximum number of chunks submitted but
+            not yet consumed (optional; default is None, signifying twice
+            the number of CPUs; ignored if there is no executor)
+
+    Returns:
+        iterator of the consecutive items of the expanded iterables
+
+    Raises:
+        ValueError: if chunksize or max_in_flight are not positive, or
+            the executor name is not recognized
+
     Examples:
 
     >>> shows = [
@@ -61,8 +97,18 @@ def flatmap(
     ...     ]
     >>> list(flatmap(show_topics, shows))  # doctest: +ELLIPSIS
     [{'id': 1, 'topic': 1}, ..., {'id': 3, 'topic': 5}, {'id': 3, 'topic': 6}]
+    >>> list(flatmap(range, range(5), executor='thread', chunksize=2))
+    [0, 0, 1, 0, 1, 2, 0, 1, 2, 3]
 
     """
+    if executor is not None:
+        return _parallel.parallel_flatmap(
+            func,
+            iterable,
+            batch_size=chunksize,
+            executor=executor,
+            max_in_flight=max_in_flight,
+        )
     return itertools.chain.from_iterable(map(func, iterable))
 
 
@@ -71,12 +117,26 @@ def deepflatten(
         *,
         maxdepth: Optional[int] = None,
         exclude_types: Optional[Tuple[Type, ...]] = None,
+        paths: bool = False,
 ) -> Iterator[Any]:
     """Non-recursively flatten a multi-level iterable into one iterator.
 
     To avoid hitting the recursion depth limit, ignore_types will always
     implicitly include str, bytes and bytearray.
 
+    Whether items are flattened is decided once for each type of item
+    encountered, and the decision is cached for the remaining items of
+    that type. Objects of types with no __hash__ method (e.g., lists and
+    dicts) are tracked while they are being flattened, and an object
+    which contains itself is included unaffected rather than being
+    flattened again.
+
+    If paths is True, yields tuples of the path to each item and the
+    item, where the path is a tuple of the indexes of the item and its
+    containers within their parents. Mappings are flattened by value in
+    this case, with their keys used in the path, so that JSON-like
+    documents can be flattened.
+
     Arguments:
         iterable: iterable object with items to be flattened
 
@@ -86,9 +146,12 @@ def deepflatten(
         exclude_types: tuple of types which will be included in results
             unaffected (optional; default is None; implicitly includes
             str, bytes and bytearray)
+        paths: whether to yield the path of each item with the item
+            (optional; default is False)
 
-    Yields:
-        consecutive items of the flattened iterable
+    Returns:
+        iterator of consecutive items of the flattened iterable, or of
+        tuples of the path and item if paths is True
 
     Examples:
 
@@ -114,51 +177,138 @@ def deepflatten(
     [1, 2, (3, 4), (5, 6), 7, 8]
     >>> list(deepflatten(mixed, exclude_types=(tuple, dict)))
     [1, 2, (3, 4), {(5, 6): 'abc'}, 7, 8]
+    >>> list(deepflatten(mixed, maxdepth=1))
+    [1, 2, (3, 4), {(5, 6): 'abc'}, 7, 8]
     >>> recursive = list(range(5))
     >>> recursive.append(recursive)
     >>> recursive == list(deepflatten(recursive))
     True
+    >>> doc = {'id': 7, 'tags': ['a', 'b'], 'owner': {'name': 'Joe'}}
+    >>> for path, item in deepflatten(doc, paths=True):
+    ...     print(path, item)
+    ('id',) 7
+    ('tags', 0) a
+    ('tags', 1) b
+    ('owner', 'name') Joe
 
     """
-    seen = set()
-    saw = seen.add
-    saw(id(iterable))
+    if exclude_types is None:
+        exclude_types = _ALWAYS_EXCLUDED
+    else:
+        exclude_types = _ALWAYS_EXCLUDED + tuple(exclude_types)
+    if maxdepth is None:
+        maxdepth = math.inf
+    if paths:
+        return _deepflatten_paths(iterable, maxdepth, exclude_types)
+    return _deepflatten_items(iterable, maxdepth, exclude_types)
+
+
+_ALWAYS_EXCLUDED = (str, bytes, bytearray)
+
+# ways of flattening an item, decided once for each type
+_LEAF = 0
+_ITERABLE = 1
+_MUTABLE_ITERABLE = 2
+_MAPPING = 3
+_MUTABLE_MAPPING = 4
+
+
+def _flatten_action(
+        item: Any,
+        exclude_types: Tuple[Type, ...],
+        mappings: bool,
+) -> int:
+    if isinstance(item, exclude_types):
+        return _LEAF
+    try:
+        iter(item)
+    except TypeError:
+        return _LEAF
+    mutable = type(item).__hash__ is None
+    if mappings and isinstance(item, collections.abc.Mapping):
+        return _MUTABLE_MAPPING if mutable else _MAPPING
+    return _MUTABLE_ITERABLE if mutable else _ITERABLE
+
+
+def _deepflatten_items(
+        iterable: Iterable[Any],
+        maxdepth: float,
+        exclude_types: Tuple[Type, ...],
+) -> Iterator[Any]:
+    actions = {}
+    seen = {id(iterable)}
     stack = []
-    push_stack = stack.append
-    pop_stack = stack.pop
     iterator = iter(iterable)
     while True:
-        try:
-            item = next(iterator)
-        except StopIteration:
-            if stack:
-                iterator = pop_stack()
-                continue
+        for item in iterator:
+            try:
+                action = actions[type(item)]
+            except KeyError:
+                action = _flatten_action(item, exclude_types, False)
+                actions[type(item)] = action
+            if action is _LEAF or len(stack) >= maxdepth:
+                yield item
+            elif action is _ITERABLE:
+                stack.append((iterator, None))
+                iterator = iter(item)
+                break
+            elif id(item) in seen:
+                yield item
             else:
-                return
-        else:
-            deeper = not isinstance(item, (str, bytes, bytearray))
-            if deeper and exclude_types is not None:
-                deeper = not isinstance(item, exclude_types)
-            if deeper and maxdepth is not None:
-                deeper = len(stack) < maxdepth
-        if not deeper:
-            yield item
+                seen.add(id(item))
+                stack.append((iterator, id(item)))
+                iterator = iter(item)
+                break
         else:
+            if not stack:
+                return
+            iterator, marked = stack.pop()
+            seen.discard(marked)
+
+
+def _deepflatten_paths(
+        iterable: Iterable[Any],
+        maxdepth: float,
+        exclude_types: Tuple[Type, ...],
+) -> Iterator[Tuple[Tuple[Any, ...], Any]]:
+    actions = {}
+    seen = {id(iterable)}
+    stack = []
+    path = ()
+    if isinstance(iterable, collections.abc.Mapping):
+        iterator = iter(iterable.items())
+    else:
+        iterator = enumerate(iterable)
+    while True:
+        for key, item in iterator:
             try:
-                child_iterator = iter(item)
-            except TypeError:
-                yield item
+                action = actions[type(item)]
+            except KeyError:
+                action = _flatten_action(item, exclude_types, True)
+                actions[type(item)] = action
+            if action is _LEAF or len(stack) >= maxdepth:
+                yield path + (key,), item
+                continue
+            if action is _MUTABLE_ITERABLE or action is _MUTABLE_MAPPING:
+                if id(item) in seen:
+                    yield path + (key,), item
+                    continue
+                seen.add(id(item))
+                marked = id(item)
+            else:
+                marked = None
+            stack.append((iterator, path, marked))
+            path = path + (key,)
+            if action is _MAPPING or action is _MUTABLE_MAPPING:
+                iterator = iter(item.items())
             else:
-                if id(item) not in seen:
-                    try:
-                        hash(item)
-                    except TypeError:
-                        saw(id(item))
-                    push_stack(iterator)
-                    iterator = child_iterator
-                else:
-                    yield item
+                iterator = enumerate(item)
+            break
+        else:
+            if not stack:
+                return
+            iterator, path, marked = stack.pop()
+            seen.discard(marked)
 
 
 def deepflatten_recursive(
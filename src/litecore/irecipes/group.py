@@ -3,7 +3,10 @@
 Also includes functions and classes for simple run-length encoding.
 
 """
+import array
+import bisect
 import collections
+import collections.abc
 import dataclasses
 import functools
 import itertools
@@ -11,16 +14,21 @@ import operator
 
 from typing import (
     Any,
+    Callable,
     Container,
+    Dict,
     Hashable,
     Iterator,
     Iterable,
     List,
+    Mapping,
     Optional,
     Tuple,
+    Union,
 )
 
 import litecore.irecipes.common as _common
+import litecore.irecipes.external as _external
 
 from litecore.irecipes.typealiases import (
     FilterFunc,
@@ -30,6 +38,8 @@ from litecore.irecipes.typealiases import (
     Prioritizer,
 )
 
+from litecore.sentinels import NO_VALUE as _NO_VALUE
+
 
 def _contains(value: Any, *, group: Container[Any]) -> Prioritized:
     return (0, value) if value in group else (1, value)
@@ -118,7 +128,8 @@ def groupby_unsorted(
     groupby_sorted() recipe herein.
 
     Note this function will consume an entire iterator into a dict of lists,
-    so be mindful of memory usage for long iterators. Will not return for an
+    so be mindful of memory usage for long iterators. For iterators too long
+    to fit in memory, use groupby_unsorted_external(). Will not return for an
     infinite iterator.
 
     Arguments:
@@ -164,7 +175,8 @@ def groupby_sorted(
 
     Note the sort done by this function will consume an entire iterator into a
     list, which will then be copied (i.e., there will be two lists of similar
-    length), so be mindful of memory usage for long iterators. Will not return
+    length), so be mindful of memory usage for long iterators. For iterators
+    too long to fit in memory, use groupby_sorted_external(). Will not return
     for an infinite iterator.
 
     Arguments:
@@ -199,6 +211,541 @@ def groupby_sorted(
     return zip(keys, groups)
 
 
+def groupby_unsorted_external(
+        iterable: Iterable[Any],
+        *,
+        key: Optional[HashableKeyFunc] = None,
+        max_items: int = 100_000,
+        directory: Optional[str] = None,
+        serializer: str = 'pickle',
+) -> Iterator[Tuple[Hashable, Iterator[Any]]]:
+    """Return an iterator of grouped items, spilling to disk as needed.
+
+    Same groups as groupby_unsorted(), but holds at most about max_items
+    items in memory at once, using external_groupby() to spill groups of
+    items to temporary files. The items are grouped by the order in which
+    their key was first encountered, which brings the groups together in
+    the same order as groupby_unsorted(). The keys themselves need not be
+    comparable or serializable.
+
+    Only the distinct keys are kept in memory, so this is suitable when
+    there are many more items than keys. The items must be serializable
+    using the specified serializer.
+
+    The groups are produced lazily as iterators rather than lists, so a
+    single group need not fit in memory. As for itertools.groupby(), the
+    group iterators share the underlying iterator, so each group must
+    be consumed before advancing to the next one.
+
+    Will not return for an infinite iterator.
+
+    Arguments:
+        iterable: object containing items to be grouped
+
+    Keyword Arguments:
+        key: single-argument callable mapping function returning a hashable key
+            (optional; defaults to None, which signifies the items of the
+            iterable are processed without modification)
+        max_items: positive maximum number of items to sort in memory
+            (optional; default is 100,000)
+        directory: directory for the temporary files (optional; default
+            is None, signifying the tempfile module default)
+        serializer: 'pickle' or 'marshal' (optional; default is 'pickle')
+
+    Returns:
+        iterator of tuples containing the hashable key and an iterator of
+            the items grouped under that key, in the order in which both
+            the keys and respective items were encountered in the iterable
+
+    Raises:
+        ValueError: if max_items is not positive or the serializer is not
+            recognized
+
+    Examples:
+
+    >>> word = 'supercalifragilisticexpialidocious'
+    >>> is_vowel = lambda c: c.lower() in 'aeiou'
+    >>> groups = groupby_unsorted_external(word, key=is_vowel, max_items=5)
+    >>> [(k, ''.join(g)) for k, g in groups]
+    [(False, 'sprclfrglstcxpldcs'), (True, 'ueaiaiiieiaioiou')]
+    >>> expected = list(groupby_unsorted(word, key=is_vowel))
+    >>> groups = groupby_unsorted_external(word, key=is_vowel, max_items=5)
+    >>> [(k, list(g)) for k, g in groups] == expected
+    True
+
+    """
+    # each key is numbered in the order it is first encountered
+    numbers = collections.defaultdict(itertools.count().__next__)
+    if key is None:
+        first_seen = numbers.__getitem__
+    else:
+        def first_seen(item):
+            return numbers[key(item)]
+    groups = _external.external_groupby(
+        iterable,
+        key=first_seen,
+        max_items=max_items,
+        directory=directory,
+        serializer=serializer,
+    )
+    return _numbered_groups(groups, numbers)
+
+
+def _numbered_groups(groups, numbers):
+    group_keys = None
+    for number, group in groups:
+        if group_keys is None:
+            group_keys = list(numbers)
+            numbers.clear()
+        yield group_keys[number], group
+
+
+def groupby_sorted_external(
+        iterable: Iterable[Any],
+        *,
+        key: Optional[KeyFunc] = None,
+        max_items: int = 100_000,
+        directory: Optional[str] = None,
+        serializer: str = 'pickle',
+) -> Iterator[Tuple[Any, Iterator[Any]]]:
+    """Return an iterator of grouped items after an external sort.
+
+    Same groups as groupby_sorted(), but holds at most about max_items
+    items in memory at once, using external_groupby() to spill sorted
+    runs of groups of items to temporary files and merge them. Since the
+    external sort is stable, the items within each group are in the same
+    order as for groupby_sorted().
+
+    The items (and the key values, if a key function is specified) must
+    be serializable using the specified serializer.
+
+    The groups are produced lazily as iterators rather than lists, so a
+    single group need not fit in memory. As for itertools.groupby(), the
+    group iterators share the underlying iterator, so each group must
+    be consumed before advancing to the next one.
+
+    Will not return for an infinite iterator.
+
+    Arguments:
+        iterable: object containing items to be grouped
+
+    Keyword Arguments:
+        key: single-argument callable mapping function
+            (optional; defaults to None, which signifies the items of the
+            iterable are processed without modification)
+        max_items: positive maximum number of items to sort in memory
+            (optional; default is 100,000)
+        directory: directory for the temporary files (optional; default
+            is None, signifying the tempfile module default)
+        serializer: 'pickle' or 'marshal' (optional; default is 'pickle')
+
+    Returns:
+        iterator of tuples containing the key and an iterator of the items
+            grouped under that key, in sorted order of the keys
+
+    Raises:
+        ValueError: if max_items is not positive or the serializer is not
+            recognized
+
+    Examples:
+
+    >>> word = 'supercalifragilisticexpialidocious'
+    >>> groups = groupby_sorted_external(word, max_items=5)
+    >>> [(k, len(list(g))) for k, g in groups][:4]
+    [('a', 3), ('c', 3), ('d', 1), ('e', 2)]
+    >>> expected = list(groupby_sorted(word, key=str.isupper))
+    >>> groups = groupby_sorted_external(word, key=str.isupper, max_items=5)
+    >>> [(k, list(g)) for k, g in groups] == expected
+    True
+
+    """
+    return _external.external_groupby(
+        iterable,
+        key=key,
+        max_items=max_items,
+        directory=directory,
+        serializer=serializer,
+    )
+
+
+def groupby_reduce(
+        iterable: Iterable[Any],
+        *,
+        key: Optional[HashableKeyFunc] = None,
+        reducer: Callable[[Any, Any], Any],
+        initial: Any = _NO_VALUE,
+) -> Dict[Hashable, Any]:
+    """Return a dict of the items of an iterable reduced for each key.
+
+    Same result as applying functools.reduce() to each group of items
+    produced by groupby_unsorted(), but the groups are never stored:
+    only the running reduced value for each key is kept, so memory use
+    is proportional to the number of distinct keys rather than the
+    number of items.
+
+    As for functools.reduce(), if initial is specified, it is the
+    starting value for each key, otherwise the first item with each key
+    is the starting value. The same initial object is used for every
+    key, so it should not be a mutable object which the reducer modifies.
+
+    Results from separate calls (e.g., for shards of a large iterable
+    processed in a pool of workers) can be combined with merge_groups(),
+    as long as the reducer can also combine two reduced values.
+
+    Arguments:
+        iterable: object containing items to be grouped and reduced
+
+    Keyword Arguments:
+        key: single-argument callable mapping function returning a hashable
+            key (optional; defaults to None, which signifies the items of
+            the iterable are processed without modification)
+        reducer: two-argument callable combining the reduced value so far
+            with the next item
+        initial: starting value for each key (optional)
+
+    Returns:
+        dict mapping each key to its reduced value, in the order in which
+        the keys were encountered in the iterable
+
+    Examples:
+
+    >>> import operator
+    >>> is_odd = lambda n: n % 2 == 1
+    >>> groupby_reduce(range(1, 10), key=is_odd, reducer=operator.add)
+    {True: 25, False: 20}
+    >>> groupby_reduce(range(1, 10), key=is_odd, reducer=max)
+    {True: 9, False: 8}
+    >>> words = ['apple', 'bob', 'avocado', 'banana']
+    >>> join = lambda acc, word: acc + word[1]
+    >>> first_letter = operator.itemgetter(0)
+    >>> groupby_reduce(words, key=first_letter, reducer=join, initial='')
+    {'a': 'pv', 'b': 'oa'}
+
+    """
+    results = {}
+    get = results.get
+    keyed = _common.keyed_items(iterable, key=key)
+    if initial is _NO_VALUE:
+        for k, item in keyed:
+            value = get(k, _NO_VALUE)
+            results[k] = item if value is _NO_VALUE else reducer(value, item)
+    else:
+        for k, item in keyed:
+            results[k] = reducer(get(k, initial), item)
+    return results
+
+
+def merge_groups(
+        partials: Iterable[Mapping[Hashable, Any]],
+        *,
+        combiner: Callable[[Any, Any], Any],
+) -> Dict[Hashable, Any]:
+    """Return a dict combining the values for each key of several mappings.
+
+    Use this to combine the partial results of groupby_reduce() (or of
+    any other function returning a mapping of keys to values) computed
+    separately for different parts of an iterable. Values for the same
+    key are combined from left to right by the combiner.
+
+    Arguments:
+        partials: iterable of mappings of keys to values
+
+    Keyword Arguments:
+        combiner: two-argument callable combining two values for a key
+
+    Returns:
+        dict mapping each key to its combined value, in the order in
+        which the keys were encountered in the mappings
+
+    Examples:
+
+    >>> import operator
+    >>> shards = [range(0, 5), range(5, 10)]
+    >>> is_odd = lambda n: n % 2 == 1
+    >>> partials = [
+    ...     groupby_reduce(shard, key=is_odd, reducer=operator.add)
+    ...     for shard in shards
+    ... ]
+    >>> partials
+    [{False: 6, True: 4}, {True: 21, False: 14}]
+    >>> merge_groups(partials, combiner=operator.add)
+    {False: 20, True: 25}
+
+    """
+    results = {}
+    get = results.get
+    for partial in partials:
+        for k, value in partial.items():
+            previous = get(k, _NO_VALUE)
+            if previous is _NO_VALUE:
+                results[k] = value
+            else:
+                results[k] = combiner(previous, value)
+    return results
+
+
+_AGGREGATE_BATCH_SIZE = 65536
+_MIN_GROUP_SIZE = 16
+
+AggregationSpec = Union[
+    str,
+    'Aggregator',
+    Tuple[Union[str, 'Aggregator'], Optional[Callable[[Any], Any]]],
+]
+
+
+def groupby_aggregate(
+        iterable: Iterable[Any],
+        *,
+        key: Optional[HashableKeyFunc] = None,
+        aggs: Mapping[str, AggregationSpec],
+        partial: bool = False,
+) -> Dict[Hashable, Dict[str, Any]]:
+    """Return a dict of named aggregates of the items for each key.
+
+    Computes several aggregates (e.g., a count, a sum and a maximum) for
+    each group of items in a single pass over the iterable, without
+    storing the groups. Only the state of each aggregate for each key is
+    kept, so memory use is proportional to the number of distinct keys.
+
+    Each aggregate is specified by a name mapped to either an Aggregator
+    or the name of a built-in aggregator, optionally paired in a tuple
+    with a single-argument callable which gets the value to be
+    aggregated from each item. If no getter is specified, the items
+    themselves are aggregated. The built-in aggregators are:
+
+        count: number of items
+        sum: sum of the values
+        min: smallest value
+        max: largest value
+        mean: arithmetic mean of the values
+        first: first value encountered
+        last: last value encountered
+
+    If partial is True, the intermediate state of each aggregate is
+    returned instead of its final value. Partial states are plain Python
+    objects, so they can be pickled (e.g., to be returned from a pool of
+    processes each handling a shard of the data), and can be combined
+    with merge_aggregates().
+
+    Arguments:
+        iterable: object containing items to be grouped and aggregated
+
+    Keyword Arguments:
+        key: single-argument callable mapping function returning a hashable
+            key (optional; defaults to None, which signifies the items of
+            the iterable are processed without modification)
+        aggs: mapping of names to specifications of aggregates
+        partial: whether to return the intermediate states of the
+            aggregates (optional; default is False)
+
+    Returns:
+        dict mapping each key to a dict of the aggregates by name, in the
+        order in which the keys were encountered in the iterable
+
+    Raises:
+        ValueError: if an aggregator name is not recognized
+
+    Examples:
+
+    >>> import operator
+    >>> sales = [('east', 10), ('west', 5), ('east', 20), ('west', 7)]
+    >>> region, amount = operator.itemgetter(0), operator.itemgetter(1)
+    >>> aggs = {'n': 'count', 'total': ('sum', amount), 'top': ('max', amount)}
+    >>> result = groupby_aggregate(sales, key=region, aggs=aggs)
+    >>> result  # doctest: +NORMALIZE_WHITESPACE
+    {'east': {'n': 2, 'total': 30, 'top': 20},
+     'west': {'n': 2, 'total': 12, 'top': 7}}
+    >>> mean = {'avg': ('mean', amount)}
+    >>> groupby_aggregate(sales, key=region, aggs=mean)
+    {'east': {'avg': 15.0}, 'west': {'avg': 6.0}}
+    >>> groupby_aggregate(sales, key=region, aggs=mean, partial=True)
+    {'east': {'avg': (30, 2)}, 'west': {'avg': (12, 2)}}
+    >>> parity = lambda n: n % 2
+    >>> aggs = {'n': 'count', 'low': 'min', 'mean': 'mean', 'last': 'last'}
+    >>> groupby_aggregate(range(1000), key=parity, aggs=aggs)[1]
+    {'n': 500, 'low': 1, 'mean': 500.0, 'last': 999}
+    >>> groupby_aggregate(sales, aggs={'x': 'median'})
+    Traceback (most recent call last):
+     ...
+    ValueError: unrecognized aggregator 'median'
+
+    """
+    names, aggregators, getters = _aggregation_plan(aggs)
+    states = {}
+    batches = _common.take_batches(iterable, length=_AGGREGATE_BATCH_SIZE)
+    for batch in batches:
+        groups = collections.defaultdict(list)
+        for k, item in _common.keyed_items(batch, key=key):
+            groups[k].append(item)
+        if len(batch) < _MIN_GROUP_SIZE * len(groups):
+            # with few items per key, the overhead of handling each group
+            # outweighs the gain from aggregating its values in one step,
+            # so aggregate this and all later items one at a time
+            grouped = (
+                (k, item) for k, items in groups.items() for item in items
+            )
+            remaining = itertools.chain.from_iterable(batches)
+            keyed = itertools.chain(
+                grouped,
+                _common.keyed_items(remaining, key=key),
+            )
+            _update_aggregates(states, keyed, aggregators, getters)
+            break
+        _merge_aggregates(states, groups, aggregators, getters)
+    return _aggregation_results(states, names, aggregators, partial)
+
+
+def merge_aggregates(
+        partials: Iterable[Mapping[Hashable, Mapping[str, Any]]],
+        *,
+        aggs: Mapping[str, AggregationSpec],
+        partial: bool = False,
+) -> Dict[Hashable, Dict[str, Any]]:
+    """Return a dict combining partial aggregates from groupby_aggregate().
+
+    Each of the partials must be the result of calling groupby_aggregate()
+    with partial=True and the same aggregate names and aggregators. The
+    getters, if any, are not used, so the aggs argument may be the same
+    as for groupby_aggregate(). Partials are combined from left to right,
+    which matters for the order-dependent aggregators (e.g., first and
+    last).
+
+    Arguments:
+        partials: iterable of partial results of groupby_aggregate()
+
+    Keyword Arguments:
+        aggs: mapping of names to specifications of aggregates
+        partial: whether to return the intermediate states of the
+            aggregates, for further merging (optional; default is False)
+
+    Returns:
+        dict mapping each key to a dict of the aggregates by name, in the
+        order in which the keys were encountered in the partials
+
+    Raises:
+        ValueError: if an aggregator name is not recognized
+
+    Examples:
+
+    >>> import operator
+    >>> shards = [
+    ...     [('east', 10), ('west', 5)],
+    ...     [('east', 20), ('west', 7), ('north', 1)],
+    ... ]
+    >>> region, amount = operator.itemgetter(0), operator.itemgetter(1)
+    >>> aggs = {'n': 'count', 'avg': ('mean', amount), 'top': ('max', amount)}
+    >>> partials = [
+    ...     groupby_aggregate(shard, key=region, aggs=aggs, partial=True)
+    ...     for shard in shards
+    ... ]
+    >>> merge_aggregates(partials, aggs=aggs)  # doctest: +NORMALIZE_WHITESPACE
+    {'east': {'n': 2, 'avg': 15.0, 'top': 20},
+     'west': {'n': 2, 'avg': 6.0, 'top': 7},
+     'north': {'n': 1, 'avg': 1.0, 'top': 1}}
+
+    """
+    names, aggregators, _ = _aggregation_plan(aggs)
+    merges = [aggregator.merge for aggregator in aggregators]
+
+    def combiner(left, right):
+        return [
+            merge(a, b) for merge, a, b in zip(merges, left, right)
+        ]
+
+    ordered = (
+        {
+            k: [state[name] for name in names]
+            for k, state in partial_states.items()
+        }
+        for partial_states in partials
+    )
+    states = merge_groups(ordered, combiner=combiner)
+    return _aggregation_results(states, names, aggregators, partial)
+
+
+def _update_aggregates(states, keyed, aggregators, getters):
+    starts = [aggregator.start for aggregator in aggregators]
+    steps = list(zip(
+        itertools.count(),
+        [aggregator.update for aggregator in aggregators],
+        getters,
+    ))
+    get = states.get
+    for k, item in keyed:
+        state = get(k)
+        if state is None:
+            state = states[k] = [start() for start in starts]
+        for index, update, getter in steps:
+            value = item if getter is None else getter(item)
+            state[index] = update(state[index], value)
+
+
+def _merge_aggregates(states, groups, aggregators, getters):
+    steps = list(zip(
+        [_batch_function(aggregator) for aggregator in aggregators],
+        getters,
+    ))
+    merges = [aggregator.merge for aggregator in aggregators]
+    get = states.get
+    for k, items in groups.items():
+        batch_states = [
+            batch_state(items if getter is None else list(map(getter, items)))
+            for batch_state, getter in steps
+        ]
+        state = get(k)
+        if state is None:
+            states[k] = batch_states
+        else:
+            states[k] = [
+                merge(a, b) for merge, a, b in zip(merges, state, batch_states)
+            ]
+
+
+def _batch_function(aggregator):
+    if aggregator.batch is not None:
+        return aggregator.batch
+    start = aggregator.start
+    update = aggregator.update
+    return lambda values: functools.reduce(update, values, start())
+
+
+def _aggregation_plan(aggs):
+    names = []
+    aggregators = []
+    getters = []
+    for name, spec in aggs.items():
+        getter = None
+        if isinstance(spec, tuple):
+            spec, getter = spec
+        if not isinstance(spec, Aggregator):
+            try:
+                spec = _AGGREGATORS[spec]
+            except (KeyError, TypeError):
+                msg = f'unrecognized aggregator {spec!r}'
+                raise ValueError(msg) from None
+        names.append(name)
+        aggregators.append(spec)
+        getters.append(getter)
+    return names, aggregators, getters
+
+
+def _aggregation_results(states, names, aggregators, partial):
+    if partial:
+        return {
+            k: dict(zip(names, state))
+            for k, state in states.items()
+        }
+    results = [aggregator.result for aggregator in aggregators]
+    return {
+        k: {
+            name: result(value)
+            for name, result, value in zip(names, results, state)
+        }
+        for k, state in states.items()
+    }
+
+
 def unique_just_seen(
         iterable: Iterable[Any],
         *,
@@ -238,6 +785,10 @@ def unique_just_seen(
     return map(next, map(get_group, groups))
 
 
+_RUN_CHUNK_SIZE = 65536
+_LONG_RUN_LENGTH = 16
+
+
 @dataclasses.dataclass(frozen=True)
 class Run:
     """Component class for run-length encoding.
@@ -259,15 +810,34 @@ class Run:
         return itertools.repeat(self.value, self.times)
 
 
-class RunLengths:
-    """A simple run-legnth encoding of an iterable.
+class RunLengths(collections.abc.Sequence):
+    """A compact run-length encoding of an iterable.
 
-    Represents an iterable as a sequence of Run objects, each containing a
+    Represents an iterable as a sequence of runs, each consisting of a
     value and the number of consecutive occurrences of that value in that
     segment of the encoding.
 
+    The values of the runs are kept in a list, and the positions at which
+    the runs end are kept in an array of 64-bit integers, which serves
+    both as the run lengths and as a prefix-sum index. No object is
+    created per run when encoding or decoding; the Run objects produced
+    by the encoding property are created on demand.
+
+    The encoding is also a read-only sequence of the original items:
+    indexing an item by its position in the original iterable takes
+    O(log n) time for n runs, and slicing returns a new RunLengths.
+    Items can be added with append() and extend(), and two encodings can
+    be concatenated with the + operator or extend(), which joins the
+    runs at the boundary if they have the same value.
+
+    Consecutive items are in the same run if they compare equal, as for
+    itertools.groupby().
+
     Arguments:
-        iterable: the object to be run-length encoded
+        iterable: the object to be run-length encoded (optional; default
+            is an empty encoding)
+
+    Examples:
 
     >>> data = [1, 1, 1, 3, 3, 3, 3, 2, 2, 2]
     >>> runs = RunLengths(data)
@@ -275,24 +845,391 @@ class RunLengths:
     [Run(value=1, times=3), Run(value=3, times=4), Run(value=2, times=3)]
     >>> list(runs.expand)
     [1, 1, 1, 3, 3, 3, 3, 2, 2, 2]
+    >>> len(runs), runs.num_runs
+    (10, 3)
+    >>> runs[3], runs[-1]
+    (3, 2)
+    >>> runs[2:8]
+    RunLengths([(1, 1), (3, 4), (2, 1)])
+    >>> runs.extend([2, 2, 5])
+    >>> runs.append(5)
+    >>> runs
+    RunLengths([(1, 3), (3, 4), (2, 5), (5, 2)])
+    >>> RunLengths('aab') + RunLengths('bcc')
+    RunLengths([('a', 2), ('b', 2), ('c', 2)])
+    >>> aba = RunLengths('aba')
+    >>> aba.extend(aba)
+    >>> aba
+    RunLengths([('a', 1), ('b', 1), ('a', 2), ('b', 1), ('a', 1)])
+    >>> runs[14]
+    Traceback (most recent call last):
+     ...
+    IndexError: RunLengths index out of range
 
     """
+    __slots__ = ('_values', '_ends')
+
+    def __init__(self, iterable: Iterable[Any] = ()) -> None:
+        self._values = []
+        self._ends = array.array('q')
+        self.extend(iterable)
+
+    @classmethod
+    def _from_runs(
+            cls,
+            values: List[Any],
+            ends: array.array,
+    ) -> 'RunLengths':
+        instance = cls.__new__(cls)
+        instance._values = values
+        instance._ends = ends
+        return instance
+
+    def __repr__(self):
+        runs = list(zip(self._values, self.counts))
+        return f'{type(self).__name__}({runs!r})'
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, RunLengths):
+            return NotImplemented
+        return self._ends == other._ends and self._values == other._values
+
+    def __len__(self) -> int:
+        ends = self._ends
+        return ends[-1] if ends else 0
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.expand
+
+    def __reversed__(self) -> Iterator[Any]:
+        return itertools.chain.from_iterable(map(
+            itertools.repeat,
+            reversed(self._values),
+            reversed(list(self.counts)),
+        ))
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self._values
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return self._slice(index)
+        ends = self._ends
+        size = ends[-1] if ends else 0
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError('RunLengths index out of range')
+        return self._values[bisect.bisect_right(ends, index)]
+
+    def _slice(self, index: slice) -> 'RunLengths':
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            return type(self)(map(self.__getitem__, range(start, stop, step)))
+        if start >= stop:
+            return type(self)()
+        ends = self._ends
+        first = bisect.bisect_right(ends, start)
+        last = bisect.bisect_right(ends, stop - 1)
+        sliced_ends = array.array('q', map(
+            operator.sub,
+            ends[first:last],
+            itertools.repeat(start),
+        ))
+        sliced_ends.append(stop - start)
+        return self._from_runs(self._values[first:last + 1], sliced_ends)
+
+    def __add__(self, other: Any) -> 'RunLengths':
+        if not isinstance(other, RunLengths):
+            return NotImplemented
+        result = self._from_runs(
+            list(self._values),
+            array.array('q', self._ends),
+        )
+        result.extend(other)
+        return result
 
-    def __init__(self, iterable: Iterable[Any]) -> None:
-        self._encoding = [
-            Run(value=value, times=len(list(run)))
-            for value, run in itertools.groupby(iterable)
-        ]
+    def __iadd__(self, other: Any) -> 'RunLengths':
+        if not isinstance(other, RunLengths):
+            return NotImplemented
+        self.extend(other)
+        return self
+
+    @property
+    def num_runs(self) -> int:
+        """Number of runs in the encoding."""
+        return len(self._values)
+
+    @property
+    def values(self) -> Iterator[Any]:
+        """Iterator of the value of each run."""
+        return iter(self._values)
+
+    @property
+    def counts(self) -> Iterator[int]:
+        """Iterator of the number of items in each run."""
+        ends = self._ends
+        return map(operator.sub, ends, itertools.chain((0,), ends))
 
     @property
     def encoding(self) -> Iterator[Run]:
-        """Iterator of the run-length encoding segmnents."""
-        for run in self._encoding:
-            yield run
+        """Iterator of the run-length encoding segments."""
+        return map(Run, self._values, self.counts)
 
     @property
     def expand(self) -> Iterator[Any]:
         """Iterator of the values of the original iterable."""
         return itertools.chain.from_iterable(
-            run.expansion for run in self.encoding
+            map(itertools.repeat, self._values, self.counts)
         )
+
+    def append(self, value: Any) -> None:
+        """Add an item to the end of the encoding.
+
+        Arguments:
+            value: item to be added
+
+        """
+        values = self._values
+        ends = self._ends
+        if values and values[-1] == value:
+            ends[-1] += 1
+        else:
+            values.append(value)
+            ends.append(ends[-1] + 1 if ends else 1)
+
+    def extend(self, iterable: Iterable[Any]) -> None:
+        """Add the items of an iterable to the end of the encoding.
+
+        The iterable is encoded in chunks. The runs in each chunk are
+        found either with itertools.groupby(), or, if the previous chunk
+        had short runs, by comparing neighboring items using only built-in
+        functions and the itertools module, which avoids any Python-level
+        work per run.
+        If the iterable is another RunLengths, its runs are copied without
+        being expanded.
+
+        Arguments:
+            iterable: object with items to be added
+
+        """
+        if isinstance(iterable, RunLengths):
+            self._extend_runs(iterable._values, iterable._ends)
+            return
+        values = self._values
+        ends = self._ends
+        total = ends[-1] if ends else 0
+        long_runs = True
+        chunks = _common.take_batches(iterable, length=_RUN_CHUNK_SIZE)
+        for chunk in chunks:
+            first = chunk[0]
+            if values and values[-1] == first:
+                ends.pop()
+            else:
+                values.append(first)
+            num_runs = len(ends)
+            if long_runs:
+                # itertools.groupby() does the least work per item, but
+                # has some overhead per run
+                runs = itertools.groupby(chunk)
+                end = total + len(list(next(runs)[1]))
+                ends.append(end)
+                for value, run in runs:
+                    values.append(value)
+                    end += len(list(run))
+                    ends.append(end)
+            else:
+                starts = array.array('q', itertools.compress(
+                    itertools.count(1),
+                    map(operator.ne, chunk, itertools.islice(chunk, 1, None)),
+                ))
+                values.extend(map(chunk.__getitem__, starts))
+                ends.extend(map(operator.add, starts, itertools.repeat(total)))
+                ends.append(total + len(chunk))
+            total += len(chunk)
+            num_runs = len(ends) - num_runs
+            long_runs = len(chunk) >= _LONG_RUN_LENGTH * num_runs
+
+    def _extend_runs(
+            self,
+            other_values: List[Any],
+            other_ends: array.array,
+    ) -> None:
+        if not other_values:
+            return
+        # copy the values (the ends are copied when shifted below) before
+        # changing this encoding, in case the other encoding is this one
+        other_values = list(other_values)
+        values = self._values
+        ends = self._ends
+        total = ends[-1] if ends else 0
+        shifted = array.array('q', map(
+            operator.add,
+            other_ends,
+            itertools.repeat(total),
+        ))
+        if values and values[-1] == other_values[0]:
+            ends.pop()
+            values.extend(itertools.islice(other_values, 1, None))
+        else:
+            values.extend(other_values)
+        ends.extend(shifted)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+@dataclasses.dataclass(frozen=True)
+class Aggregator:
+    """Specification of a mergeable aggregate, for groupby_aggregate().
+
+    An aggregate is computed by creating a starting state, updating the
+    state with each value in turn, and finally converting the state to
+    the result. Two states computed from different values can be merged
+    into the state for all of those values, which allows aggregates to
+    be computed separately for parts of the data and combined later.
+
+    States should be plain Python objects (e.g., numbers or tuples), so
+    that they can be pickled, and update() and merge() should return new
+    states rather than modify their arguments.
+
+    The items are processed in batches, and the optional batch callable
+    computes the state for a non-empty list of values in one step. It is
+    much faster when it can use built-in functions (e.g., len(), sum()
+    or max()). If it is not specified, the state for a batch of values is
+    computed by calling update() for each value in turn.
+
+    Attributes:
+        start: callable with no arguments returning a starting state
+        update: two-argument callable returning the state updated with
+            a value
+        merge: two-argument callable returning the merger of two states
+        result: single-argument callable returning the result for a state
+            (optional; defaults to returning the state itself)
+        batch: single-argument callable returning the state for a list of
+            values (optional; defaults to None, signifying the state is
+            computed by calling update() for each value)
+
+    Examples:
+
+    >>> span = Aggregator(
+    ...     start=lambda: (None, None),
+    ...     update=lambda state, value: (
+    ...         value if state[0] is None else state[0],
+    ...         value,
+    ...     ),
+    ...     merge=lambda left, right: (left[0], right[1]),
+    ...     result=lambda state: f'{state[0]}..{state[1]}',
+    ... )
+    >>> groupby_aggregate('abcdef', key=str.isupper, aggs={'span': span})
+    {False: {'span': 'a..f'}}
+
+    """
+    start: Callable[[], Any]
+    update: Callable[[Any, Any], Any]
+    merge: Callable[[Any, Any], Any]
+    result: Callable[[Any], Any] = _identity
+    batch: Optional[Callable[[List[Any]], Any]] = None
+
+
+def _count_update(state: int, value: Any) -> int:
+    return state + 1
+
+
+def _min_update(state: Any, value: Any) -> Any:
+    return value if state is _NO_VALUE or value < state else state
+
+
+def _min_merge(left: Any, right: Any) -> Any:
+    return left if right is _NO_VALUE else _min_update(left, right)
+
+
+def _max_update(state: Any, value: Any) -> Any:
+    return value if state is _NO_VALUE or value > state else state
+
+
+def _max_merge(left: Any, right: Any) -> Any:
+    return left if right is _NO_VALUE else _max_update(left, right)
+
+
+def _mean_update(state: Tuple[Any, int], value: Any) -> Tuple[Any, int]:
+    return state[0] + value, state[1] + 1
+
+
+def _mean_merge(
+        left: Tuple[Any, int],
+        right: Tuple[Any, int],
+) -> Tuple[Any, int]:
+    return left[0] + right[0], left[1] + right[1]
+
+
+def _mean_result(state: Tuple[Any, int]) -> float:
+    return state[0] / state[1]
+
+
+def _mean_batch(values: List[Any]) -> Tuple[Any, int]:
+    return sum(values), len(values)
+
+
+def _first_update(state: Any, value: Any) -> Any:
+    return value if state is _NO_VALUE else state
+
+
+def _last_update(state: Any, value: Any) -> Any:
+    return value
+
+
+def _last_merge(left: Any, right: Any) -> Any:
+    return left if right is _NO_VALUE else right
+
+
+_no_value = functools.partial(_identity, _NO_VALUE)
+_first = operator.itemgetter(0)
+_last = operator.itemgetter(-1)
+
+_AGGREGATORS = {
+    'count': Aggregator(
+        start=int,
+        update=_count_update,
+        merge=operator.add,
+        batch=len,
+    ),
+    'sum': Aggregator(
+        start=int,
+        update=operator.add,
+        merge=operator.add,
+        batch=sum,
+    ),
+    'min': Aggregator(
+        start=_no_value,
+        update=_min_update,
+        merge=_min_merge,
+        batch=min,
+    ),
+    'max': Aggregator(
+        start=_no_value,
+        update=_max_update,
+        merge=_max_merge,
+        batch=max,
+    ),
+    'mean': Aggregator(
+        start=functools.partial(tuple, (0, 0)),
+        update=_mean_update,
+        merge=_mean_merge,
+        result=_mean_result,
+        batch=_mean_batch,
+    ),
+    'first': Aggregator(
+        start=_no_value,
+        update=_first_update,
+        merge=_first_update,
+        batch=_first,
+    ),
+    'last': Aggregator(
+        start=_no_value,
+        update=_last_update,
+        merge=_last_merge,
+        batch=_last,
+    ),
+}
@@ -1,17 +1,32 @@
-"""Functions for joins between mappings on keys.
+"""Functions for joins between mappings or iterables of rows on keys.
 
 """
+import collections.abc
+import itertools
+import operator
+
 from typing import (
     Any,
+    Dict,
     Hashable,
+    Iterable,
     Iterator,
+    List,
     Mapping,
+    Optional,
     Tuple,
     TypeVar,
 )
 
+import litecore.irecipes.common as _common
+import litecore.irecipes.external as _external
+
+from litecore.irecipes.typealiases import KeyFunc
+
 KT = TypeVar('KT', int, str, Hashable)
 
+_first = operator.itemgetter(0)
+
 
 def inner_join(
         first: Mapping[KT, Any],
@@ -122,3 +137,400 @@ def left_join2(
     get_right = right.get
     for key, left_value in left.items():
         yield (key, left_value, get_right(key, default))
+
+
+_HOW = ('inner', 'left', 'right', 'outer')
+
+
+def hash_join(
+        left: Iterable[Any],
+        right: Iterable[Any],
+        *,
+        key: Optional[KeyFunc] = None,
+        right_key: Optional[KeyFunc] = None,
+        how: str = 'inner',
+        build: Optional[str] = None,
+        default: Any = None,
+) -> Iterator[Tuple[Any, Any, Any]]:
+    """Join two iterables of rows on key values using a hash table.
+
+    The rows of one side (the build side) are loaded into a dict of lists
+    of rows by key, and the rows of the other side (the probe side) are
+    streamed past it. Only the build side must fit in memory. Every pair of
+    rows with equal keys is joined, so keys may occur many times on both
+    sides. The key values must be hashable.
+
+    The how argument selects which unmatched rows are also yielded, paired
+    with the default value: 'inner' (none), 'left', 'right' or 'outer'
+    (both sides). Joined rows are yielded in the order of the probe side,
+    followed by any unmatched rows of the build side.
+
+    If build is None, the build side is the smaller of the two sides if
+    both have a len(), and otherwise the right side (or the left side, if
+    only it has a len()).
+
+    Arguments:
+        left: iterable of left rows
+        right: iterable of right rows
+
+    Keyword Arguments:
+        key: single-argument callable giving the key of a left row
+            (optional; default is None, signifying the row itself)
+        right_key: single-argument callable giving the key of a right row
+            (optional; default is None, signifying the same as key)
+        how: 'inner', 'left', 'right' or 'outer' (optional; default is
+            'inner')
+        build: 'left', 'right' or None (optional; default is None,
+            signifying the side is chosen as described above)
+        default: value paired with unmatched rows (optional; default is
+            None)
+
+    Returns:
+        iterator of tuples of the key, the left row and the right row
+
+    Raises:
+        ValueError: if how or build is not recognized
+
+    Examples:
+
+    >>> people = [(1, 'Alice'), (2, 'Bob'), (3, 'Charlie')]
+    >>> pets = [(1, 'cat'), (3, 'dog'), (3, 'fish'), (4, 'newt')]
+    >>> first = lambda row: row[0]
+    >>> for row in hash_join(iter(people), iter(pets), key=first):
+    ...     print(row)
+    (1, (1, 'Alice'), (1, 'cat'))
+    (3, (3, 'Charlie'), (3, 'dog'))
+    (3, (3, 'Charlie'), (3, 'fish'))
+    >>> for row in hash_join(people, pets, key=first, how='outer'):  # builds on people
+    ...     print(row)
+    (1, (1, 'Alice'), (1, 'cat'))
+    (3, (3, 'Charlie'), (3, 'dog'))
+    (3, (3, 'Charlie'), (3, 'fish'))
+    (4, None, (4, 'newt'))
+    (2, (2, 'Bob'), None)
+    >>> hash_join(people, pets, how='cross')
+    Traceback (most recent call last):
+     ...
+    ValueError: how must be 'inner', 'left', 'right' or 'outer'
+
+    """
+    _check_how(how)
+    if right_key is None:
+        right_key = key
+    if build is None:
+        build = _build_side(left, right)
+    elif build not in ('left', 'right'):
+        msg = f"build must be 'left', 'right' or None"
+        raise ValueError(msg)
+    return _hash_join(left, right, key, right_key, how, build, default)
+
+
+def merge_join(
+        left: Iterable[Any],
+        right: Iterable[Any],
+        *,
+        key: Optional[KeyFunc] = None,
+        right_key: Optional[KeyFunc] = None,
+        how: str = 'inner',
+        default: Any = None,
+) -> Iterator[Tuple[Any, Any, Any]]:
+    """Join two iterables of rows which are sorted on their key values.
+
+    Both iterables must already be sorted in ascending order of their key
+    values. They are read in step, and only the rows of the right side for
+    the current key are held in memory, so memory use does not grow with
+    the number of rows. Every pair of rows with equal keys is joined. The
+    key values must be comparable, but need not be hashable.
+
+    The how and default arguments are as for hash_join(). Joined and
+    unmatched rows are yielded in sorted order of their keys.
+
+    Arguments:
+        left: iterable of left rows, sorted by key
+        right: iterable of right rows, sorted by right_key
+
+    Keyword Arguments:
+        key: single-argument callable giving the key of a left row
+            (optional; default is None, signifying the row itself)
+        right_key: single-argument callable giving the key of a right row
+            (optional; default is None, signifying the same as key)
+        how: 'inner', 'left', 'right' or 'outer' (optional; default is
+            'inner')
+        default: value paired with unmatched rows (optional; default is
+            None)
+
+    Returns:
+        iterator of tuples of the key, the left row and the right row
+
+    Raises:
+        ValueError: if how is not recognized
+
+    Examples:
+
+    >>> left = [1, 2, 2, 4]
+    >>> right = [2, 2, 3, 4]
+    >>> list(merge_join(left, right))
+    [(2, 2, 2), (2, 2, 2), (2, 2, 2), (2, 2, 2), (4, 4, 4)]
+    >>> list(merge_join(left, right, how='outer', default='-'))
+    [(1, 1, '-'), (2, 2, 2), (2, 2, 2), (2, 2, 2), (2, 2, 2), (3, '-', 3), (4, 4, 4)]
+    >>> words = ['a', 'bb', 'cc', 'dddd']
+    >>> list(merge_join(words, [2, 4], key=len, right_key=int, how='right'))
+    [(2, 'bb', 2), (2, 'cc', 2), (4, 'dddd', 4)]
+
+    """
+    _check_how(how)
+    if right_key is None:
+        right_key = key
+    return _merge_join(left, right, key, right_key, how, default)
+
+
+def partitioned_join(
+        left: Iterable[Any],
+        right: Iterable[Any],
+        *,
+        key: Optional[KeyFunc] = None,
+        right_key: Optional[KeyFunc] = None,
+        how: str = 'inner',
+        default: Any = None,
+        partitions: int = 64,
+        directory: Optional[str] = None,
+        serializer: str = 'pickle',
+) -> Iterator[Tuple[Any, Any, Any]]:
+    """Join two iterables of rows too large to fit in memory.
+
+    Both sides are split into partitions by the hash of their key values,
+    and the partitions are written to anonymous temporary files together
+    with the key values. Matching rows always fall in the same partition,
+    so each pair of partitions is then joined with an in-memory hash join
+    built on the right partition. Only one right partition must fit in
+    memory at once, so the number of partitions should be chosen so that
+    the right side divided by the number of partitions fits.
+
+    The key values must be hashable, and both the rows and the key values
+    must be serializable by the serializer, which is as for
+    external_sorted(). The temporary files are deleted when the returned
+    iterator is exhausted or closed.
+
+    The how and default arguments are as for hash_join(). Rows are
+    yielded partition by partition, so their order is arbitrary.
+
+    Arguments:
+        left: iterable of left rows
+        right: iterable of right rows
+
+    Keyword Arguments:
+        key: single-argument callable giving the key of a left row
+            (optional; default is None, signifying the row itself)
+        right_key: single-argument callable giving the key of a right row
+            (optional; default is None, signifying the same as key)
+        how: 'inner', 'left', 'right' or 'outer' (optional; default is
+            'inner')
+        default: value paired with unmatched rows (optional; default is
+            None)
+        partitions: positive number of partitions (optional; default is
+            64)
+        directory: directory for the temporary files (optional; default
+            is None, signifying the tempfile module default)
+        serializer: 'pickle' or 'marshal' (optional; default is 'pickle')
+
+    Returns:
+        iterator of tuples of the key, the left row and the right row
+
+    Raises:
+        ValueError: if how is not recognized, or the number of partitions
+            is not positive; or, once iteration starts, if the serializer
+            is not recognized
+
+    Examples:
+
+    >>> orders = [(n % 7, f'order {n}') for n in range(20)]
+    >>> customers = [(c, f'customer {c}') for c in range(0, 10, 2)]
+    >>> first = lambda row: row[0]
+    >>> rows = partitioned_join(orders, customers, key=first, partitions=3)
+    >>> rows = sorted(rows)
+    >>> len(rows), rows[0]
+    (11, (0, (0, 'order 0'), (0, 'customer 0')))
+    >>> rows = partitioned_join(orders, customers, key=first, how='outer',
+    ...                         partitions=3, serializer='marshal')
+    >>> sorted(row for row in rows if row[1] is None)
+    [(8, None, (8, 'customer 8'))]
+
+    """
+    _check_how(how)
+    if right_key is None:
+        right_key = key
+    if partitions < 1:
+        msg = f'partitions must be positive'
+        raise ValueError(msg)
+    return _partitioned_join(
+        left,
+        right,
+        key,
+        right_key,
+        how,
+        default,
+        partitions,
+        directory,
+        serializer,
+    )
+
+
+def _check_how(how: str) -> None:
+    if how not in _HOW:
+        msg = f"how must be 'inner', 'left', 'right' or 'outer'"
+        raise ValueError(msg)
+
+
+def _build_side(left: Iterable[Any], right: Iterable[Any]) -> str:
+    if isinstance(left, collections.abc.Sized):
+        if not isinstance(right, collections.abc.Sized):
+            return 'left'
+        if len(left) < len(right):
+            return 'left'
+    return 'right'
+
+
+def _build_table(keyed: Iterable[Tuple[Any, Any]]) -> Dict[Any, List[Any]]:
+    table = {}
+    get = table.get
+    for k, row in keyed:
+        rows = get(k)
+        if rows is None:
+            table[k] = [row]
+        else:
+            rows.append(row)
+    return table
+
+
+def _probe(
+        table: Dict[Any, List[Any]],
+        probe: Iterable[Tuple[Any, Any]],
+        keep_probe: bool,
+        keep_build: bool,
+        swapped: bool,
+        default: Any,
+) -> Iterator[Tuple[Any, Any, Any]]:
+    # rows are yielded as (key, probe row, build row), or as (key, build
+    # row, probe row) if swapped, so that the left row always comes first
+    get = table.get
+    matched = set() if keep_build else None
+    for k, row in probe:
+        rows = get(k)
+        if rows is None:
+            if keep_probe:
+                yield (k, default, row) if swapped else (k, row, default)
+            continue
+        if matched is not None:
+            matched.add(k)
+        if swapped:
+            for other in rows:
+                yield k, other, row
+        else:
+            for other in rows:
+                yield k, row, other
+    if keep_build:
+        for k, rows in table.items():
+            if k not in matched:
+                for other in rows:
+                    yield (k, other, default) if swapped else (k, default, other)
+
+
+def _hash_join(left, right, key, right_key, how, build, default):
+    keep_left = how in ('left', 'outer')
+    keep_right = how in ('right', 'outer')
+    if build == 'right':
+        table = _build_table(_common.keyed_items(right, key=right_key))
+        probe = _common.keyed_items(left, key=key)
+        yield from _probe(table, probe, keep_left, keep_right, False, default)
+    else:
+        table = _build_table(_common.keyed_items(left, key=key))
+        probe = _common.keyed_items(right, key=right_key)
+        yield from _probe(table, probe, keep_right, keep_left, True, default)
+
+
+def _merge_join(left, right, key, right_key, how, default):
+    keep_left = how in ('left', 'outer')
+    keep_right = how in ('right', 'outer')
+    left_groups = itertools.groupby(left, key=key)
+    right_groups = itertools.groupby(right, key=right_key)
+    left_group = next(left_groups, None)
+    right_group = next(right_groups, None)
+    while left_group is not None and right_group is not None:
+        left_value, left_rows = left_group
+        right_value, right_rows = right_group
+        if left_value < right_value:
+            if keep_left:
+                for row in left_rows:
+                    yield left_value, row, default
+            left_group = next(left_groups, None)
+        elif right_value < left_value:
+            if keep_right:
+                for row in right_rows:
+                    yield right_value, default, row
+            right_group = next(right_groups, None)
+        else:
+            right_rows = list(right_rows)
+            for row in left_rows:
+                for other in right_rows:
+                    yield left_value, row, other
+            left_group = next(left_groups, None)
+            right_group = next(right_groups, None)
+    if keep_left:
+        while left_group is not None:
+            left_value, left_rows = left_group
+            for row in left_rows:
+                yield left_value, row, default
+            left_group = next(left_groups, None)
+    if keep_right:
+        while right_group is not None:
+            right_value, right_rows = right_group
+            for row in right_rows:
+                yield right_value, default, row
+            right_group = next(right_groups, None)
+
+
+def _partitioned_join(
+        left,
+        right,
+        key,
+        right_key,
+        how,
+        default,
+        partitions,
+        directory,
+        serializer,
+):
+    keep_left = how in ('left', 'outer')
+    keep_right = how in ('right', 'outer')
+    left_parts = []
+    right_parts = []
+    try:
+        # the rows are spilled as (key, row) pairs, partitioned on the key
+        left_parts = _external.external_partition(
+            _common.keyed_items(left, key=key),
+            key=_first,
+            partitions=partitions,
+            directory=directory,
+            serializer=serializer,
+        )
+        right_parts = _external.external_partition(
+            _common.keyed_items(right, key=right_key),
+            key=_first,
+            partitions=partitions,
+            directory=directory,
+            serializer=serializer,
+        )
+        for left_part, right_part in zip(left_parts, right_parts):
+            table = _build_table(right_part)
+            yield from _probe(
+                table,
+                left_part,
+                keep_left,
+                keep_right,
+                False,
+                default,
+            )
+            del table
+    finally:
+        for part in itertools.chain(left_parts, right_parts):
+            part.close()
@@ -1,19 +1,26 @@
 """Various functions which modify one or more iterables.
 
 """
+import collections
 import itertools
+import pickle
+import tempfile
+import weakref
 
 from typing import (
     Any,
     Callable,
     Iterable,
     Iterator,
+    List,
     Optional,
+    Sequence,
     Tuple,
     Union,
 )
 
 import litecore.irecipes.common as _common
+import litecore.irecipes.subsequences as _subsequences
 
 from litecore.sentinels import NO_VALUE as _NO_VALUE
 
@@ -96,6 +103,10 @@ def partition(
     Returns two iteators, one for which the condition is False, and one for
     which the condition is True.
 
+    The condition is evaluated twice for each item (once by each iterator),
+    which is fastest for simple conditions. Use partition_by() to evaluate
+    an expensive condition only once per item.
+
     The condition is specified by the required keyword argument by, which just
     be a callable returning True or False based upon the value of one argument.
     It will be called for each item in the iterable in sequence.
@@ -130,6 +141,228 @@ def partition(
     return (itertools.filterfalse(by, false_it), filter(by, true_it))
 
 
+def partition_by(
+        iterable: Iterable[Any],
+        key: KeyFunc,
+        *,
+        buckets: Union[int, Sequence[Any]],
+        maxbuffer: Optional[int] = None,
+        directory: Optional[str] = None,
+) -> Tuple[Iterator[Any], ...]:
+    """Split an iterable into several iterators based upon a key function.
+
+    Returns one iterator for each bucket. The key function is called once
+    for each item, and the item is routed to the iterator for the bucket
+    equal to the key. Items whose key is not one of the buckets are
+    discarded. If buckets is an int n, the buckets are range(n).
+
+    Like itertools.tee(), items read from the iterable for one iterator
+    are buffered until the iterators for the other buckets reach them, and
+    the iterators must not be consumed from different threads. Items are
+    no longer buffered for an iterator which is closed (or garbage
+    collected).
+
+    By default, as for itertools.tee(), the buffers are not limited, so
+    an iterator which is far behind the others (or never consumed) can
+    use a lot of memory. If maxbuffer is specified, no more than maxbuffer
+    items of a bucket are held in memory: whenever its buffer exceeds
+    maxbuffer items, they are pickled as one block to an anonymous
+    temporary file, and read back a block at a time when its iterator
+    reaches them. Items are still read from the iterable only as they are
+    needed, so infinite iterables can be partitioned. Buffered items must
+    be picklable if maxbuffer is specified.
+
+    Arguments:
+        iterable: object for which items are to be partitioned
+        key: single-argument callable returning the bucket of an item
+
+    Keyword Arguments:
+        buckets: number of buckets, or sequence of distinct hashable key
+            values for each bucket
+        maxbuffer: positive number of items of one bucket to hold in
+            memory before writing them to a temporary file (optional;
+            default is None, signifying no limit)
+        directory: directory in which to create temporary files
+            (optional; default is None, signifying the tempfile module
+            default)
+
+    Returns:
+        tuple of iterators over the items of each bucket, in the order of
+        the buckets
+
+    Raises:
+        ValueError: if the number of buckets is negative, the bucket key
+            values are not distinct or maxbuffer is not positive
+
+    Examples:
+
+    >>> low, mid, high = partition_by(range(10), lambda n: n // 4, buckets=3)
+    >>> list(high), list(mid), list(low)
+    ([8, 9], [4, 5, 6, 7], [0, 1, 2, 3])
+    >>> words = 'the quick brown fox jumps over the lazy dog'.split()
+    >>> vowel, consonant = partition_by(
+    ...     words,
+    ...     lambda word: word[0] in 'aeiou',
+    ...     buckets=(True, False),
+    ... )
+    >>> list(consonant), list(vowel)
+    (['the', 'quick', 'brown', 'fox', 'jumps', 'the', 'lazy', 'dog'], ['over'])
+    >>> evens, odds = partition_by(range(100), lambda n: n % 2, buckets=2,
+    ...                            maxbuffer=10)
+    >>> sum(odds), sum(evens)
+    (2500, 2450)
+    >>> evens, odds = partition_by(itertools.count(), lambda n: n % 2,
+    ...                            buckets=2, maxbuffer=10)
+    >>> sum(itertools.islice(evens, 1000))
+    999000
+    >>> list(itertools.islice(odds, 5))
+    [1, 3, 5, 7, 9]
+    >>> partition_by(range(5), bool, buckets=(True, 1))
+    Traceback (most recent call last):
+     ...
+    ValueError: duplicate bucket 1
+
+    """
+    if isinstance(buckets, int):
+        if buckets < 0:
+            msg = f'number of buckets must be non-negative'
+            raise ValueError(msg)
+        buckets = range(buckets)
+    if maxbuffer is not None and maxbuffer < 1:
+        msg = f'maxbuffer must be positive'
+        raise ValueError(msg)
+    router = _PartitionRouter(iterable, key, buckets, maxbuffer, directory)
+    partitions = tuple(
+        _partition_stream(router, i) for i in range(len(router.buffers))
+    )
+    for i, partition in enumerate(partitions):
+        # a generator which was never started does not run its finally
+        # clause when it is garbage collected
+        weakref.finalize(partition, router.detach, i)
+    return partitions
+
+
+def _partition_stream(router: '_PartitionRouter', index: int) -> Iterator[Any]:
+    buffer = router.buffers[index]
+    popleft = buffer.popleft
+    fill = router.fill
+    try:
+        while buffer or fill(index):
+            yield popleft()
+    finally:
+        router.detach(index)
+
+
+class _PartitionRouter:
+    # buffers of detached iterators are replaced by None
+    __slots__ = ('_source', '_key', '_lookup', 'buffers')
+
+    def __init__(
+            self,
+            iterable: Iterable[Any],
+            key: KeyFunc,
+            buckets: Sequence[Any],
+            maxbuffer: Optional[int],
+            directory: Optional[str],
+    ) -> None:
+        lookup = {}
+        for i, value in enumerate(buckets):
+            if value in lookup:
+                msg = f'duplicate bucket {value!r}'
+                raise ValueError(msg)
+            lookup[value] = i
+        self._source = iter(iterable)
+        self._key = key
+        self._lookup = lookup
+        if maxbuffer is None:
+            self.buffers: List[Any] = [collections.deque() for _ in lookup]
+        else:
+            self.buffers = [
+                _SpillQueue(maxbuffer, directory) for _ in lookup
+            ]
+
+    def fill(self, index: int) -> bool:
+        key = self._key
+        lookup = self._lookup.get
+        buffers = self.buffers
+        for item in self._source:
+            i = lookup(key(item))
+            if i is None:
+                continue
+            buffer = buffers[i]
+            if buffer is None:
+                continue
+            buffer.append(item)
+            if i == index:
+                return True
+        return False
+
+    def detach(self, index: int) -> None:
+        self.buffers[index] = None
+
+
+class _SpillQueue:
+    # first-in, first-out queue holding at most limit items in memory, plus
+    # one block read back from the file; the oldest items are those in the
+    # block read back, then those in the file, then the recent items
+    __slots__ = (
+        '_limit',
+        '_directory',
+        '_file',
+        '_offsets',
+        '_block',
+        '_recent',
+        '_spilled',
+    )
+
+    def __init__(self, limit: int, directory: Optional[str]) -> None:
+        self._limit = limit
+        self._directory = directory
+        self._file = None
+        self._offsets = collections.deque()
+        self._block = collections.deque()
+        self._recent = collections.deque()
+        self._spilled = 0
+
+    def __len__(self) -> int:
+        return len(self._block) + self._spilled + len(self._recent)
+
+    def append(self, item: Any) -> None:
+        recent = self._recent
+        recent.append(item)
+        if len(recent) > self._limit:
+            self._write_block(list(recent))
+            self._spilled += len(recent)
+            recent.clear()
+
+    def popleft(self) -> Any:
+        block = self._block
+        if not block and self._offsets:
+            block.extend(self._read_block())
+            self._spilled -= len(block)
+        if block:
+            return block.popleft()
+        return self._recent.popleft()
+
+    def _write_block(self, block: List[Any]) -> None:
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(dir=self._directory)
+        file = self._file
+        file.seek(0, 2)
+        self._offsets.append(file.tell())
+        pickle.dump(block, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _read_block(self) -> List[Any]:
+        file = self._file
+        file.seek(self._offsets.popleft())
+        block = pickle.load(file)
+        if not self._offsets:
+            # every block has been read back, so the file can be reused
+            file.seek(0)
+            file.truncate()
+        return block
+
+
 def split(
         iterable: Iterable[Any],
         *,
@@ -273,6 +506,11 @@ def replace_multi(
     Another difference is that if the new value is a callable, it must return
     an iterable.
 
+    If the condition is a container of hashable values, matches are found
+    with a precompiled automaton (see replace_subsequences(), which also
+    handles several patterns at once) rather than by comparing a window
+    of items at every position.
+
     Arguments:
         iterable: object with items to be replaced
         condition: either a value or a single-argument callable
@@ -317,6 +555,9 @@ def replace_multi(
     [-1]
 
     """
+    if maxreplacements is not None and maxreplacements < 1:
+        msg = f'maxreplacements must be positive'
+        raise ValueError(msg)
     if callable(condition):
         if items is None:
             msg = f'must provide number of items if the condition is callable'
@@ -340,25 +581,31 @@ def replace_multi(
             except TypeError as err:
                 msg = f'condition {condition!r} is not a container'
                 raise TypeError(msg) from err
+        try:
+            matcher = _subsequences.SubsequenceMatcher([condition])
+        except (TypeError, ValueError):
+            # unhashable or empty condition
+            pass
+        else:
+            return matcher.replace(
+                iterable,
+                new_value,
+                maxreplacements=maxreplacements,
+            )
 
         def matches(values):
             return tuple(values) == tuple(condition)
 
-    if callable(new_value):
-        def replace_with(values):
-            return new_value(*values)
-    else:
-        if isinstance(new_value, (str, bytes, bytearray)):
-            replacement = (new_value,)
-        else:
-            try:
-                replacement = tuple(new_value)
-            except TypeError:
-                replacement = (new_value,)
+    return _replace_windows(
+        iterable,
+        items,
+        matches,
+        _subsequences.replacer(new_value),
+        maxreplacements,
+    )
 
-        def replace_with(values):
-            return replacement
 
+def _replace_windows(iterable, items, matches, replace_with, maxreplacements):
     windows = _common.window(items, pad(iterable, _NO_VALUE, times=items - 1))
     replacements = 0
     for values in windows:
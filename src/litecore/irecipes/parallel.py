@@ -0,0 +1,286 @@
+"""Functions for mapping over iterables using pools of workers.
+
+"""
+import collections
+import concurrent.futures
+import itertools
+import os
+
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+
+import litecore.irecipes.common as _common
+
+_EXECUTORS = {
+    'thread': concurrent.futures.ThreadPoolExecutor,
+    'process': concurrent.futures.ProcessPoolExecutor,
+}
+
+
+def _map_batch(func: Callable[[Any], Any], batch: Iterable[Any]) -> List[Any]:
+    return list(map(func, batch))
+
+
+def _flatmap_batch(
+        func: Callable[[Any], Iterable[Any]],
+        batch: Iterable[Any],
+) -> List[Any]:
+    return list(itertools.chain.from_iterable(map(func, batch)))
+
+
+def parallel_map(
+        func: Callable[[Any], Any],
+        iterable: Iterable[Any],
+        *,
+        batch_size: int,
+        executor: Union[str, concurrent.futures.Executor] = 'thread',
+        ordered: bool = True,
+        max_in_flight: Optional[int] = None,
+        max_workers: Optional[int] = None,
+) -> Iterator[Any]:
+    """Return iterator applying a function to items of an iterable in parallel.
+
+    Splits the iterable into batches using take_batches(), and submits
+    each batch to a pool of workers from the concurrent.futures standard
+    library module. Batching amortizes the cost of submitting work (and,
+    for process pools, of pickling arguments and results) over many
+    items.
+
+    At most max_in_flight batches are submitted ahead of the results
+    being consumed, so memory use stays bounded even for very long or
+    infinite iterators. The iterable is only advanced as results are
+    consumed.
+
+    If ordered is True (the default), results are yielded in the same
+    order as the items of the iterable, like the built-in map(). If
+    ordered is False, the results of each batch are yielded as soon as
+    that batch completes, which keeps the workers busier if the cost of
+    func varies from item to item. Results within a batch always stay in
+    order.
+
+    The executor is either 'thread', 'process' or an existing
+    concurrent.futures.Executor instance. A thread or process pool is
+    created and shut down by this function if specified by name; an
+    executor instance is left running. For process pools, func and the
+    items must be picklable.
+
+    Any exception raised by func is raised when the result for the
+    affected batch would have been yielded. Batches not yet started are
+    cancelled if the iterator is closed or raises.
+
+    Arguments:
+        func: single-argument callable to be applied to each item
+        iterable: object with items to be mapped
+
+    Keyword Arguments:
+        batch_size: positive number of items to submit to a worker at once
+        executor: 'thread', 'process' or an executor instance (optional;
+            default is 'thread')
+        ordered: whether to yield results in input order (optional;
+            default is True)
+        max_in_flight: positive maximum number of batches submitted but
+            not yet consumed (optional; default is None, signifying twice
+            the number of CPUs)
+        max_workers: maximum number of workers for a pool created by
+            this function (optional; default is None, signifying the
+            concurrent.futures default)
+
+    Returns:
+        iterator of the results of func applied to each item
+
+    Raises:
+        ValueError: if batch_size or max_in_flight are not positive, or
+            the executor name is not recognized
+
+    Examples:
+
+    >>> list(parallel_map(abs, range(-5, 5), batch_size=3))
+    [5, 4, 3, 2, 1, 0, 1, 2, 3, 4]
+    >>> sorted(parallel_map(abs, range(-5, 5), batch_size=3, ordered=False))
+    [0, 1, 1, 2, 2, 3, 3, 4, 4, 5]
+    >>> import itertools
+    >>> squares = parallel_map(
+    ...     lambda n: n * n,
+    ...     itertools.count(),
+    ...     batch_size=100,
+    ...     max_in_flight=4,
+    ... )
+    >>> _common.take(5, squares)
+    [0, 1, 4, 9, 16]
+    >>> squares.close()
+    >>> list(parallel_map(abs, range(-3, 3), batch_size=2, executor='process'))
+    [3, 2, 1, 0, 1, 2]
+    >>> parallel_map(abs, [], batch_size=2, executor='fiber')
+    Traceback (most recent call last):
+     ...
+    ValueError: executor must be 'thread', 'process' or an Executor
+
+    """
+    return _parallel_apply(
+        _map_batch,
+        func,
+        iterable,
+        batch_size=batch_size,
+        executor=executor,
+        ordered=ordered,
+        max_in_flight=max_in_flight,
+        max_workers=max_workers,
+    )
+
+
+def parallel_flatmap(
+        func: Callable[[Any], Iterable[Any]],
+        iterable: Iterable[Any],
+        *,
+        batch_size: int,
+        executor: Union[str, concurrent.futures.Executor] = 'thread',
+        ordered: bool = True,
+        max_in_flight: Optional[int] = None,
+        max_workers: Optional[int] = None,
+) -> Iterator[Any]:
+    """Return iterator chaining the results of a function applied in parallel.
+
+    Like parallel_map(), but func returns an iterable for each item, and
+    the items of those iterables are yielded. Each worker expands the
+    results for a whole batch, so only one list per batch is passed back
+    from the worker. The arguments are as for parallel_map().
+
+    Arguments:
+        func: single-argument callable returning an iterable
+        iterable: object with items to be mapped
+
+    Keyword Arguments:
+        batch_size: positive number of items to submit to a worker at once
+        executor: 'thread', 'process' or an executor instance (optional;
+            default is 'thread')
+        ordered: whether to yield results in input order (optional;
+            default is True)
+        max_in_flight: positive maximum number of batches submitted but
+            not yet consumed (optional; default is None, signifying twice
+            the number of CPUs)
+        max_workers: maximum number of workers for a pool created by
+            this function (optional; default is None, signifying the
+            concurrent.futures default)
+
+    Returns:
+        iterator of the items of the results of func applied to each item
+
+    Raises:
+        ValueError: if batch_size or max_in_flight are not positive, or
+            the executor name is not recognized
+
+    Examples:
+
+    >>> list(parallel_flatmap(range, range(5), batch_size=2))
+    [0, 0, 1, 0, 1, 2, 0, 1, 2, 3]
+
+    """
+    return _parallel_apply(
+        _flatmap_batch,
+        func,
+        iterable,
+        batch_size=batch_size,
+        executor=executor,
+        ordered=ordered,
+        max_in_flight=max_in_flight,
+        max_workers=max_workers,
+    )
+
+
+def _parallel_apply(
+        apply_batch,
+        func,
+        iterable,
+        *,
+        batch_size,
+        executor,
+        ordered,
+        max_in_flight,
+        max_workers,
+):
+    if batch_size < 1:
+        msg = f'batch_size must be positive'
+        raise ValueError(msg)
+    if max_in_flight is None:
+        max_in_flight = 2 * (os.cpu_count() or 1)
+    elif max_in_flight < 1:
+        msg = f'max_in_flight must be positive'
+        raise ValueError(msg)
+    if not isinstance(executor, concurrent.futures.Executor):
+        try:
+            executor_type = _EXECUTORS[executor]
+        except (KeyError, TypeError):
+            msg = f"executor must be 'thread', 'process' or an Executor"
+            raise ValueError(msg) from None
+        return _owned_executor_map(
+            executor_type,
+            max_workers,
+            apply_batch,
+            func,
+            iterable,
+            batch_size,
+            ordered,
+            max_in_flight,
+        )
+    batches = _common.take_batches(iterable, length=batch_size)
+    engine = _ordered_map if ordered else _unordered_map
+    return engine(executor, apply_batch, func, batches, max_in_flight)
+
+
+def _owned_executor_map(
+        executor_type,
+        max_workers,
+        apply_batch,
+        func,
+        iterable,
+        batch_size,
+        ordered,
+        max_in_flight,
+):
+    with executor_type(max_workers=max_workers) as executor:
+        batches = _common.take_batches(iterable, length=batch_size)
+        engine = _ordered_map if ordered else _unordered_map
+        yield from engine(executor, apply_batch, func, batches, max_in_flight)
+
+
+def _ordered_map(executor, apply_batch, func, batches, max_in_flight):
+    pending = collections.deque()
+    submit = executor.submit
+    try:
+        for batch in batches:
+            pending.append(submit(apply_batch, func, batch))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _unordered_map(executor, apply_batch, func, batches, max_in_flight):
+    pending = set()
+    submit = executor.submit
+    wait = concurrent.futures.wait
+    first_completed = concurrent.futures.FIRST_COMPLETED
+    try:
+        for batch in batches:
+            pending.add(submit(apply_batch, func, batch))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=first_completed)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=first_completed)
+            for future in done:
+                yield from future.result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -8,11 +8,18 @@ from typing import (
     Any,
     Callable,
     Iterable,
+    Iterator,
+    List,
     Optional,
     Sequence,
     Tuple,
 )
 
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover
+    _np = None
+
 import litecore.irecipes.common as _common
 
 from litecore.irecipes.typealiases import (
@@ -20,6 +27,8 @@ from litecore.irecipes.typealiases import (
     KeyFunc,
 )
 
+from litecore.sentinels import NO_VALUE as _NO_VALUE
+
 
 def ilen(iterable: Iterable[Any]) -> int:
     """Return the length of an iterable.
@@ -137,11 +146,121 @@ def iminmax(
     return lo, hi
 
 
+class CompensatedSum:
+    """Accumulator for sums of floats with compensated rounding error.
+
+    Uses Neumaier's variant of Kahan summation, which keeps a separate
+    running compensation for the low-order bits lost when each value is
+    added to the total. The error of the sum stays bounded no matter how
+    many values are added (or subtracted), instead of growing with the
+    number of additions as it does for a plain running total.
+
+    Arguments:
+        initial: the starting value of the sum (optional; default is 0.0)
+
+    Examples:
+
+    >>> values = [1e100, 1.0, -1e100, 1.0]
+    >>> sum(values)
+    1.0
+    >>> total = CompensatedSum()
+    >>> for value in values:
+    ...     total.add(value)
+    >>> total.value
+    2.0
+
+    """
+    __slots__ = ('_total', '_compensation')
+
+    def __init__(self, initial: float = 0.0) -> None:
+        self._total = initial
+        self._compensation = 0.0
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.value!r})'
+
+    def add(self, value: float) -> None:
+        """Add a value to the sum."""
+        total = self._total
+        new_total = total + value
+        if abs(total) >= abs(value):
+            self._compensation += (total - new_total) + value
+        else:
+            self._compensation += (value - new_total) + total
+        self._total = new_total
+
+    def subtract(self, value: float) -> None:
+        """Subtract a value from the sum."""
+        self.add(-value)
+
+    @property
+    def value(self) -> float:
+        """The current value of the sum."""
+        return self._total + self._compensation
+
+
 def running(
-        reduction: Callable[[Any], Any],
+        reduction: Callable[[Any, Any], Any],
         iterable: Iterable[Any],
-) -> Any:
-    return itertools.accumulate(iterable, reduction)
+        *,
+        compensated: bool = False,
+) -> Iterator[Any]:
+    """Return iterator of the running reduction of items of an iterable.
+
+    Each item of the returned iterator is the result of applying the
+    two-argument reduction to the previous result and the next item of
+    the iterable. The first item is the first item of the iterable.
+
+    If the compensated keyword argument is True, the reduction must be
+    operator.add, and the running sums are accumulated using
+    CompensatedSum, so that floating-point error does not build up over
+    long iterables.
+
+    Arguments:
+        reduction: two-argument callable returning a value
+        iterable: object with items to be reduced
+
+    Keyword Arguments:
+        compensated: whether to use compensated summation (optional;
+            default is False)
+
+    Returns:
+        iterator of the running reduction values
+
+    Raises:
+        ValueError: if compensated is True and the reduction is not
+            operator.add
+
+    Examples:
+
+    >>> list(running(operator.add, range(1, 6)))
+    [1, 3, 6, 10, 15]
+    >>> list(running(max, [3, 1, 4, 1, 5, 9, 2, 6]))
+    [3, 3, 4, 4, 5, 9, 9, 9]
+    >>> list(running(operator.add, [0.1] * 10))[-1]
+    0.9999999999999999
+    >>> list(running(operator.add, [0.1] * 10, compensated=True))[-1]
+    1.0
+    >>> list(running(operator.mul, [0.1], compensated=True))
+    Traceback (most recent call last):
+     ...
+    ValueError: compensated running reduction requires operator.add
+
+    """
+    if not compensated:
+        return itertools.accumulate(iterable, reduction)
+    if reduction is not operator.add:
+        msg = f'compensated running reduction requires operator.add'
+        raise ValueError(msg)
+    return _running_compensated_sum(iterable)
+
+
+def _running_compensated_sum(iterable: Iterable[float]) -> Iterator[float]:
+    total = CompensatedSum()
+    add = total.add
+    for item in iterable:
+        add(item)
+        yield total.value
 
 
 def count_where(
@@ -178,6 +297,10 @@ def allpairs(
 ) -> bool:
     """Returns True if all consecutive pairs of an iterable satify a condition.
 
+    Stops at the first pair which does not satisfy the condition. See
+    MonotonicityTracker for statistics about all of the pairs of a long
+    iterable, which can be fed to it in chunks.
+
     Arguments:
         iterable: object to be checked
         op: two-argument callable returning a boolean value
@@ -192,10 +315,9 @@ def allpairs(
     True
 
     """
-    return all(
-        op(left, right)
-        for left, right in _common.pairwise(iterable)
-    )
+    left, right = itertools.tee(iterable)
+    next(right, None)
+    return all(map(op, left, right))
 
 
 def decreasing(iterable: Iterable[Any]) -> bool:
@@ -290,6 +412,197 @@ def nonincreasing(iterable: Iterable[Any]) -> bool:
     return allpairs(iterable, operator.ge)
 
 
+_UFUNC_NAMES = {
+    operator.lt: 'less',
+    operator.le: 'less_equal',
+    operator.gt: 'greater',
+    operator.ge: 'greater_equal',
+    operator.eq: 'equal',
+    operator.ne: 'not_equal',
+}
+
+_BLOCK_SIZE = 65536
+
+
+class MonotonicityTracker:
+    """Track how consecutive items of a stream satisfy an ordering.
+
+    Items are fed to the tracker in chunks of any size using update(),
+    and each consecutive pair of items (including pairs spanning two
+    chunks) is checked with the specified two-argument callable, in the
+    same way as allpairs(). Only the last item seen is remembered, so
+    memory use does not grow with the length of the stream.
+
+    A pair which does not satisfy the condition is a violation, and its
+    index is the index in the stream of the second item of the pair.
+    The stream is split by the violations into monotone runs, and the
+    tracker reports the longest of them.
+
+    Items are checked in blocks using map() and the itertools module,
+    so that no Python code is run per item. If NumPy is installed and a
+    chunk is a one-dimensional NumPy array, and the callable is one of
+    the comparison functions of the operator module, the corresponding
+    NumPy function is used instead.
+
+    Arguments:
+        op: two-argument callable returning a boolean value, e.g.,
+            operator.lt for a strictly increasing stream
+
+    Examples:
+
+    >>> tracker = MonotonicityTracker(operator.le)
+    >>> tracker.update([1, 2, 2, 3])
+    True
+    >>> tracker.update([5, 4, 6, 7, 8, 1])
+    False
+    >>> tracker
+    MonotonicityTracker(operator.le, count=10, violations=2)
+    >>> tracker.first_violation, tracker.longest_run, tracker.longest_run_start
+    (5, 5, 0)
+    >>> tracker.update(range(2, 9))
+    False
+    >>> tracker.longest_run, tracker.longest_run_start
+    (8, 9)
+
+    """
+    __slots__ = (
+        '_op',
+        '_count',
+        '_last',
+        '_violations',
+        '_first_violation',
+        '_run_start',
+        '_longest_run',
+        '_longest_run_start',
+    )
+
+    def __init__(self, op: Callable[[Any, Any], bool]) -> None:
+        self._op = op
+        self._count = 0
+        self._last = _NO_VALUE
+        self._violations = 0
+        self._first_violation = None
+        self._run_start = 0
+        self._longest_run = 0
+        self._longest_run_start = 0
+
+    def __repr__(self):
+        op = self._op
+        if op in _UFUNC_NAMES:
+            op_name = f'operator.{op.__name__}'
+        else:
+            op_name = repr(op)
+        return (
+            f'{type(self).__name__}({op_name}, count={self._count}, '
+            f'violations={self._violations})'
+        )
+
+    @property
+    def count(self) -> int:
+        """The number of items seen."""
+        return self._count
+
+    @property
+    def violations(self) -> int:
+        """The number of consecutive pairs violating the condition."""
+        return self._violations
+
+    @property
+    def first_violation(self) -> Optional[int]:
+        """The index of the first violation, or None if there are none."""
+        return self._first_violation
+
+    @property
+    def monotonic(self) -> bool:
+        """Whether every consecutive pair seen satisfies the condition."""
+        return not self._violations
+
+    @property
+    def longest_run(self) -> int:
+        """The number of items in the longest monotone run."""
+        return max(self._longest_run, self._count - self._run_start)
+
+    @property
+    def longest_run_start(self) -> int:
+        """The index of the first item of the longest monotone run."""
+        if self._count - self._run_start > self._longest_run:
+            return self._run_start
+        return self._longest_run_start
+
+    def update(self, chunk: Iterable[Any]) -> bool:
+        """Check the next chunk of items of the stream.
+
+        Arguments:
+            chunk: iterable with the next items of the stream
+
+        Returns:
+            True if no violation has been seen so far, otherwise False
+
+        """
+        if _np is not None and isinstance(chunk, _np.ndarray):
+            if chunk.ndim == 1 and self._op in _UFUNC_NAMES:
+                self._update_array(chunk)
+                return not self._violations
+            chunk = iter(chunk)
+        for block in _common.take_batches(chunk, length=_BLOCK_SIZE):
+            self._update_block(block)
+        return not self._violations
+
+    def _update_block(self, block: Sequence[Any]) -> None:
+        start = self._count
+        last = self._last
+        op = self._op
+        self._count += len(block)
+        self._last = block[-1]
+        if last is _NO_VALUE:
+            start += 1
+            head, offset = block, 1
+        else:
+            head, offset = itertools.chain((last,), block), 0
+        # most blocks of a mostly ordered stream have no violations, and
+        # all() checks them with the least overhead per item
+        if all(map(op, head, itertools.islice(block, offset, None))):
+            return
+        if last is _NO_VALUE:
+            lefts = block
+        else:
+            lefts = itertools.chain((last,), block)
+        rights = itertools.islice(block, offset, None)
+        failed = map(operator.not_, map(op, lefts, rights))
+        positions = list(itertools.compress(itertools.count(start), failed))
+        self._record(positions)
+
+    def _update_array(self, array: Any) -> None:
+        if not len(array):
+            return
+        start = self._count
+        positions = []
+        if self._last is not _NO_VALUE:
+            if not self._op(self._last, array[0].item()):
+                positions.append(start)
+        ufunc = getattr(_np, _UFUNC_NAMES[self._op])
+        failed = _np.flatnonzero(~ufunc(array[:-1], array[1:]))
+        positions.extend((failed + (start + 1)).tolist())
+        self._count += len(array)
+        self._last = array[-1].item()
+        self._record(positions)
+
+    def _record(self, positions: List[int]) -> None:
+        if not positions:
+            return
+        if self._first_violation is None:
+            self._first_violation = positions[0]
+        self._violations += len(positions)
+        starts = [self._run_start]
+        starts.extend(positions)
+        lengths = list(map(operator.sub, positions, starts))
+        longest = max(lengths)
+        if longest > self._longest_run:
+            self._longest_run = longest
+            self._longest_run_start = starts[lengths.index(longest)]
+        self._run_start = positions[-1]
+
+
 def allequal(
         iterable: Iterable[Any],
         *,
@@ -433,3 +746,280 @@ def allequal_sorted(
     """
     groups = itertools.groupby(iterable, key)
     return next(groups, True) and not next(groups, False)
+
+
+def reduce_many(
+        iterable: Iterable[Any],
+        *,
+        minmax: bool = False,
+        key: Optional[KeyFunc] = None,
+        where: Optional[FilterFunc] = None,
+        allequal: bool = False,
+) -> 'MultiReducer':
+    """Compute several summary statistics of an iterable in a single pass.
+
+    Avoids consuming an iterator several times (or copying it with
+    itertools.tee()) to call ilen(), iminmax(), count_where() and
+    allequal() on the same items. See MultiReducer for details, including
+    how ties between min or max items are resolved and how to combine the
+    results for separate parts of a larger iterable.
+
+    The number of items is always counted. The other statistics are only
+    computed if requested.
+
+    Will not return if passed an infinite iterator.
+
+    Arguments:
+        iterable: object with items to be summarized
+
+    Keyword Arguments:
+        minmax: whether to find the min and max items (optional; default
+            is False)
+        key: single-argument callable used to determine the relative
+            ordering of the items for minmax (optional; default is None,
+            resulting in the use of each item unmodified)
+        where: predicate for counting items, as for count_where()
+            (optional; default is None, signifying no such count)
+        allequal: whether to check if all items are equal (optional;
+            default is False)
+
+    Returns:
+        MultiReducer holding the requested statistics
+
+    Examples:
+
+    >>> stats = reduce_many(
+    ...     iter(range(10)),
+    ...     minmax=True,
+    ...     where=lambda n: n % 3 == 0,
+    ...     allequal=True,
+    ... )
+    >>> stats
+    MultiReducer(count=10, minmax=(0, 9), where=4, allequal=False)
+    >>> words = 'the quick brown fox jumped'.split()
+    >>> reduce_many(words, minmax=True, key=len).minmax
+    ('the', 'jumped')
+
+    """
+    reducer = MultiReducer(
+        minmax=minmax,
+        key=key,
+        where=where,
+        allequal=allequal,
+    )
+    reducer.update(iterable)
+    return reducer
+
+
+class MultiReducer:
+    """Accumulator for several summary statistics of a stream of items.
+
+    Items are fed to the reducer in chunks of any size using update().
+    Each statistic is computed in the same way as the corresponding
+    function of this module:
+
+        count: number of items, as for ilen()
+        minmax: tuple of the min and max items, or None if there are
+            no items; as for the built-ins min() and max(), the first of
+            several minimal (or maximal) items is kept, which is not
+            always the max item iminmax() returns for ties
+        where: number of items satisfying a predicate, as for
+            count_where()
+        allequal: whether all items are equal, as for allequal()
+
+    The count is always available. The other statistics are None unless
+    requested when the reducer is created.
+
+    Items are processed in blocks, and each statistic is computed for a
+    block using built-in functions such as min(), sum() and map(), so
+    that no Python code is run per item (other than the key and predicate
+    callables, if any). Once two items are found to differ, no further
+    equality checks are made.
+
+    The reducers for separate parts of an iterable (e.g., shards which
+    are processed in parallel) can be combined using merge(). The result
+    is the same as for a single reducer updated with all the parts in
+    order.
+
+    Keyword Arguments:
+        minmax: whether to find the min and max items (optional; default
+            is False)
+        key: single-argument callable used to determine the relative
+            ordering of the items for minmax (optional; default is None,
+            resulting in the use of each item unmodified)
+        where: predicate for counting items, as for count_where()
+            (optional; default is None, signifying no such count)
+        allequal: whether to check if all items are equal (optional;
+            default is False)
+
+    Examples:
+
+    >>> shards = [[3, 1, 4], [], [1, 5, 9, 2], [6, 5]]
+    >>> reducers = []
+    >>> for shard in shards:
+    ...     reducer = MultiReducer(minmax=True, where=lambda n: n > 4)
+    ...     reducer.update(shard)
+    ...     reducers.append(reducer)
+    >>> total = reducers[0]
+    >>> for reducer in reducers[1:]:
+    ...     total.merge(reducer)
+    >>> total
+    MultiReducer(count=9, minmax=(1, 9), where=4)
+    >>> pairs = [(0, 0), (2, 1), (0, 2), (3, 3), (3, 4)]
+    >>> reduce_many(pairs, minmax=True, key=lambda t: t[0]).minmax
+    ((0, 0), (3, 3))
+    >>> total.merge(MultiReducer(allequal=True))
+    Traceback (most recent call last):
+     ...
+    ValueError: cannot merge reducers computing different statistics
+
+    """
+    __slots__ = (
+        '_minmax',
+        '_key',
+        '_where',
+        '_allequal',
+        '_count',
+        '_lo_key',
+        '_lo',
+        '_hi_key',
+        '_hi',
+        '_where_count',
+        '_first',
+        '_equal',
+    )
+
+    def __init__(
+            self,
+            *,
+            minmax: bool = False,
+            key: Optional[KeyFunc] = None,
+            where: Optional[FilterFunc] = None,
+            allequal: bool = False,
+    ) -> None:
+        self._minmax = minmax
+        self._key = key
+        self._where = where
+        self._allequal = allequal
+        self._count = 0
+        self._lo_key = self._lo = self._hi_key = self._hi = _NO_VALUE
+        self._where_count = 0
+        self._first = _NO_VALUE
+        self._equal = True
+
+    def __repr__(self):
+        stats = [f'count={self._count!r}']
+        for name in ('minmax', 'where', 'allequal'):
+            value = getattr(self, name)
+            if value is not None or (name == 'minmax' and self._minmax):
+                stats.append(f'{name}={value!r}')
+        return f'{type(self).__name__}({", ".join(stats)})'
+
+    @property
+    def count(self) -> int:
+        """The number of items."""
+        return self._count
+
+    @property
+    def minmax(self) -> Optional[Tuple[Any, Any]]:
+        """The min and max items, or None if there are no items."""
+        if not self._minmax or self._lo is _NO_VALUE:
+            return None
+        return self._lo, self._hi
+
+    @property
+    def where(self) -> Optional[int]:
+        """The number of items satisfying the predicate."""
+        if self._where is None:
+            return None
+        return self._where_count
+
+    @property
+    def allequal(self) -> Optional[bool]:
+        """Whether all the items are equal."""
+        if not self._allequal:
+            return None
+        return self._equal
+
+    def update(self, chunk: Iterable[Any]) -> None:
+        """Add the next chunk of items of the stream.
+
+        Arguments:
+            chunk: iterable with the next items of the stream
+
+        """
+        for block in _common.take_batches(chunk, length=_BLOCK_SIZE):
+            self._update_block(block)
+
+    def merge(self, other: 'MultiReducer') -> None:
+        """Add the statistics of another reducer for later items.
+
+        Arguments:
+            other: reducer for the items following those of this reducer
+
+        Raises:
+            ValueError: if the reducers compute different statistics
+
+        """
+        if self._spec() != other._spec():
+            msg = f'cannot merge reducers computing different statistics'
+            raise ValueError(msg)
+        if not other._count:
+            return
+        self._count += other._count
+        self._where_count += other._where_count
+        if self._minmax:
+            self._update_minmax(
+                other._lo_key,
+                other._lo,
+                other._hi_key,
+                other._hi,
+            )
+        if self._allequal:
+            self._update_equal(other._first, other._equal)
+
+    def _spec(self) -> Tuple[bool, bool, bool]:
+        return self._minmax, self._where is not None, self._allequal
+
+    def _update_block(self, block: Sequence[Any]) -> None:
+        self._count += len(block)
+        if self._where is not None:
+            self._where_count += sum(map(self._where, block))
+        if self._minmax:
+            if self._key is None:
+                lo = min(block)
+                hi = max(block)
+                self._update_minmax(lo, lo, hi, hi)
+            else:
+                keys = list(map(self._key, block))
+                indices = range(len(keys))
+                lo = min(indices, key=keys.__getitem__)
+                hi = max(indices, key=keys.__getitem__)
+                self._update_minmax(keys[lo], block[lo], keys[hi], block[hi])
+        if self._allequal and self._equal:
+            first = block[0]
+            equal = all(map(operator.eq, itertools.repeat(first), block))
+            self._update_equal(first, equal)
+
+    def _update_minmax(
+            self,
+            lo_key: Any,
+            lo: Any,
+            hi_key: Any,
+            hi: Any,
+    ) -> None:
+        if self._lo is _NO_VALUE:
+            self._lo_key, self._lo = lo_key, lo
+            self._hi_key, self._hi = hi_key, hi
+            return
+        if lo_key < self._lo_key:
+            self._lo_key, self._lo = lo_key, lo
+        if hi_key > self._hi_key:
+            self._hi_key, self._hi = hi_key, hi
+
+    def _update_equal(self, first: Any, equal: bool) -> None:
+        if self._first is _NO_VALUE:
+            self._first = first
+            self._equal = equal
+        elif self._equal:
+            self._equal = equal and self._first == first
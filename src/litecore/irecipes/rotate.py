@@ -1,6 +1,8 @@
 """Functions for cycling or rotating items between one or more iterables.
 
 """
+import bisect
+import heapq
 import itertools
 
 from typing import (
@@ -11,6 +13,8 @@ from typing import (
     Tuple,
 )
 
+from litecore.irecipes.typealiases import KeyFunc
+
 import litecore.irecipes.common as _common
 
 
@@ -105,6 +109,10 @@ def round_robin(*iterables) -> Iterator:
     Same as the standard library itertools recipe roundrobin(). See:
         https://docs.python.org/3/library/itertools.html#itertools-recipes
 
+    The iterators are kept in a ring, from which an exhausted iterator is
+    removed in constant time, so this remains efficient for thousands of
+    iterables of different lengths.
+
     Arguments:
         an arbitrary number of iterable positional arguments
 
@@ -120,15 +128,129 @@ def round_robin(*iterables) -> Iterator:
     [0, 'a', ... 2, 'c', <class 'dict'>, 'd', <class 'list'>, 'e']
 
     """
-    active = len(iterables)
-    nexts = itertools.cycle(iter(it).__next__ for it in iterables)
-    while active:
+    nexts = [iter(iterable).__next__ for iterable in iterables]
+    remaining = len(nexts)
+    if not remaining:
+        return
+    # the iterators form a ring linked by their index in following, so
+    # an exhausted iterator is unlinked without touching the others
+    following = list(range(1, remaining))
+    following.append(0)
+    previous = remaining - 1
+    current = 0
+    while True:
         try:
-            for get_next in nexts:
-                yield get_next()
+            yield nexts[current]()
         except StopIteration:
-            active -= 1
-            nexts = itertools.cycle(itertools.islice(nexts, active))
+            remaining -= 1
+            if not remaining:
+                return
+            current = following[current]
+            following[previous] = current
+        else:
+            previous = current
+            current = following[current]
+
+
+def merge_sorted(
+        *iterables: Iterable[Any],
+        key: Optional[KeyFunc] = None,
+        batch_size: int = 128,
+) -> Iterator[Any]:
+    """Merge sorted iterables into one sorted iterator.
+
+    Similar to heapq.merge(), but items are read from each iterable in
+    batches of batch_size items. When the iterable at the top of the heap
+    is still at the top after yielding an item, all of the items in its
+    batch which come before the head of the runner-up are found by
+    bisection and yielded at once. This amortizes the per-item overhead of
+    the heap over runs of consecutive items from the same iterable.
+
+    Each of the iterables must be sorted by the key. The merge is stable:
+    items with equal keys are yielded in the order of the iterables
+    passed. Up to batch_size items are read from each iterable before
+    they are needed.
+
+    Arguments:
+        an arbitrary number of sorted iterable positional arguments
+
+    Keyword Arguments:
+        key: single-argument callable giving the sort key of an item
+            (optional; default is None, signifying the items themselves)
+        batch_size: positive number of items to read from an iterable at
+            once (optional; default is 128)
+
+    Returns:
+        iterator over the items of all the iterables in sorted order
+
+    Raises:
+        ValueError: if batch_size is not positive
+
+    Examples:
+
+    >>> list(merge_sorted([1, 4, 7], [2, 5, 8], [3, 6, 9], batch_size=2))
+    [1, 2, 3, 4, 5, 6, 7, 8, 9]
+    >>> list(merge_sorted(range(0, 10, 3), [], range(5)))
+    [0, 0, 1, 2, 3, 3, 4, 6, 9]
+    >>> words = merge_sorted(['b', 'dd'], ['a', 'cc', 'eee'], key=len)
+    >>> list(words)
+    ['b', 'a', 'dd', 'cc', 'eee']
+
+    """
+    if batch_size < 1:
+        msg = f'batch_size must be positive'
+        raise ValueError(msg)
+    return _merge_sorted(iterables, key, batch_size)
+
+
+def _merge_sorted(iterables, key, batch_size):
+    # heap entries are [head key, order, position, keys, batch, iterator];
+    # the order is unique, so entries never compare beyond it
+    heap = []
+    for order, iterable in enumerate(iterables):
+        iterator = iter(iterable)
+        batch = list(itertools.islice(iterator, batch_size))
+        if batch:
+            keys = batch if key is None else list(map(key, batch))
+            heap.append([keys[0], order, 0, keys, batch, iterator])
+    heapq.heapify(heap)
+    heapreplace = heapq.heapreplace
+    islice = itertools.islice
+    while len(heap) > 1:
+        entry = heap[0]
+        batch = entry[4]
+        position = entry[2]
+        yield batch[position]
+        position += 1
+        if position == len(batch):
+            batch = list(islice(entry[5], batch_size))
+            if not batch:
+                heapq.heappop(heap)
+                continue
+            entry[3] = batch if key is None else list(map(key, batch))
+            entry[4] = batch
+            position = 0
+        entry[0] = entry[3][position]
+        entry[2] = position
+        if heapreplace(heap, entry) is heap[0]:
+            # the same iterable is still first, so yield the rest of its run
+            # up to the head of the runner-up in one go
+            keys = entry[3]
+            runner_up = heap[1]
+            if len(heap) > 2 and heap[2] < runner_up:
+                runner_up = heap[2]
+            if entry[1] < runner_up[1]:
+                end = bisect.bisect_right(keys, runner_up[0], position)
+            else:
+                end = bisect.bisect_left(keys, runner_up[0], position)
+            if end > position + 1:
+                yield from islice(batch, position, end - 1)
+                entry[0] = keys[end - 1]
+                entry[2] = end - 1
+    if heap:
+        _, _, position, _, batch, iterator = heap[0]
+        yield from islice(batch, position, None)
+        yield from iterator
 
 
 def rotate_cycle(iterable: Iterable[Any]) -> Iterator[Tuple[Any, ...]]:
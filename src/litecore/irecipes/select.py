@@ -2,13 +2,18 @@
 
 """
 import collections
+import collections.abc
+import io
 import itertools
 
 from typing import (
     Any,
+    Callable,
     Iterable,
     Iterator,
+    List,
     Optional,
+    Tuple,
 )
 
 from litecore.irecipes.typealiases import (
@@ -118,6 +123,10 @@ def first(
     [1, 2, 3, 4]
 
     """
+    if key is not None:
+        index = _position_index(iterable, key)
+        if index is not None:
+            return index.nth(0, default=default)
     items = iterable if key is None else filter(key, iterable)
     return next(iter(items), default)
 
@@ -143,6 +152,11 @@ def nth(
 
     Item counting starts with 0, as is usual for Python indexing.
 
+    If the iterable is tracking the positions of the items for which the
+    key is true (see PositionIndex), the search starts from the nearest
+    recorded position rather than from the first item. The items are then
+    counted from the start of the iterable, even if it is an iterator.
+
     Arguments:
         iterable: iterator or collection of items
 
@@ -193,10 +207,169 @@ def nth(
         except TypeError:
             return next(itertools.islice(iterable, item, None), default)
     else:
+        index = _position_index(iterable, key)
+        if index is not None:
+            return index.nth(item, default=default)
         iterator = filter(key, iterable)
         return next(itertools.islice(iterator, item, None), default)
 
 
+def _position_index(
+        iterable: Iterable[Any],
+        key: FilterFunc,
+) -> Optional['PositionIndex']:
+    indexes = getattr(iterable, 'position_indexes', None)
+    if indexes is None:
+        return None
+    try:
+        return indexes.get(key)
+    except TypeError:
+        # unhashable key
+        return None
+
+
+class PositionIndex:
+    """Recorded positions of the items of a source matching a condition.
+
+    Used by the nth() and first() functions to avoid scanning a source
+    from the start when it is queried repeatedly with the same key.
+    While the source is scanned, the position of every spacing-th item
+    for which the key is true is recorded, as well as how far the source
+    has been scanned. A later query for the nth such item starts from the
+    recorded position of item (n // spacing) * spacing, or from the end
+    of the scanned part, so it calls the key for at most about spacing
+    items which have already been scanned.
+
+    Position indexes are normally created by the track_positions() method
+    of a source (such as a CachedIterator), which registers them under
+    the key in the source's position_indexes mapping. The source calls
+    invalidate() when its items change, which discards the recorded
+    positions.
+
+    Arguments:
+        iterate_from: single-argument callable returning an iterator over
+            the items of the source from the given position
+        key: single-argument callable defining the condition
+
+    Keyword Arguments:
+        spacing: positive number of matching items between recorded
+            positions (optional; default is 64)
+
+    Raises:
+        ValueError: if spacing is not positive
+
+    Examples:
+
+    >>> calls = []
+    >>> def is_even(n):
+    ...     calls.append(n)
+    ...     return n % 2 == 0
+    >>> data = list(range(1000))
+    >>> index = PositionIndex(
+    ...     lambda start: itertools.islice(data, start, None),
+    ...     is_even,
+    ...     spacing=10,
+    ... )
+    >>> index.nth(300), len(calls)
+    (600, 601)
+    >>> calls.clear()
+    >>> index.nth(255), len(calls)
+    (510, 11)
+    >>> index.position(600) is None
+    True
+
+    """
+    __slots__ = (
+        'key',
+        'spacing',
+        '_iterate_from',
+        '_checkpoints',
+        '_scanned',
+        '_found',
+    )
+
+    def __init__(
+            self,
+            iterate_from: Callable[[int], Iterator[Any]],
+            key: FilterFunc,
+            *,
+            spacing: int = 64,
+    ) -> None:
+        if spacing < 1:
+            msg = f'spacing must be positive'
+            raise ValueError(msg)
+        self.key = key
+        self.spacing = spacing
+        self._iterate_from = iterate_from
+        self.invalidate()
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} of {len(self._checkpoints)} positions '
+            f'for {self.key!r}>'
+        )
+
+    def invalidate(self) -> None:
+        """Discard the recorded positions."""
+        # _checkpoints[j] is the position of matching item j * spacing,
+        # and _found matching items lie before position _scanned
+        self._checkpoints = []
+        self._scanned = 0
+        self._found = 0
+
+    def position(self, n: int) -> Optional[int]:
+        """Return the position in the source of the nth matching item.
+
+        Returns None if there are no more than n matching items.
+
+        Raises:
+            ValueError: if n is negative
+
+        """
+        located = self._locate(n)
+        return None if located is None else located[0]
+
+    def nth(self, n: int, *, default: Optional[Any] = None) -> Any:
+        """Return the nth matching item, or the default if there is none.
+
+        Raises:
+            ValueError: if n is negative
+
+        """
+        located = self._locate(n)
+        return default if located is None else located[1]
+
+    def _locate(self, n: int) -> Optional[Tuple[int, Any]]:
+        if n < 0:
+            msg = f'item number must be non-negative'
+            raise ValueError(msg)
+        spacing = self.spacing
+        checkpoints = self._checkpoints
+        number = n // spacing
+        if number < len(checkpoints):
+            start = checkpoints[number]
+            found = number * spacing
+        else:
+            start = self._scanned
+            found = self._found
+        key = self.key
+        position = start - 1
+        for position, item in enumerate(self._iterate_from(start), start):
+            if key(item):
+                if not found % spacing and found // spacing == len(checkpoints):
+                    checkpoints.append(position)
+                if found == n:
+                    if position >= self._scanned:
+                        self._scanned = position + 1
+                        self._found = found + 1
+                    return position, item
+                found += 1
+        if position >= self._scanned:
+            self._scanned = position + 1
+            self._found = found
+        return None
+
+
 def tail(items: int, iterable: Iterable[Any]) -> Iterator:
     """Return iterator over the last specified number of items of iterable.
 
@@ -205,6 +378,14 @@ def tail(items: int, iterable: Iterable[Any]) -> Iterator:
 
     If the given iterable is an iterator, it will be fully consumed.
 
+    Only the last items are read if possible: sequences are sliced, other
+    reversible collections (such as dicts) are read from the end, and
+    seekable files are read backwards in blocks from the end of the file
+    until enough lines have been found. The lines of a binary file are
+    those ending in a newline character; text files split lines according
+    to their own newline mode. Other iterables are consumed while keeping
+    only the last items.
+
     Arguments:
         items: non-negative number of items to be returned as output
         iterable: object to be acted upon
@@ -218,6 +399,10 @@ def tail(items: int, iterable: Iterable[Any]) -> Iterator:
     [8, 9]
     >>> list(tail(11, range(10)))
     [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+    >>> list(tail(0, range(10)))
+    []
+    >>> list(tail(2, {'a': 1, 'b': 2, 'c': 3}))
+    ['b', 'c']
     >>> it = iter(range(10))
     >>> list(tail(2, it))
     [8, 9]
@@ -225,12 +410,33 @@ def tail(items: int, iterable: Iterable[Any]) -> Iterator:
     0
     >>> list(tail(2, it))
     []
+    >>> import io
+    >>> log = io.BytesIO(b'first\\nsecond\\nthird\\nfourth')
+    >>> list(tail(2, log))
+    [b'third\\n', b'fourth']
+    >>> log.read()
+    b''
+    >>> text = io.TextIOWrapper(io.BytesIO(b'one\\rtwo\\r\\nthree\\r'))
+    >>> list(tail(2, text))
+    ['two\\n', 'three\\n']
 
     """
-    try:
-        return iter(iterable[-items:])
-    except TypeError:
-        return iter(collections.deque(iterable, maxlen=items))
+    if items < 1:
+        return iter(())
+    if not isinstance(iterable, collections.abc.Mapping):
+        try:
+            return iter(iterable[-items:])
+        except TypeError:
+            pass
+    if isinstance(iterable, io.IOBase):
+        lines = _tail_lines(items, iterable)
+        if lines is not None:
+            return iter(lines)
+    elif _is_reversible(iterable):
+        result = list(itertools.islice(reversed(iterable), items))
+        result.reverse()
+        return iter(result)
+    return iter(collections.deque(iterable, maxlen=items))
 
 
 def last(
@@ -244,6 +450,8 @@ def last(
 
     If the given iterable is an iterator, it will be fully consumed.
 
+    Only the last item is read if possible, as for tail().
+
     Arguments:
         iterable: iterator or collection of items
 
@@ -265,6 +473,8 @@ def last(
     True
     >>> last(c for c in 'abc') == 'c'
     True
+    >>> last({-1: 'a', 0: 'b'})
+    0
     >>> it = iter(range(10))
     >>> last(it)
     9
@@ -272,16 +482,24 @@ def last(
     0
 
     """
-    try:
-        return iterable[-1]
-    except IndexError:
-        return default
-    except TypeError:
-        result = collections.deque(iterable, maxlen=1)
-        if result:
-            return result[0]
-        else:
+    if not isinstance(iterable, collections.abc.Mapping):
+        try:
+            return iterable[-1]
+        except IndexError:
             return default
+        except TypeError:
+            pass
+    if isinstance(iterable, io.IOBase):
+        lines = _tail_lines(1, iterable)
+        if lines is not None:
+            return lines[0] if lines else default
+    elif _is_reversible(iterable):
+        return next(reversed(iterable), default)
+    result = collections.deque(iterable, maxlen=1)
+    if result:
+        return result[0]
+    else:
+        return default
 
 
 def except_last(iterable: Iterable[Any]) -> Iterator:
@@ -302,6 +520,8 @@ def except_last(iterable: Iterable[Any]) -> Iterator:
     [0, 1, 2, 3]
     >>> list(except_last([]))
     []
+    >>> list(except_last({'a': 1, 'b': 2}))
+    ['a']
     >>> it = except_last(iter(range(5)))
     >>> list(it)
     [0, 1, 2, 3]
@@ -311,21 +531,116 @@ def except_last(iterable: Iterable[Any]) -> Iterator:
     StopIteration
 
     """
-    try:
-        yield from iterable[:-1]
-    except IndexError:
-        return iter(())
-    except TypeError:
-        iterator = iter(iterable)
+    if not isinstance(iterable, collections.abc.Mapping):
         try:
-            item = next(iterator)
-        except StopIteration:
-            return iter(())
-        while True:
-            prev = item
-            try:
-                item = next(iterator)
-            except StopIteration:
-                break
-            else:
-                yield prev
+            yield from iterable[:-1]
+            return
+        except TypeError:
+            pass
+    iterator = iter(iterable)
+    for previous in iterator:
+        break
+    else:
+        return
+    for item in iterator:
+        yield previous
+        previous = item
+
+
+def _is_reversible(iterable: Iterable[Any]) -> bool:
+    # iterators must be consumed, even if they can be reversed
+    return (
+        isinstance(iterable, collections.abc.Reversible)
+        and not isinstance(iterable, collections.abc.Iterator)
+    )
+
+
+_BLOCK_SIZE = 1 << 16
+
+
+def _tail_lines(items: int, file: io.IOBase) -> Optional[List[Any]]:
+    # read blocks backwards from the end of a seekable file until enough
+    # lines have been found, and leave the file positioned at the end;
+    # returns None if the file cannot be read this way
+    try:
+        if not (file.seekable() and file.readable()):
+            return None
+        start = file.tell()
+    except (OSError, ValueError):
+        # closed file, or text file being iterated with next()
+        return None
+    if isinstance(file, io.TextIOBase):
+        return _tail_text_lines(items, file, start)
+    end = file.seek(0, io.SEEK_END)
+    start = min(start, end)
+    position = end
+    data = b''
+    while position > start:
+        size = min(_BLOCK_SIZE, position - start)
+        position -= size
+        file.seek(position)
+        data = file.read(size) + data
+        # a newline at the very end does not start another line
+        if data.count(b'\n', 0, len(data) - 1) >= items:
+            break
+    cut = len(data) - 1
+    for _ in range(items):
+        cut = data.rfind(b'\n', 0, cut)
+        if cut < 0:
+            break
+    file.seek(end)
+    return list(io.BytesIO(data[cut + 1:]))
+
+
+def _tail_text_lines(
+        items: int,
+        file: io.TextIOBase,
+        start: int,
+) -> Optional[List[str]]:
+    # the lines are read by the file itself, so that its own decoding and
+    # newline mode apply; reading starts at a line break character, and the
+    # first line read (which ends at the first line break recognized by the
+    # file) is discarded
+    binary = getattr(file, 'buffer', None)
+    if binary is None or '\r\n'.encode(file.encoding) != b'\r\n':
+        return None
+    end = file.seek(0, io.SEEK_END)
+    if start > end:
+        # the position includes decoder state, so is not a byte offset
+        file.seek(start)
+        return None
+    position = end
+    data = b''
+    needed = items
+    while position > start:
+        size = min(_BLOCK_SIZE, position - start)
+        position -= size
+        binary.seek(position)
+        data = binary.read(size) + data
+        cut = _line_break_before(data, needed)
+        if cut < 0:
+            continue
+        file.seek(position + cut)
+        lines = list(file)
+        del lines[0]
+        if len(lines) >= items:
+            return lines[len(lines) - items:]
+        # the file splits lines at fewer of the line break characters
+        needed += items - len(lines)
+    file.seek(start)
+    lines = list(file)
+    return lines[max(0, len(lines) - items):]
+
+
+def _line_break_before(data: bytes, breaks: int) -> int:
+    # index of the start of the given number of the last line breaks of
+    # the data (counting a carriage return and newline as one line break,
+    # and ignoring a line break at the very end), or -1 if there are fewer
+    cut = len(data) - 2 if data.endswith(b'\r\n') else len(data) - 1
+    for _ in range(breaks):
+        cut = max(data.rfind(b'\n', 0, cut), data.rfind(b'\r', 0, cut))
+        if cut < 0:
+            break
+        if cut and data[cut] == 10 and data[cut - 1] == 13:
+            cut -= 1
+    return cut
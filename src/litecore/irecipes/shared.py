@@ -0,0 +1,268 @@
+"""Functions for sharing one iterator between several consumers.
+
+"""
+import collections
+import itertools
+import sys
+import threading
+import weakref
+
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from litecore import LitecoreError as _ErrorBase
+
+_POLICIES = ('block', 'drop', 'raise')
+_DETACHED = sys.maxsize
+
+
+class FanoutOverflowError(_ErrorBase, BufferError):
+    """Buffer shared by the consumers of an iterator is full."""
+
+
+def fanout(
+        iterable: Iterable[Any],
+        n: int = 2,
+        *,
+        maxbuffer: Optional[int] = None,
+        policy: str = 'block',
+        batch_size: int = 1,
+) -> Tuple[Iterator[Any], ...]:
+    """Return n independent iterators over the items of one iterable.
+
+    Similar to itertools.tee(), but the returned iterators may be consumed
+    from different threads, and the number of items buffered for
+    consumers which lag behind the others can be limited.
+
+    Items read from the iterable are kept in a buffer shared by all the
+    consumers, until every consumer has yielded them. The iterable is
+    only ever advanced by one consumer at a time. Each of the returned
+    iterators should itself be consumed by only one thread at a time.
+
+    If maxbuffer is specified, it limits the number of items in the
+    buffer. When a consumer needs a new item from the iterable but the
+    buffer is full, what happens depends on the policy:
+
+        'block': the consumer waits until the consumers lagging behind
+            have caught up (so that the fastest consumer is slowed down
+            to the pace of the slowest)
+        'drop': the oldest items are removed from the buffer, and the
+            consumers lagging behind skip them
+        'raise': a FanoutOverflowError is raised by the consumer
+
+    With the 'block' policy, the consumers must run on separate threads
+    (or be consumed in step with each other), otherwise a consumer which
+    gets too far ahead waits forever.
+
+    The cost of the lock protecting the buffer is shared by all the items
+    of a batch if batch_size is more than 1, at the price of reading up
+    to batch_size - 1 items from the iterable before they are needed.
+    The buffer then holds maxbuffer items rounded up to whole batches.
+
+    A consumer which is closed (or garbage collected) no longer holds
+    items in the buffer.
+
+    Arguments:
+        iterable: object with items to be shared
+        n: non-negative number of iterators to return (optional;
+            default is 2)
+
+    Keyword Arguments:
+        maxbuffer: positive maximum number of items in the buffer
+            (optional; default is None, signifying no limit)
+        policy: 'block', 'drop' or 'raise' (optional; default is 'block')
+        batch_size: positive number of items to read from the iterable
+            at once (optional; default is 1)
+
+    Returns:
+        tuple of n iterators over the items of the iterable
+
+    Raises:
+        ValueError: if n is negative, maxbuffer or batch_size is not
+            positive, or the policy is not recognized
+
+    Examples:
+
+    >>> first, second = fanout(range(5))
+    >>> list(first), list(second)
+    ([0, 1, 2, 3, 4], [0, 1, 2, 3, 4])
+    >>> fast, slow = fanout(range(10), maxbuffer=3, policy='drop')
+    >>> list(fast)
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+    >>> list(slow)
+    [7, 8, 9]
+    >>> fast, slow = fanout(range(10), maxbuffer=3, policy='raise')
+    >>> list(fast)
+    Traceback (most recent call last):
+     ...
+    litecore.irecipes.shared.FanoutOverflowError: fanout buffer of 3 items is full
+    >>> import concurrent.futures
+    >>> with concurrent.futures.ThreadPoolExecutor(3) as executor:
+    ...     consumers = fanout(range(1000), 3, maxbuffer=10)
+    ...     totals = list(executor.map(sum, consumers))
+    >>> totals
+    [499500, 499500, 499500]
+
+    """
+    _check_arguments(n, maxbuffer, policy, batch_size)
+    buffer = _SharedBuffer(iterable, n, maxbuffer, policy, batch_size)
+    consumers = tuple(_consumer(buffer, i) for i in range(n))
+    for i, consumer in enumerate(consumers):
+        # a generator which was never started does not run its finally
+        # clause when it is garbage collected
+        weakref.finalize(consumer, buffer.detach, i)
+    return consumers
+
+
+def _check_arguments(
+        n: int,
+        maxbuffer: Optional[int],
+        policy: str,
+        batch_size: int,
+) -> None:
+    if n < 0:
+        msg = f'n must be non-negative'
+        raise ValueError(msg)
+    if maxbuffer is not None and maxbuffer < 1:
+        msg = f'maxbuffer must be positive'
+        raise ValueError(msg)
+    if policy not in _POLICIES:
+        msg = f"policy must be 'block', 'drop' or 'raise'"
+        raise ValueError(msg)
+    if batch_size < 1:
+        msg = f'batch_size must be positive'
+        raise ValueError(msg)
+
+
+def _consumer(buffer: '_SharedBuffer', index: int) -> Iterator[Any]:
+    next_batch = buffer.next_batch
+    try:
+        while True:
+            batch = next_batch(index)
+            if batch is None:
+                return
+            yield from batch
+    finally:
+        buffer.detach(index)
+
+
+class _SharedBuffer:
+    # batches of items are indexed by their position in the stream of
+    # batches read from the source, and self._batches[0] is the batch
+    # with index self._start; detached consumers are at position _DETACHED
+    __slots__ = (
+        '_source',
+        '_positions',
+        '_limit',
+        '_maxbuffer',
+        '_policy',
+        '_batch_size',
+        '_batches',
+        '_start',
+        '_exhausted',
+        '_waiting',
+        '_lock',
+        '_condition',
+    )
+
+    def __init__(
+            self,
+            iterable: Iterable[Any],
+            n: int,
+            maxbuffer: Optional[int],
+            policy: str,
+            batch_size: int,
+    ) -> None:
+        self._source = iter(iterable)
+        self._positions = [0] * n
+        if maxbuffer is None:
+            self._limit = None
+        else:
+            self._limit = -(-maxbuffer // batch_size)
+        self._maxbuffer = maxbuffer
+        self._policy = policy
+        self._batch_size = batch_size
+        self._batches = collections.deque()
+        self._start = 0
+        self._exhausted = False
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+
+    def next_batch(self, index: int) -> Optional[List[Any]]:
+        # the lock is acquired directly, which is faster than acquiring it
+        # through the condition
+        with self._lock:
+            positions = self._positions
+            position = positions[index]
+            offset = position - self._start
+            if 0 <= offset < len(self._batches):
+                batch = self._batches[offset]
+                positions[index] = position + 1
+                if not offset:
+                    self._trim()
+                return batch
+            return self._next_unread_batch(index)
+
+    def detach(self, index: int) -> None:
+        with self._lock:
+            self._positions[index] = _DETACHED
+            self._trim()
+
+    def _next_unread_batch(self, index: int) -> Optional[List[Any]]:
+        # called with the lock held, by a consumer which has yielded all
+        # the batches in the buffer or which has had batches dropped
+        while True:
+            position = max(self._positions[index], self._start)
+            offset = position - self._start
+            if offset < len(self._batches):
+                batch = self._batches[offset]
+                break
+            if self._exhausted:
+                return None
+            full = (
+                self._limit is not None
+                and len(self._batches) >= self._limit
+            )
+            if not full or self._policy == 'drop':
+                batch = list(itertools.islice(self._source, self._batch_size))
+                if not batch:
+                    self._exhausted = True
+                    return None
+                self._batches.append(batch)
+                if full:
+                    self._batches.popleft()
+                    self._start += 1
+                break
+            if self._policy == 'raise':
+                msg = f'fanout buffer of {self._maxbuffer} items is full'
+                raise FanoutOverflowError(msg)
+            self._waiting += 1
+            try:
+                self._condition.wait()
+            finally:
+                self._waiting -= 1
+        self._positions[index] = position + 1
+        if not offset:
+            self._trim()
+        return batch
+
+    def _trim(self) -> None:
+        start = self._start
+        end = min(self._positions)
+        if end == _DETACHED:
+            end = start + len(self._batches)
+        if end <= start:
+            return
+        popleft = self._batches.popleft
+        for _ in range(end - start):
+            popleft()
+        self._start = end
+        if self._waiting:
+            self._condition.notify_all()
@@ -0,0 +1,352 @@
+"""Functions for finding and replacing subsequences of iterables.
+
+Patterns are compiled into an Aho-Corasick automaton, which scans the
+items of an iterable once, however many patterns there are. For a single
+pattern, the automaton is the Knuth-Morris-Pratt matcher of the pattern.
+Items of the patterns must be hashable.
+
+"""
+import collections
+
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+
+class SubsequenceMatcher:
+    """Automaton matching several sequence patterns in one pass.
+
+    Arguments:
+        patterns: iterable of non-empty sequences of hashable items
+
+    Raises:
+        ValueError: if there are no patterns, or a pattern is empty
+        TypeError: if an item of a pattern is unhashable
+
+    Examples:
+
+    >>> matcher = SubsequenceMatcher(['he', 'she', 'his', 'hers'])
+    >>> matcher.patterns
+    (('h', 'e'), ('s', 'h', 'e'), ('h', 'i', 's'), ('h', 'e', 'r', 's'))
+    >>> list(matcher.find('ushers'))
+    [(1, ('s', 'h', 'e')), (2, ('h', 'e')), (2, ('h', 'e', 'r', 's'))]
+
+    """
+    __slots__ = ('patterns', '_goto', '_fail', '_depth', '_outputs')
+
+    def __init__(self, patterns: Iterable[Sequence[Any]]) -> None:
+        self.patterns = tuple(tuple(pattern) for pattern in patterns)
+        if not self.patterns:
+            msg = f'must provide at least one pattern'
+            raise ValueError(msg)
+        goto = [{}]
+        depth = [0]
+        own = [None]
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                msg = f'patterns must not be empty'
+                raise ValueError(msg)
+            node = 0
+            for item in pattern:
+                child = goto[node].get(item)
+                if child is None:
+                    child = len(goto)
+                    goto[node][item] = child
+                    goto.append({})
+                    depth.append(depth[node] + 1)
+                    own.append(None)
+                node = child
+            if own[node] is None:
+                own[node] = index
+        fail = [0] * len(goto)
+        outputs = [()] * len(goto)
+        queue = collections.deque(goto[0].values())
+        for child in queue:
+            if own[child] is not None:
+                outputs[child] = (own[child],)
+        while queue:
+            node = queue.popleft()
+            for item, child in goto[node].items():
+                state = fail[node]
+                while item not in goto[state] and state:
+                    state = fail[state]
+                fail[child] = goto[state].get(item, 0)
+                inherited = outputs[fail[child]]
+                if own[child] is not None:
+                    outputs[child] = (own[child],) + inherited
+                else:
+                    outputs[child] = inherited
+                queue.append(child)
+        self._goto = goto
+        self._fail = fail
+        self._depth = depth
+        self._outputs = outputs
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self.patterns)!r})'
+
+    def find(
+            self,
+            iterable: Iterable[Any],
+            *,
+            overlapping: bool = True,
+    ) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        """Yield the start index and pattern of each match in an iterable.
+
+        Matches are yielded in the order in which they end. Matches ending
+        at the same item are yielded longest first. If overlapping is
+        False, only the longest of the matches ending first is yielded,
+        and matching restarts after its last item.
+
+        """
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        patterns = self.patterns
+        state = 0
+        for position, item in enumerate(iterable, start=1):
+            try:
+                while True:
+                    child = goto[state].get(item)
+                    if child is not None:
+                        state = child
+                        break
+                    if not state:
+                        break
+                    state = fail[state]
+            except TypeError:
+                # unhashable items cannot be part of any pattern
+                state = 0
+            found = outputs[state]
+            if found:
+                if overlapping:
+                    for index in found:
+                        yield position - len(patterns[index]), patterns[index]
+                else:
+                    pattern = patterns[found[0]]
+                    yield position - len(pattern), pattern
+                    state = 0
+
+    def replace(
+            self,
+            iterable: Iterable[Any],
+            new_value: Union[Callable[..., Iterable[Any]], Any],
+            *,
+            maxreplacements: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """Yield the items of an iterable with matches replaced.
+
+        Matches are found as by find() with overlapping False. See
+        replace_subsequences() for the meaning of the arguments.
+
+        """
+        if maxreplacements is not None and maxreplacements < 1:
+            msg = f'maxreplacements must be positive'
+            raise ValueError(msg)
+        return self._replace(iterable, replacer(new_value), maxreplacements)
+
+    def _replace(self, iterable, replace_with, maxreplacements):
+        goto = self._goto
+        fail = self._fail
+        depth = self._depth
+        outputs = self._outputs
+        patterns = self.patterns
+        pending = collections.deque()
+        pending_append = pending.append
+        pending_popleft = pending.popleft
+        replacements = 0
+        state = 0
+        iterator = iter(iterable)
+        for item in iterator:
+            try:
+                while True:
+                    child = goto[state].get(item)
+                    if child is not None:
+                        state = child
+                        break
+                    if not state:
+                        break
+                    state = fail[state]
+            except TypeError:
+                state = 0
+            pending_append(item)
+            found = outputs[state]
+            if found:
+                length = len(patterns[found[0]])
+                while len(pending) > length:
+                    yield pending_popleft()
+                yield from replace_with(tuple(pending))
+                pending.clear()
+                state = 0
+                replacements += 1
+                if replacements == maxreplacements:
+                    break
+            else:
+                # only the last depth[state] items can start a match
+                while len(pending) > depth[state]:
+                    yield pending_popleft()
+        yield from pending
+        yield from iterator
+
+
+def replacer(
+        new_value: Union[Callable[..., Iterable[Any]], Any],
+) -> Callable[[Tuple[Any, ...]], Iterable[Any]]:
+    """Return a callable giving the replacement for a tuple of matched items.
+
+    If the new value is a callable, the returned callable calls it with
+    the matched items as arguments. Otherwise, the new value is the
+    replacement, unless it is a non-string iterable, in which case its
+    items are.
+
+    Arguments:
+        new_value: either a value or a callable returning an iterable
+
+    Returns:
+        single-argument callable returning an iterable of the items
+        replacing the matched items
+
+    Examples:
+
+    >>> list(replacer([3, 4])((1, 2)))
+    [3, 4]
+    >>> list(replacer('hi')((1, 2)))
+    ['hi']
+    >>> list(replacer(lambda a, b: [a + b])((1, 2)))
+    [3]
+
+    """
+    if callable(new_value):
+        def replace_with(values):
+            return new_value(*values)
+    else:
+        if isinstance(new_value, (str, bytes, bytearray)):
+            replacement = (new_value,)
+        else:
+            try:
+                replacement = tuple(new_value)
+            except TypeError:
+                replacement = (new_value,)
+
+        def replace_with(values):
+            return replacement
+    return replace_with
+
+
+def find_subsequences(
+        iterable: Iterable[Any],
+        patterns: Union[SubsequenceMatcher, Iterable[Sequence[Any]]],
+        *,
+        overlapping: bool = True,
+) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+    """Find occurrences of any of several patterns in an iterable.
+
+    The iterable is scanned once, in time proportional to the number of
+    items plus the number of matches. Matches are yielded in the order in
+    which they end, and matches ending at the same item are yielded
+    longest first. If overlapping is False, the longest of the matches
+    ending first is yielded and the search restarts after it.
+
+    Patterns may be given as a precompiled SubsequenceMatcher, to avoid
+    recompiling them for each iterable.
+
+    Arguments:
+        iterable: object with items to be searched
+        patterns: iterable of non-empty sequences of hashable items, or a
+            SubsequenceMatcher
+
+    Keyword Arguments:
+        overlapping: whether to find matches overlapping earlier matches
+            (optional; default is True)
+
+    Returns:
+        iterator of tuples of the index of the first item of each match
+        and the matching pattern as a tuple
+
+    Raises:
+        ValueError: if there are no patterns, or a pattern is empty
+        TypeError: if an item of a pattern is unhashable
+
+    Examples:
+
+    >>> list(find_subsequences([1, 2, 1, 2, 1, 3], [(1, 2, 1)]))
+    [(0, (1, 2, 1)), (2, (1, 2, 1))]
+    >>> list(find_subsequences([1, 2, 1, 2, 1, 3], [(1, 2, 1)], overlapping=False))
+    [(0, (1, 2, 1))]
+    >>> list(find_subsequences('abcabd', ['ab', 'bd', 'cab']))
+    [(0, ('a', 'b')), (2, ('c', 'a', 'b')), (3, ('a', 'b')), (4, ('b', 'd'))]
+    >>> list(find_subsequences('abcabd', ['ab', 'bd', 'cab'], overlapping=False))
+    [(0, ('a', 'b')), (2, ('c', 'a', 'b'))]
+
+    """
+    if not isinstance(patterns, SubsequenceMatcher):
+        patterns = SubsequenceMatcher(patterns)
+    return patterns.find(iterable, overlapping=overlapping)
+
+
+def replace_subsequences(
+        iterable: Iterable[Any],
+        patterns: Union[SubsequenceMatcher, Iterable[Sequence[Any]]],
+        new_value: Union[Callable[..., Iterable[Any]], Any],
+        *,
+        maxreplacements: Optional[int] = None,
+) -> Iterator[Any]:
+    """Replace occurrences of any of several patterns in an iterable.
+
+    Works like replace_multi() with a container of values as the
+    condition, but for many patterns at once. Matches are found as by
+    find_subsequences() with overlapping False, so where matches overlap,
+    the match ending first is replaced (the longest, if several end at
+    the same item). No more items are buffered than the longest pattern.
+
+    If the new value is a callable, it is called with the matched items as
+    arguments and must return an iterable.
+
+    Arguments:
+        iterable: object with items to be replaced
+        patterns: iterable of non-empty sequences of hashable items, or a
+            SubsequenceMatcher
+        new_value: either a value or a callable
+
+    Keyword Arguments:
+        maxreplacements: limit on the number of replacements (optional;
+            default is None signifying no limit); if provided, must be
+            positive
+
+    Returns:
+        iterator of items of the original iterable with the items matching
+        any of the patterns replaced
+
+    Raises:
+        ValueError: if passed a non-positive maxreplacements argument, or
+            there are no patterns, or a pattern is empty
+        TypeError: if an item of a pattern is unhashable
+
+    Examples:
+
+    >>> data = [0, 1, 2, 5, 0, 1, 2, 5, 0, 1, 2, 5]
+    >>> list(replace_subsequences(data, [(1, 2), (5, 0)], -1))
+    [0, -1, -1, -1, -1, -1, 5]
+    >>> list(replace_subsequences(data, [(1, 2), (5, 0)], [], maxreplacements=3))
+    [0, 5, 0, 1, 2, 5]
+    >>> join = lambda *values: [sum(values)]
+    >>> list(replace_subsequences(data, [(0, 1, 2), (2, 5)], join))
+    [3, 5, 3, 5, 3, 5]
+    >>> ''.join(replace_subsequences('ushers', ['he', 'she', 'hers'], '*'))
+    'u*rs'
+
+    """
+    if not isinstance(patterns, SubsequenceMatcher):
+        patterns = SubsequenceMatcher(patterns)
+    return patterns.replace(
+        iterable,
+        new_value,
+        maxreplacements=maxreplacements,
+    )
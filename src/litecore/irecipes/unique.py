@@ -1,10 +1,21 @@
 """Functions for testing or extracting unique values from iterables.
 
+Also includes classes for remembering which values have been seen using
+bounded memory, for removing duplicates from very long iterables.
+
 """
+import abc
+import collections
+import collections.abc
+import dataclasses
 import itertools
+import math
+import sys
+import time
 
 from typing import (
     Any,
+    Callable,
     Hashable,
     Iterable,
     Iterator,
@@ -12,15 +23,23 @@ from typing import (
     Tuple,
 )
 
+import litecore.sentinels
+
 from litecore.irecipes.typealiases import (
     KeyFunc,
 )
 
+_MAPPING = litecore.sentinels.create('_MAPPING_FINGERPRINT')
+_SEQUENCE = litecore.sentinels.create('_SEQUENCE_FINGERPRINT')
+_UNKNOWN = litecore.sentinels.create('_UNKNOWN_FINGERPRINT')
+_SCALAR_TYPES = frozenset({str, int, float, bool, bytes, type(None)})
+
 
 def unique_hashable(
         iterable: Iterable[Hashable],
         *,
         key: Optional[KeyFunc] = None,
+        seen: Optional['SeenFilter'] = None,
 ) -> Iterator[Hashable]:
     """Return iterator of unique items from an iterable.
 
@@ -35,6 +54,13 @@ def unique_hashable(
     as different. The default is None, which means that each item is
     tested for uniqueness without modification.
 
+    By default, every key seen is kept in a set, so memory use grows
+    with the number of distinct keys. The optional seen keyword argument
+    specifies a SeenFilter (e.g., LRUFilter, TimeWindowFilter or
+    BloomFilter) to remember keys in bounded memory instead, at some cost
+    in accuracy. The filter's stats property reports the memory used
+    and the accuracy achieved.
+
     Arguments:
         iterable: iterator or collection of items
 
@@ -42,6 +68,8 @@ def unique_hashable(
         key: single-argument callable mapping function
             (optional; defaults to None, signifying each item is
             to be processed without modification)
+        seen: filter used to remember keys (optional; defaults to None,
+            signifying all keys are remembered exactly)
 
     Yields:
         2-tuples of unique values in the order they were encountered and
@@ -58,8 +86,19 @@ def unique_hashable(
     >>> data = [-x if even(x) else x for x in range(1, 10)]
     >>> list(unique(data, key=sign))
     [1, -2]
+    >>> list(unique_hashable('AAAABBBCCDAABBB', seen=LRUFilter(1)))
+    ['A', 'B', 'C', 'D', 'A', 'B']
 
     """
+    if seen is not None:
+        is_new = seen.add
+        if key is None:
+            yield from filter(is_new, iterable)
+        else:
+            for item in iterable:
+                if is_new(key(item)):
+                    yield item
+        return
     seen = set()
     saw = seen.add
     already_seen = seen.__contains__
@@ -79,13 +118,17 @@ def enumerate_unique(
         iterable: Iterable[Any],
         *,
         key: Optional[KeyFunc] = None,
+        seen: Optional['SeenFilter'] = None,
 ) -> Iterator[Tuple[int, Any]]:
     """Return iterator of unique items with indices from an iterable.
 
     Similar to built-in enumerate(), except only the items with unique
     values will be included.
 
-    The items in the iterable may be hashable or unhashable.
+    The items in the iterable may be hashable or unhashable. Unhashable
+    items (or keys) are remembered in an UnhashableSeen container, which
+    buckets them by structural fingerprint, so lists of dicts or lists
+    of lists do not require a scan of every previous item.
 
     The optional key is a single-argument callable that, if provided,
     will be called to produce a modified value for each item prior to
@@ -93,6 +136,10 @@ def enumerate_unique(
     as different. The default is None, which means that each item is
     tested for uniqueness without modification.
 
+    The optional seen keyword argument specifies a SeenFilter to remember
+    hashable keys in bounded memory (see unique_hashable()). Unhashable
+    keys are always remembered exactly.
+
     Arguments:
         iterable: iterator or collection of items
 
@@ -100,6 +147,8 @@ def enumerate_unique(
         key: single-argument callable mapping function
             (optional; defaults to None, signifying each item is to be
             processed without modification)
+        seen: filter used to remember hashable keys (optional; defaults
+            to None, signifying all keys are remembered exactly)
 
     Yields:
         2-tuples of unique values in the order they were encountered and
@@ -117,12 +166,26 @@ def enumerate_unique(
     >>> import operator
     >>> list(enumerate_unique(unhashable, key=operator.itemgetter('even')))
     [(0, {'value': 1, 'even': False}), (1, {'value': 2, 'even': True})]
+    >>> list(enumerate_unique('ABAB', seen=LRUFilter(1)))
+    [(0, 'A'), (1, 'B'), (2, 'A'), (3, 'B')]
+    >>> list(enumerate_unique([[1], 'A', [1], 'A'], seen=LRUFilter(5)))
+    [(0, [1]), (1, 'A')]
 
     """
+    saw_unhashable = UnhashableSeen().add
+    if seen is not None:
+        is_new = seen.add
+        for index, item in enumerate(iterable):
+            item_key = item if key is None else key(item)
+            try:
+                if is_new(item_key):
+                    yield index, item
+            except TypeError:
+                if saw_unhashable(item_key):
+                    yield index, item
+        return
     hashables_seen = set()
     saw_hashable = hashables_seen.add
-    unhashables_seen = []
-    saw_unhashable = unhashables_seen.append
     if key is None:
         for index, item in enumerate(iterable):
             try:
@@ -130,8 +193,7 @@ def enumerate_unique(
                     saw_hashable(item)
                     yield index, item
             except TypeError:
-                if item not in unhashables_seen:
-                    saw_unhashable(item)
+                if saw_unhashable(item):
                     yield index, item
     else:
         for index, item in enumerate(iterable):
@@ -141,8 +203,7 @@ def enumerate_unique(
                     saw_hashable(item_key)
                     yield index, item
             except TypeError:
-                if item_key not in unhashables_seen:
-                    saw_unhashable(item_key)
+                if saw_unhashable(item_key):
                     yield index, item
 
 
@@ -241,8 +302,10 @@ def argunique(
 def allunique(iterable: Iterable[Any]) -> bool:
     """Check whether all items of an iterable are distinct.
 
-    Works for either hashable or unhashable items. If all items are
-    hashable, allunique_hashable() will be much faster.
+    Works for either hashable or unhashable items. Hashable items are
+    remembered in a set, and unhashable items in an UnhashableSeen
+    container. If all items are hashable, allunique_hashable() will be
+    somewhat faster.
 
     Returns True for an empty iterable. Will not return if passed an
     infinite iterator.
@@ -267,13 +330,30 @@ def allunique(iterable: Iterable[Any]) -> bool:
     False
     >>> allunique([['this', 'object'], ['is'], ['not', 'hashable']])
     True
+    >>> allunique([{'a': [1, 2]}, {'a': [1, 2.0]}])
+    False
+    >>> allunique([{1}, frozenset({1})])
+    False
     >>> allunique([])
     True
 
     """
-    seen = []
-    saw = seen.append
-    return not any(item in seen or saw(item) for item in iterable)
+    hashables_seen = set()
+    saw_hashable = hashables_seen.add
+    unhashables_seen = UnhashableSeen()
+    saw_unhashable = unhashables_seen.add
+    for item in iterable:
+        try:
+            if item in hashables_seen:
+                return False
+            saw_hashable(item)
+        except TypeError:
+            if not saw_unhashable(item):
+                return False
+        else:
+            if unhashables_seen and item in unhashables_seen:
+                return False
+    return True
 
 
 def allunique_hashable(iterable: Iterable[Hashable]) -> bool:
@@ -314,3 +394,498 @@ def allunique_hashable(iterable: Iterable[Hashable]) -> bool:
     seen = set()
     saw = seen.add
     return not any(item in seen or saw(item) for item in iterable)
+
+
+def fingerprint(item: Any) -> Hashable:
+    """Return a hashable structural fingerprint of an item.
+
+    Hashable items are their own fingerprint. Unhashable mappings,
+    sequences and sets are frozen recursively into hashable canonical
+    forms, so equal containers (e.g., dicts with the same items in a
+    different order) have equal fingerprints. Items of any other
+    unhashable type, and containers too deeply nested to freeze, share a
+    single catch-all fingerprint.
+
+    Items which compare equal always have equal fingerprints. The
+    converse is not guaranteed (e.g., a list and a deque with the same
+    items have the same fingerprint), so fingerprints narrow down the
+    candidates for an exact comparison rather than replace it.
+
+    Arguments:
+        item: object to be fingerprinted
+
+    Returns:
+        hashable object
+
+    Examples:
+
+    >>> fingerprint('abc')
+    'abc'
+    >>> fingerprint({'a': 1, 'b': [2, 3]}) == fingerprint({'b': [2, 3], 'a': 1})
+    True
+    >>> fingerprint({'a': 1, 'b': [2, 3]}) == fingerprint({'a': 1, 'b': [3, 2]})
+    False
+    >>> fingerprint({1, 2}) == fingerprint(frozenset({1, 2}))
+    True
+    >>> fingerprint([1, 2]) == fingerprint((1, 2))
+    False
+
+    """
+    item_type = type(item)
+    if item_type is dict:
+        try:
+            return _MAPPING, frozenset([
+                (key, value)
+                if type(value) in _SCALAR_TYPES
+                else (key, fingerprint(value))
+                for key, value in item.items()
+            ])
+        except RecursionError:
+            return _UNKNOWN
+    if item_type is list:
+        try:
+            return _SEQUENCE, tuple([
+                value if type(value) in _SCALAR_TYPES else fingerprint(value)
+                for value in item
+            ])
+        except RecursionError:
+            return _UNKNOWN
+    if item_type is set:
+        return frozenset(item)
+    try:
+        hash(item)
+    except TypeError:
+        pass
+    else:
+        return item
+    try:
+        if isinstance(item, collections.abc.Mapping):
+            return _MAPPING, frozenset(
+                (key, fingerprint(value)) for key, value in item.items()
+            )
+        if isinstance(item, collections.abc.Set):
+            return frozenset(map(fingerprint, item))
+        if isinstance(item, (list, collections.abc.Sequence)):
+            return _SEQUENCE, tuple(map(fingerprint, item))
+    except (RecursionError, TypeError):
+        pass
+    return _UNKNOWN
+
+
+@dataclasses.dataclass(frozen=True)
+class SeenStats:
+    """Statistics about the keys checked by a SeenFilter.
+
+    Attributes:
+        checked: number of keys checked
+        new: number of keys reported as not seen before
+        stored: number of keys currently remembered
+        evicted: number of keys forgotten to bound memory use
+        memory: approximate size in bytes of the filter's storage (not
+            including the keys themselves, which may be shared with
+            other objects)
+        false_positive_rate: estimated probability that a key never seen
+            before is reported as already seen
+
+    """
+    checked: int
+    new: int
+    stored: int
+    evicted: int
+    memory: int
+    false_positive_rate: float
+
+
+class SeenFilter(abc.ABC):
+    """Abstract base class for remembering keys with bounded memory.
+
+    Pass an instance as the seen keyword argument of unique_hashable()
+    or enumerate_unique() to remove duplicates without keeping every key
+    ever seen in an unbounded set. Each subclass trades off accuracy for
+    memory in a different way; inspect the stats property for the
+    resulting memory use and accuracy.
+
+    Subclasses implement _add(), returning True if the key has not been
+    seen before (as far as the filter can tell), and record the key.
+    Subclasses also implement __contains__(), to test for a key without
+    recording it.
+
+    """
+
+    def __init__(self) -> None:
+        self._checked = 0
+        self._new = 0
+        self._evicted = 0
+
+    def add(self, key: Hashable) -> bool:
+        """Record a key, and return True if it was not seen before."""
+        self._checked += 1
+        if self._add(key):
+            self._new += 1
+            return True
+        return False
+
+    @abc.abstractmethod
+    def __contains__(self, key: Hashable) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def _add(self, key: Hashable) -> bool:
+        pass
+
+    @property
+    def stats(self) -> SeenStats:
+        """Return statistics about the keys checked so far."""
+        return SeenStats(
+            checked=self._checked,
+            new=self._new,
+            stored=self._stored(),
+            evicted=self._evicted,
+            memory=self._memory(),
+            false_positive_rate=self._false_positive_rate(),
+        )
+
+    @abc.abstractmethod
+    def _stored(self) -> int:
+        pass
+
+    @abc.abstractmethod
+    def _memory(self) -> int:
+        pass
+
+    def _false_positive_rate(self) -> float:
+        return 0.0
+
+
+class LRUFilter(SeenFilter):
+    """Remember only the most recently seen keys.
+
+    Keys are forgotten once maxsize more recently seen keys have been
+    checked, so a duplicate is only detected if it recurs within that
+    many distinct keys. Seeing a key again makes it the most recent.
+
+    There are no false positives, but duplicates further apart than
+    maxsize distinct keys are not detected.
+
+    Arguments:
+        maxsize: positive number of keys to remember
+
+    Examples:
+
+    >>> recent = LRUFilter(2)
+    >>> list(unique_hashable('ABACDAB', seen=recent))
+    ['A', 'B', 'C', 'D', 'A', 'B']
+    >>> recent.stats.evicted
+    4
+
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        if maxsize < 1:
+            msg = f'maxsize must be positive'
+            raise ValueError(msg)
+        super().__init__()
+        self.maxsize = maxsize
+        self._keys = collections.OrderedDict()
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.maxsize!r})'
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._keys
+
+    def _add(self, key: Hashable) -> bool:
+        keys = self._keys
+        if key in keys:
+            keys.move_to_end(key)
+            return False
+        keys[key] = None
+        if len(keys) > self.maxsize:
+            keys.popitem(last=False)
+            self._evicted += 1
+        return True
+
+    def _stored(self) -> int:
+        return len(self._keys)
+
+    def _memory(self) -> int:
+        return sys.getsizeof(self._keys)
+
+
+class TimeWindowFilter(SeenFilter):
+    """Remember only the keys seen within a recent time window.
+
+    A key is reported as already seen if it was last seen less than
+    the specified number of seconds ago. Seeing a key again restarts its
+    time window.
+
+    There are no false positives, but duplicates further apart in time
+    than the window are not detected.
+
+    Arguments:
+        seconds: positive length of the time window
+
+    Keyword Arguments:
+        clock: zero-argument callable returning the current time in
+            seconds (optional; default is time.monotonic)
+
+    Examples:
+
+    >>> now = 0
+    >>> recent = TimeWindowFilter(10, clock=lambda: now)
+    >>> recent.add('A'), recent.add('B'), recent.add('A')
+    (True, True, False)
+    >>> now = 15
+    >>> recent.add('A'), recent.add('C')
+    (True, True)
+    >>> recent.stats.stored, recent.stats.evicted
+    (2, 2)
+
+    """
+
+    def __init__(
+            self,
+            seconds: float,
+            *,
+            clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if seconds <= 0:
+            msg = f'seconds must be positive'
+            raise ValueError(msg)
+        super().__init__()
+        self.seconds = seconds
+        self.clock = clock
+        self._keys = collections.OrderedDict()
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.seconds!r})'
+
+    def __contains__(self, key: Hashable) -> bool:
+        seen_at = self._keys.get(key)
+        return seen_at is not None and seen_at > self.clock() - self.seconds
+
+    def _add(self, key: Hashable) -> bool:
+        keys = self._keys
+        now = self.clock()
+        expired = now - self.seconds
+        # Keys are kept in order of when they were last seen
+        while keys:
+            oldest, seen_at = next(iter(keys.items()))
+            if seen_at > expired:
+                break
+            del keys[oldest]
+            self._evicted += 1
+        is_new = key not in keys
+        keys[key] = now
+        keys.move_to_end(key)
+        return is_new
+
+    def _stored(self) -> int:
+        return len(self._keys)
+
+    def _memory(self) -> int:
+        return sys.getsizeof(self._keys)
+
+
+_MASK_64 = (1 << 64) - 1
+
+
+def _mix_64(value: int) -> int:
+    # Finalizer of the splitmix64 generator, to spread out similar hashes
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
+
+
+class BloomFilter(SeenFilter):
+    """Remember keys approximately in a fixed amount of memory.
+
+    A Bloom filter sets several bits (chosen by hashing) for each key it
+    records, and reports a key as already seen if all of its bits are
+    set. Memory use is fixed when the filter is created, and depends on
+    the expected number of distinct keys and the desired false positive
+    rate.
+
+    Every duplicate is detected, but a new key is occasionally reported
+    as already seen (a false positive), in which case it is wrongly
+    dropped as a duplicate. The false positive rate grows past the
+    desired rate if more than the expected number of distinct keys are
+    recorded; the stats property gives the current estimate.
+
+    Relies on the built-in hash() function, so the results for strings
+    and bytes vary from one Python process to the next. Keys are only
+    told apart by their hash values, so a new key with the same hash
+    value as a key already recorded (e.g., -2 after -1, in CPython) is
+    always a false positive, whatever the error rate; such collisions are
+    not included in the estimated false positive rate. Hashing the value
+    of each key instead would break the guarantee that keys which are
+    equal but of different types (e.g., 1 and 1.0) are duplicates.
+
+    Arguments:
+        capacity: expected number of distinct keys
+
+    Keyword Arguments:
+        error_rate: desired false positive rate when the capacity is
+            reached (optional; default is 0.001)
+
+    Examples:
+
+    >>> bloom = BloomFilter(1000, error_rate=0.01)
+    >>> len(list(unique_hashable([n % 100 for n in range(1000)], seen=bloom)))
+    100
+    >>> bloom.stats.memory
+    1199
+    >>> bloom.stats.false_positive_rate < 1e-6
+    True
+    >>> 99 in bloom
+    True
+
+    """
+
+    def __init__(self, capacity: int, *, error_rate: float = 0.001) -> None:
+        if capacity < 1:
+            msg = f'capacity must be positive'
+            raise ValueError(msg)
+        if not 0 < error_rate < 1:
+            msg = f'error rate must be strictly between 0 and 1'
+            raise ValueError(msg)
+        super().__init__()
+        self.capacity = capacity
+        self.error_rate = error_rate
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self._bits = max(8, int(math.ceil(bits)))
+        self._hashes = max(1, int(round(self._bits / capacity * math.log(2))))
+        self._array = bytearray((self._bits + 7) // 8)
+
+    def __repr__(self):
+        return (
+            f'{type(self).__name__}('
+            f'{self.capacity!r}'
+            f', error_rate={self.error_rate!r}'
+            f')'
+        )
+
+    def _positions(self, key: Hashable) -> Iterator[int]:
+        bits = self._bits
+        hashed = _mix_64(hash(key) & _MASK_64)
+        position = hashed % bits
+        step = (hashed >> 32) % bits or 1
+        for _ in range(self._hashes):
+            yield position
+            position += step
+            if position >= bits:
+                position -= bits
+
+    def __contains__(self, key: Hashable) -> bool:
+        array = self._array
+        return all(
+            array[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def _add(self, key: Hashable) -> bool:
+        # Same probe sequence as _positions(), inlined for speed
+        array = self._array
+        bits = self._bits
+        hashed = _mix_64(hash(key) & _MASK_64)
+        position = hashed % bits
+        step = (hashed >> 32) % bits or 1
+        is_new = False
+        for _ in range(self._hashes):
+            index = position >> 3
+            mask = 1 << (position & 7)
+            if not array[index] & mask:
+                array[index] |= mask
+                is_new = True
+            position += step
+            if position >= bits:
+                position -= bits
+        return is_new
+
+    def _stored(self) -> int:
+        return self._new
+
+    def _memory(self) -> int:
+        return len(self._array)
+
+    def _false_positive_rate(self) -> float:
+        filled = 1.0 - math.exp(-self._hashes * self._new / self._bits)
+        return filled ** self._hashes
+
+
+class UnhashableSeen:
+    """Container remembering items which need not be hashable.
+
+    Items are bucketed by their structural fingerprint (see
+    fingerprint()), and an item is only compared for equality with the
+    items in its own bucket. Checking whether an item has been seen
+    therefore takes roughly constant time for dicts, lists and sets,
+    rather than time proportional to the number of items seen so far.
+
+    Items whose fingerprint is unknown fall back to comparison with
+    every item seen, as do comparisons against such items.
+
+    Examples:
+
+    >>> seen = UnhashableSeen()
+    >>> seen.add({'a': [1, 2]})
+    True
+    >>> seen.add({'a': [1, 2]})
+    False
+    >>> {'a': [1, 2.0]} in seen
+    True
+    >>> [1, 2] in seen
+    False
+    >>> len(seen)
+    1
+
+    """
+    __slots__ = ('_buckets', '_unknown', '_size')
+
+    def __init__(self) -> None:
+        self._buckets = {}
+        self._unknown = []
+        self._size = 0
+
+    def __repr__(self):
+        return f'{type(self).__name__}(<{self._size} items>)'
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Any]:
+        return itertools.chain(
+            itertools.chain.from_iterable(self._buckets.values()),
+            self._unknown,
+        )
+
+    def __contains__(self, item: Any) -> bool:
+        return self._find(item, fingerprint(item))
+
+    def add(self, item: Any) -> bool:
+        """Remember an item.
+
+        Arguments:
+            item: object to be remembered
+
+        Returns:
+            True if the item had not been seen before, otherwise False
+
+        """
+        item_fingerprint = fingerprint(item)
+        if self._find(item, item_fingerprint):
+            return False
+        if item_fingerprint is _UNKNOWN:
+            self._unknown.append(item)
+        else:
+            self._buckets.setdefault(item_fingerprint, []).append(item)
+        self._size += 1
+        return True
+
+    def _find(self, item: Any, item_fingerprint: Hashable) -> bool:
+        if item_fingerprint is _UNKNOWN:
+            return any(other is item or other == item for other in self)
+        bucket = self._buckets.get(item_fingerprint)
+        if bucket is not None and item in bucket:
+            return True
+        return bool(self._unknown) and item in self._unknown
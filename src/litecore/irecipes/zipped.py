@@ -1,6 +1,7 @@
 """Functions relating to zipping or unzipping iterables.
 
 """
+import array
 import itertools
 import operator
 
@@ -8,14 +9,24 @@ from typing import (
     Any,
     Iterator,
     Iterable,
+    MutableSequence,
     Optional,
+    Sequence,
     Tuple,
 )
 
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover
+    _np = None
+
 import litecore.irecipes.common as _common
+import litecore.irecipes.shared as _shared
 
 from litecore.sentinels import NO_VALUE as _NO_VALUE
 
+_BATCH_SIZE = 65536
+
 
 def zip_strict(*iterables) -> Iterator[Tuple[Any, ...]]:
     """Same as built-in zip, but requires all iterables to be same length.
@@ -51,7 +62,13 @@ def zip_strict(*iterables) -> Iterator[Tuple[Any, ...]]:
         yield values
 
 
-def unzip(iterable: Iterable[Tuple[Any, ...]]) -> Tuple[Iterator[Any], ...]:
+def unzip(
+        iterable: Iterable[Tuple[Any, ...]],
+        *,
+        maxbuffer: Optional[int] = None,
+        policy: str = 'block',
+        batch_size: int = 1,
+) -> Tuple[Iterator[Any], ...]:
     """Inverse of built-in zip(), returns iterators of each tuple item.
 
     Returns tuple of iterators based upon an iterable, each item of which
@@ -72,9 +89,23 @@ def unzip(iterable: Iterable[Tuple[Any, ...]]) -> Tuple[Iterator[Any], ...]:
     iterables, see the unzip_finite() and unzip_longest_finite()
     functions for simpler and faster alternatives.
 
+    If maxbuffer is specified, shared.fanout() is used instead of
+    itertools.tee(), and the returned iterators may be consumed on
+    separate threads. The policy and batch_size keyword arguments are
+    passed to fanout(), and are ignored otherwise.
+
     Arguments:
         iterable: iterator or collection of tuples to be unzipped
 
+    Keyword Arguments:
+        maxbuffer: positive maximum number of tuples held for iterators
+            lagging behind the others (optional; default is None,
+            signifying no limit)
+        policy: 'block', 'drop' or 'raise', see fanout() (optional;
+            default is 'block')
+        batch_size: positive number of tuples to read at once, see
+            fanout() (optional; default is 1)
+
     Returns:
         tuple of iterators, each item corresponding to an item of the
             original zipped iterable
@@ -100,12 +131,27 @@ def unzip(iterable: Iterable[Tuple[Any, ...]]) -> Tuple[Iterator[Any], ...]:
     ['a', 'b', 'c']
     >>> list(new_numbers)
     [0, 1, 2]
+    >>> import concurrent.futures
+    >>> pairs = ((n, -n) for n in range(1000))
+    >>> columns = unzip(pairs, maxbuffer=100, batch_size=10)
+    >>> with concurrent.futures.ThreadPoolExecutor(2) as executor:
+    ...     list(executor.map(sum, columns))
+    [499500, -499500]
 
     """
     first, iterator = _common.peek(iter(iterable))
     if first is None:
         return ()
-    tees = itertools.tee(iterator, len(first))
+    if maxbuffer is None:
+        tees = itertools.tee(iterator, len(first))
+    else:
+        tees = _shared.fanout(
+            iterator,
+            len(first),
+            maxbuffer=maxbuffer,
+            policy=policy,
+            batch_size=batch_size,
+        )
     return (map(operator.itemgetter(i), tee) for i, tee in enumerate(tees))
 
 
@@ -180,3 +226,79 @@ def unzip_longest_finite(
     """
     for zipped in zip(*iterable):
         yield tuple(item for item in zipped if item != fillvalue)
+
+
+def unzip_columns(
+        iterable: Iterable[Sequence[Any]],
+        *,
+        typecodes: Sequence[Optional[str]],
+        numpy: bool = False,
+) -> Tuple[MutableSequence[Any], ...]:
+    """Similar to unzip_finite(), but returns compact typed columns.
+
+    Each column is an array.array of the corresponding type code (see the
+    array standard library module), which stores the values unboxed,
+    e.g., 8 bytes for each float or 64-bit integer rather than a pointer
+    to a separate float or int object. A type code of None gives a list
+    column, for values of other types.
+
+    The rows are read in batches, and each column is extended with the
+    values of a batch at once, so that memory use is bounded by the
+    columns themselves, which grow geometrically like lists. Unlike for
+    zip(*iterable), the rows are never all held in memory at once.
+
+    Each row must have at least as many items as there are type codes.
+    Extra items are ignored.
+
+    If numpy is True, each array.array column is returned as a NumPy
+    array sharing the same memory, without copying.
+
+    Arguments:
+        iterable: iterable of rows, such as tuples, to be unzipped
+
+    Keyword Arguments:
+        typecodes: sequence of an array module type code or None for
+            each column
+        numpy: whether to return NumPy arrays instead of array.array
+            columns (optional; default is False)
+
+    Returns:
+        tuple of columns, one for each type code
+
+    Raises:
+        ImportError: if numpy is True but NumPy is not installed
+        IndexError: if a row has fewer items than there are type codes
+        TypeError: if a value cannot be stored with its type code
+
+    Examples:
+
+    >>> rows = [(1.5, 10, 'a'), (2.5, 20, 'b'), (3.0, 30, 'c')]
+    >>> prices, sizes, names = unzip_columns(rows, typecodes=('d', 'q', None))
+    >>> prices
+    array('d', [1.5, 2.5, 3.0])
+    >>> sizes
+    array('q', [10, 20, 30])
+    >>> names
+    ['a', 'b', 'c']
+    >>> unzip_columns([], typecodes='dd')
+    (array('d'), array('d'))
+
+    """
+    if numpy and _np is None:
+        msg = f'NumPy is required for NumPy columns'
+        raise ImportError(msg)
+    columns = tuple(
+        [] if typecode is None else array.array(typecode)
+        for typecode in typecodes
+    )
+    getters = tuple(map(operator.itemgetter, range(len(columns))))
+    for batch in _common.take_batches(iterable, length=_BATCH_SIZE):
+        for column, getter in zip(columns, getters):
+            column.extend(map(getter, batch))
+    if numpy:
+        columns = tuple(
+            column if isinstance(column, list)
+            else _np.frombuffer(column, dtype=column.typecode)
+            for column in columns
+        )
+    return columns
@@ -10,6 +10,7 @@ from typing import (
     Union,
 )
 
+from litecore.irecipes import UnhashableSeen as _UnhashableSeen
 import litecore.validation.base as base
 import litecore.validation.length as length
 import litecore.validation.exceptions as exc
@@ -102,8 +103,8 @@ class Sequence(Collection):
         if self.unique:
             hashable_seen = set()
             saw_hashable = hashable_seen.add
-            unhashable_seen = []
-            saw_unhashable = unhashable_seen.append
+            unhashable_seen = _UnhashableSeen()
+            saw_unhashable = unhashable_seen.add
         for index, item in enumerate(value):
             caught_err = None
             try:
@@ -118,13 +119,19 @@ class Sequence(Collection):
                 errors.append(caught_err)
                 continue
             if self.unique:
-                if item in hashable_seen or item in unhashable_seen:
-                    err = exc.NonUniqueContainerItemError(item, index)
-                    errors.append(err)
+                try:
+                    is_new = item not in hashable_seen
+                except TypeError:
+                    is_new = True
                 try:
                     saw_hashable(item)
                 except TypeError:
-                    saw_unhashable(item)
+                    is_new = saw_unhashable(item) and is_new
+                else:
+                    is_new = is_new and item not in unhashable_seen
+                if not is_new:
+                    err = exc.NonUniqueContainerItemError(item, index)
+                    errors.append(err)
             results.append(item)
         if not errors:
             if not isinstance(results, self.result_factory):
@@ -168,7 +168,7 @@ class NonUniqueContainerItemError(ContainerItemError, ValueError):
             msg = self.default_message(value, path)
         super().__init__(msg)
 
-    def default_message(self, value, validator, path):
+    def default_message(self, value, path):
         return f'value {value!r} (container path {path!r}) is a duplicate'
 
     def __reduce__(self):
@@ -4,12 +4,15 @@ import itertools
 import logging
 import operator
 import reprlib
+import types
 
 from typing import (
     Any,
     Callable,
     Iterable,
+    Iterator,
     List,
+    Mapping,
     NoReturn,
     Optional,
     Sequence,
@@ -19,6 +22,8 @@ from typing import (
 from litecore import LitecoreError
 import litecore.nested
 
+from litecore.irecipes.select import PositionIndex
+
 log = logging.getLogger(__name__)
 
 
@@ -269,11 +274,38 @@ class LazyList(collections.abc.MutableSequence):
         self._cache = self.sequence_factory()
         self._lazy = iter(iterable)
         self.consumed = False
+        self._position_indexes = {}
 
     @property
     def cache(self) -> List[Any]:
         return SequenceProxyType(self._cache)
 
+    @property
+    def position_indexes(self) -> Mapping[Callable, PositionIndex]:
+        return types.MappingProxyType(self._position_indexes)
+
+    def track_positions(
+            self,
+            key: Callable[[Any], bool],
+            *,
+            spacing: int = 64,
+    ) -> PositionIndex:
+        index = self._position_indexes.get(key)
+        if index is None:
+            index = PositionIndex(self._iterate_from, key, spacing=spacing)
+            self._position_indexes[key] = index
+        return index
+
+    def _invalidate_positions(self) -> None:
+        for index in self._position_indexes.values():
+            index.invalidate()
+
+    def _iterate_from(self, start: int) -> Iterator[Any]:
+        yield from itertools.islice(self._cache, start, None)
+        for value in self._lazy:
+            self._cache.append(value)
+            yield value
+
     @reprlib.recursive_repr()
     def __repr__(self):
         self._consume_all()
@@ -326,7 +358,7 @@ class LazyList(collections.abc.MutableSequence):
         assert up_to >= 0
         self._cache.extend(itertools.islice(
             self._lazy,
-            up_to - len(self._cache),
+            max(0, up_to - len(self._cache)),
         ))
         try:
             self._consume_next()
@@ -375,13 +407,16 @@ class LazyList(collections.abc.MutableSequence):
 
     def __setitem__(self, index_or_slice, value):
         self._update_cache(index_or_slice)
+        self._invalidate_positions()
         self._cache[index_or_slice] = value
 
     def __delitem__(self, index_or_slice):
         self._update_cache(index_or_slice)
+        self._invalidate_positions()
         del self._cache[index_or_slice]
 
     def insert(self, index: int, value: Any) -> None:
+        self._invalidate_positions()
         if index:
             self._update_cache(index - 1)
         self._cache.insert(index, value)
@@ -399,6 +434,7 @@ class LazyList(collections.abc.MutableSequence):
             self._lazy = itertools.chain(self._lazy, iterable)
 
     def pop(self, index: int = -1) -> Any:
+        self._invalidate_positions()
         if index < 0:
             self._consume_all()
         else:
@@ -411,15 +447,18 @@ class LazyList(collections.abc.MutableSequence):
         del self[self.index(value)]
 
     def clear(self) -> None:
+        self._invalidate_positions()
         self._cache.clear()
         self._lazy = iter(())
         self.consumed = False
 
     def sort(self, key=None, reverse=False) -> None:
+        self._invalidate_positions()
         self._consume_all()
         self._cache.sort(key=key, reverse=reverse)
 
     def reverse(self):
+        self._invalidate_positions()
         self._consume_all()
         self._cache.reverse()
 